@@ -3,6 +3,7 @@ from datetime import timedelta
 
 # Database Configuration
 DATABASE_URL = "sqlite:///./test.db"
+CREATE_TABLES = True  # Create missing tables when the app starts
 
 # JWT Configuration
 SECRET_KEY = "your-secret-key-change-this-in-production"
@@ -4,13 +4,15 @@ print(" CWD:", os.getcwd())
 
 
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
 
-from assignment1_config import APP_NAME, APP_VERSION, ACCESS_TOKEN_EXPIRE_MINUTES
+from assignment1_config import APP_NAME, APP_VERSION, ACCESS_TOKEN_EXPIRE_MINUTES, CREATE_TABLES
 from assignment1_database import engine, Base, get_db
 from assignment1_models import User
 from assignment1_schemas import (
@@ -25,12 +27,20 @@ from assignment1_crud import (
     get_task, update_task, delete_task
 )
 
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create database tables on startup rather than at import time"""
+    if CREATE_TABLES:
+        Base.metadata.create_all(bind=engine)
+    yield
+
 
 app = FastAPI(
     title=APP_NAME,
     version=APP_VERSION,
-    description="A To-Do List API with user authentication --by Omkar "
+    description="A To-Do List API with user authentication --by Omkar ",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -15,7 +15,7 @@ from app.db.base_class import Base
 from app.core.config import settings
 
 # Import all models so Alembic can detect them
-from app.models import user, task
+from app.models import user, task, idempotency
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,48 @@
+"""add tasks archive
+
+Revision ID: 5d1c7e2a9b40
+Revises: 38877d0fabde
+Create Date: 2026-10-19 09:12:41.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1c7e2a9b40'
+down_revision = '38877d0fabde'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The enum types already exist (created with tasks); on PostgreSQL a
+    # plain sa.Enum would issue CREATE TYPE again and fail
+    op.create_table('tasks_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_by_id', sa.Integer(), nullable=False),
+    sa.Column('assigned_to_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('priority', postgresql.ENUM('LOW', 'MEDIUM', 'HIGH', name='taskpriority', create_type=False), nullable=True),
+    sa.Column('status', postgresql.ENUM('PENDING', 'IN_PROGRESS', 'COMPLETED', 'CANCELLED', name='taskstatus', create_type=False), nullable=True),
+    sa.Column('is_admin_assigned', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['assigned_to_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tasks_archive_id'), 'tasks_archive', ['id'], unique=False)
+    op.create_index(op.f('ix_tasks_archive_assigned_to_id'), 'tasks_archive', ['assigned_to_id'], unique=False)
+    op.create_index('ix_tasks_status_updated_at', 'tasks', ['status', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_status_updated_at', table_name='tasks')
+    op.drop_index(op.f('ix_tasks_archive_assigned_to_id'), table_name='tasks_archive')
+    op.drop_index(op.f('ix_tasks_archive_id'), table_name='tasks_archive')
+    op.drop_table('tasks_archive')
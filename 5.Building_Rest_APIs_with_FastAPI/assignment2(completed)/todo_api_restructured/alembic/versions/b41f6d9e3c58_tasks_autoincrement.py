@@ -0,0 +1,40 @@
+"""make tasks.id autoincrement on sqlite
+
+Revision ID: b41f6d9e3c58
+Revises: 8c3e5f1a2d47
+Create Date: 2026-10-19 16:41:08.204733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41f6d9e3c58'
+down_revision = '8c3e5f1a2d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Without AUTOINCREMENT SQLite gives new rows max(id) + 1, so ids of
+    # archived tasks come back once the newest live tasks are gone. Other
+    # databases use sequences that never go backwards.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('tasks', recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+        pass
+    # Start the sequence past every id already used, archived ones included
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'tasks'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'tasks', max("
+        "coalesce((SELECT max(id) FROM tasks), 0), "
+        "coalesce((SELECT max(id) FROM tasks_archive), 0))"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('tasks', recreate='always'):
+        pass
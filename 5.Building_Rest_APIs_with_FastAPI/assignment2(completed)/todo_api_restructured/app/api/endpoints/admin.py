@@ -1,17 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from app.services.auth_service import get_admin_user
+from app.services.task_service import (
+    TASK_CREATED, TASK_DELETED, TASK_UPDATED, publish_task_event, task_load_options
+)
+from app.services.archive_service import paginate_with_archive
+from app.services.notification_service import fan_out
 from app.db.session import get_db
 from app.models.user import User
-from app.models.task import Task
-from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse
+from app.models.task import Task, TaskArchive
+from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse, TaskExpandedResponse
 from app.core.email import notify_task_assigned
+from app.core.timing import TimedRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/tasks", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
@@ -51,31 +57,44 @@ async def create_task(
     db.add(db_task)
     db.commit()
     db.refresh(db_task)
+    publish_task_event(TASK_CREATED, db_task)
     
     # Send notification
-    if assigned_user.receive_notifications:
-        try:
-            await notify_task_assigned(assigned_user.email, task.name, admin.email)
-        except Exception as e:
-            print(f"Failed to send notification: {e}")
+    await fan_out(
+        [assigned_user],
+        lambda user: notify_task_assigned(user.email, task.name, admin.email)
+    )
     
     return db_task
 
 
-@router.get("/tasks", response_model=List[TaskResponse])
+@router.get("/tasks", response_model=List[TaskExpandedResponse])
 async def get_all_tasks(
     admin: User = Depends(get_admin_user),
     db: Session = Depends(get_db),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    expand: Optional[str] = None,
+    include_archived: bool = False
 ):
     """
     Get all tasks in the system (Admin only).
     
     - **skip**: Number of records to skip (pagination)
     - **limit**: Maximum number of records to return
+    - **expand**: Comma separated relations to embed (creator, assignee)
+    - **include_archived**: Also return archived tasks, after the active ones
     """
-    return db.query(Task).offset(skip).limit(limit).all()
+    query = db.query(Task).options(*task_load_options(expand))
+    if include_archived:
+        archive_query = (
+            db.query(TaskArchive)
+            .options(*task_load_options(expand, model=TaskArchive))
+            .order_by(TaskArchive.id)
+        )
+        return paginate_with_archive(query, archive_query, skip, limit)
+    
+    return query.offset(skip).limit(limit).all()
 
 
 @router.put("/tasks/{task_id}", response_model=TaskResponse)
@@ -108,6 +127,7 @@ async def update_task(
     task.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(task)
+    publish_task_event(TASK_UPDATED, task)
     
     return task
 
@@ -132,5 +152,6 @@ async def delete_task(
     
     db.delete(task)
     db.commit()
+    publish_task_event(TASK_DELETED, task)
     
     return {"message": "Task deleted successfully"}
@@ -3,14 +3,15 @@ from sqlalchemy.orm import Session
 import secrets
 import string
 
-from app.core.security import hash_password, verify_password
+from app.core.security import hash_password_async, verify_password_async
 from app.services.auth_service import create_access_token
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
+from app.core.timing import TimedRoute
 from pydantic import EmailStr
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -33,7 +34,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     # Create user
     db_user = User(
         email=user.email,
-        hashed_password=hash_password(user.password),
+        hashed_password=await hash_password_async(user.password),
         role=user.role,
         email_verification_token=''.join(
             secrets.choice(string.ascii_letters + string.digits) for _ in range(32)
@@ -56,7 +57,7 @@ async def login(user: UserLogin, db: Session = Depends(get_db)):
     - **password**: User's password
     """
     db_user = db.query(User).filter(User.email == user.email).first()
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+    if not db_user or not await verify_password_async(user.password, db_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -0,0 +1,92 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.services.auth_service import get_admin_user
+from app.models.user import User
+from app.db import query_stats
+from app.core import memory
+from app.core import email
+from app.core.timing import TimedRoute
+
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/sql-stats")
+async def get_sql_stats(
+    admin: User = Depends(get_admin_user),
+    reset: bool = False
+):
+    """
+    Per-route SQL statement counts and DB time since startup (Admin only).
+    
+    - **reset**: Clear the counters after returning them
+    """
+    stats = query_stats.get_stats()
+    if reset:
+        query_stats.reset_stats()
+    return stats
+
+
+@router.get("/smtp-breaker")
+async def get_smtp_breaker(admin: User = Depends(get_admin_user)):
+    """
+    State of the SMTP circuit breaker and its counters (Admin only).
+    """
+    return email.get_smtp_breaker().snapshot()
+
+
+@router.post("/memory/start")
+async def start_memory_tracking(
+    admin: User = Depends(get_admin_user),
+    frames: int = Query(10, ge=1, le=100),
+    requests: bool = False
+):
+    """
+    Start tracemalloc and take the baseline snapshot (Admin only).
+    Tracing slows allocations down noticeably; stop it when done.
+    
+    - **frames**: Stack frames kept per allocation
+    - **requests**: Also record peak memory per task listing request
+    """
+    return memory.start(frames, requests)
+
+
+@router.get("/memory/snapshot")
+async def get_memory_snapshot(
+    admin: User = Depends(get_admin_user),
+    group_by: str = Query("module", pattern="^(module|line)$"),
+    compare_to: str = Query("baseline", pattern="^(baseline|previous)$"),
+    app_only: bool = True,
+    limit: int = Query(20, ge=1, le=200)
+):
+    """
+    Diff a new heap snapshot against the baseline or the previous one (Admin only).
+    
+    - **group_by**: module (allocations charged to the app module that caused them) or line
+    - **compare_to**: baseline (from start) or previous (last snapshot)
+    - **app_only**: Only allocations with app code on their stack
+    - **limit**: Number of allocation sites, largest growth first
+    """
+    try:
+        # Walking every trace takes a while; keep the event loop responsive
+        return await asyncio.to_thread(memory.snapshot, group_by, compare_to, app_only, limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.get("/memory/requests")
+async def get_request_memory(admin: User = Depends(get_admin_user)):
+    """
+    Peak traced memory per task listing request since tracking started (Admin only).
+    """
+    return memory.request_peaks()
+
+
+@router.post("/memory/stop")
+async def stop_memory_tracking(admin: User = Depends(get_admin_user)):
+    """
+    Stop tracemalloc and release its snapshots (Admin only).
+    """
+    return memory.stop()
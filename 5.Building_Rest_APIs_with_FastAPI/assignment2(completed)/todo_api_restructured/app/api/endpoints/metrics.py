@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core import metrics
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """
+    Runtime metrics in the Prometheus text format, for scraping.
+    Served outside /api and without auth; disable with METRICS_ENABLED=false
+    or restrict it at the proxy if the port is public.
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
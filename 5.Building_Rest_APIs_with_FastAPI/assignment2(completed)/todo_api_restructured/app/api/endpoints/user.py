@@ -1,48 +1,200 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+import asyncio
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status, Body, WebSocket
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import AsyncIterator, List, Optional
 from datetime import datetime
 from pydantic import EmailStr
 
-from app.services.auth_service import get_current_user
-from app.db.session import get_db
+from app.services.auth_service import decode_token, get_current_user
+from app.services.task_service import TASK_COMPLETED, publish_task_event, task_channel, task_load_options
+from app.services.notification_service import fan_out, load_recipients
+from app.core.config import settings
+from app.core.events import broker
+from app.db.session import SessionLocal, get_db, init_engine
 from app.models.user import User
-from app.models.task import Task, TaskStatus
-from app.schemas.task import TaskResponse
+from app.models.task import Task, TaskArchive, TaskStatus
+from app.schemas.task import TaskResponse, TaskExpandedResponse
 from app.core.email import notify_task_completed
+from app.core.timing import TimedRoute
 from app.api.endpoints import admin
 
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=TimedRoute)
 
+# EventSource reconnect delay after the server ends a stream
+STREAM_RETRY_MS = 3000
 
-@router.get("/tasks", response_model=List[TaskResponse])
+
+@router.get("/tasks", response_model=List[TaskExpandedResponse])
 async def get_my_tasks(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    expand: Optional[str] = None,
+    include_archived: bool = False
 ):
     """
     Get all tasks assigned to current user.
+    
+    - **expand**: Comma separated relations to embed (creator, assignee)
+    - **include_archived**: Also return archived tasks, after the active ones
+    """
+    tasks = (
+        db.query(Task)
+        .options(*task_load_options(expand))
+        .filter(Task.assigned_to_id == current_user.id)
+        .all()
+    )
+    if include_archived:
+        tasks += (
+            db.query(TaskArchive)
+            .options(*task_load_options(expand, model=TaskArchive))
+            .filter(TaskArchive.assigned_to_id == current_user.id)
+            .order_by(TaskArchive.id)
+            .all()
+        )
+    return tasks
+
+
+@router.get("/tasks/stream", response_class=StreamingResponse)
+async def stream_my_tasks(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Live updates to the current user's tasks as Server-Sent Events.
+    
+    Each `data:` line is a JSON event: `task.created`, `task.updated` and
+    `task.completed` carry the task, `task.deleted` its id, and
+    `stream.reset` means events were dropped and the list should be
+    fetched again. The server ends the stream after
+    TASK_STREAM_MAX_SECONDS; EventSource reconnects by itself.
+    """
+    user_id = current_user.id
+    # The stream outlives the request's session; give its connection back now
+    db.close()
+    return StreamingResponse(
+        _sse_events(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _sse_events(user_id: int) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.TASK_STREAM_MAX_SECONDS
+    # Subscribed here rather than in the endpoint so a response that is
+    # never sent does not leave a subscription behind
+    subscription = broker.subscribe(task_channel(user_id))
+    try:
+        yield f"retry: {STREAM_RETRY_MS}\n: connected\n\n"
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(
+                    subscription.get(), min(settings.TASK_STREAM_HEARTBEAT_SECONDS, remaining)
+                )
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ": ping\n\n"
+                continue
+            yield f"data: {message}\n\n"
+    finally:
+        subscription.close()
+
+
+@router.websocket("/tasks/ws")
+async def my_tasks_websocket(websocket: WebSocket):
     """
-    return db.query(Task).filter(Task.assigned_to_id == current_user.id).all()
+    Live updates to the current user's tasks over a WebSocket; the same
+    JSON events as /tasks/stream, one per text message.
+    
+    Authenticate with `Authorization: Bearer <token>` or, from a browser
+    (which cannot set headers), the subprotocols `bearer, <token>`. Bad
+    tokens are refused with close code 1008. Messages from the client are
+    ignored; the server closes with 1000 after TASK_STREAM_MAX_SECONDS.
+    """
+    token, subprotocol = _websocket_token(websocket)
+    user_id = _websocket_user_id(token) if token else None
+    if user_id is None:
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept(subprotocol=subprotocol)
+    async with broker.subscribe(task_channel(user_id)) as subscription:
+        async def forward():
+            async for message in subscription:
+                await websocket.send_text(message)
+        
+        async def until_disconnect():
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        
+        tasks = [asyncio.create_task(forward()), asyncio.create_task(until_disconnect())]
+        try:
+            done, _ = await asyncio.wait(
+                tasks, timeout=settings.TASK_STREAM_MAX_SECONDS, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    if not done:
+        await websocket.close(code=1000)
+
+
+def _websocket_token(websocket: WebSocket):
+    """(token, subprotocol to accept) from the Authorization header or subprotocols"""
+    scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token, None
+    protocols = [p.strip() for p in websocket.headers.get("sec-websocket-protocol", "").split(",")]
+    if len(protocols) == 2 and protocols[0].lower() == "bearer" and protocols[1]:
+        return protocols[1], protocols[0]
+    return None, None
+
+
+def _websocket_user_id(token: str) -> Optional[int]:
+    """Id of the token's user, looked up with a session that is closed before streaming"""
+    try:
+        email = decode_token(token)
+    except HTTPException:
+        return None
+    init_engine()
+    db = SessionLocal()
+    try:
+        return db.query(User.id).filter(User.email == email).scalar()
+    finally:
+        db.close()
 
 
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
 async def get_task_details(
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    include_archived: bool = False
 ):
     """
     Get details of a specific task.
     
     - **task_id**: ID of the task
+    - **include_archived**: Fall back to archived tasks if not found
     """
     task = db.query(Task).filter(
         Task.id == task_id,
         Task.assigned_to_id == current_user.id
     ).first()
     
+    if not task and include_archived:
+        task = db.query(TaskArchive).filter(
+            TaskArchive.id == task_id,
+            TaskArchive.assigned_to_id == current_user.id
+        ).first()
+    
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -84,21 +236,26 @@ async def complete_task(
     task.status = TaskStatus.COMPLETED
     task.updated_at = datetime.utcnow()
     db.commit()
+    publish_task_event(TASK_COMPLETED, task)
     
     # Notify admin
-    admin = db.query(User).filter(User.id == task.created_by_id).first()
+    admins = load_recipients(db, [task.created_by_id])
+    admin = admins[0] if admins else None
 
-    print("---- EMAIL DEBUG ----")
-    print("Admin email:", admin.email if admin else None)
-    print("Admin notifications:", admin.receive_notifications if admin else None)
-    print("User email:", current_user.email)
-    print("Task name:", task.name)
+    logger.debug(
+        "Task completion notification",
+        extra={
+            "admin_email": admin.email if admin else None,
+            "admin_notifications": admin.receive_notifications if admin else None,
+            "user_email": current_user.email,
+            "task_name": task.name,
+        }
+    )
 
-    if admin and admin.receive_notifications:
-        try:
-            await notify_task_completed(admin.email, task.name, current_user.email)
-        except Exception as e:
-            print(f"Failed to send notification: {e}")
+    await fan_out(
+        admins,
+        lambda admin: notify_task_completed(admin.email, task.name, current_user.email)
+    )
     
     return {"message": "Task marked as completed"}
 
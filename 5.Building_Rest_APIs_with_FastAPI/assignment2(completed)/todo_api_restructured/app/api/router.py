@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import auth, admin, user
+from app.api.endpoints import auth, admin, user, internal
 
 api_router = APIRouter()
 
@@ -8,3 +8,4 @@ api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 api_router.include_router(admin.router, prefix="/admin", tags=["Admin"])
 api_router.include_router(user.router, prefix="/user", tags=["User"])
+api_router.include_router(internal.router, prefix="/internal", tags=["Internal"])
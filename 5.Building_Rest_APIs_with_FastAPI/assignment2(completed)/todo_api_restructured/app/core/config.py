@@ -18,11 +18,92 @@ class Settings(BaseSettings):
     
     # Email Configuration
     SMTP_SERVER: str = "smtp.gmail.com"
-    SMTP_PORT: int = 587
+    SMTP_PORT: int = 465
+    SMTP_USE_TLS: bool = True  # implicit TLS (port 465); False for plain/STARTTLS
+    SMTP_TIMEOUT: float = 30
     SMTP_USER: str
     SMTP_PASSWORD: str
     FROM_EMAIL: str
     
+    # SMTP connection pool
+    SMTP_POOL_SIZE: int = 4
+    SMTP_POOL_MAX_MESSAGES_PER_CONNECTION: int = 100
+    SMTP_POOL_IDLE_TIMEOUT_SECONDS: float = 60
+    SMTP_POOL_HEALTH_CHECK_AFTER_SECONDS: float = 5
+    
+    # SMTP circuit breaker: this many connection failures within the window
+    # open the circuit and sends fail fast until the reset timeout passes
+    SMTP_BREAKER_FAILURE_THRESHOLD: int = 5
+    SMTP_BREAKER_WINDOW_SECONDS: float = 60
+    SMTP_BREAKER_RESET_TIMEOUT_SECONDS: float = 30
+    SMTP_SEND_RETRIES: int = 2
+    SMTP_RETRY_BACKOFF_SECONDS: float = 0.5
+    
+    # Argon2 hashes/verifies run in worker threads, at most this many at once
+    # per process (each uses ~64 MiB); further logins/registrations queue
+    ARGON2_MAX_CONCURRENCY: int = 4
+    
+    # Notification fan-out: concurrent sends per event and per-recipient limit
+    NOTIFY_FANOUT_CONCURRENCY: int = 10
+    NOTIFY_RECIPIENT_TIMEOUT_SECONDS: float = 10
+    
+    # Task archival (moves old completed/cancelled tasks to tasks_archive)
+    ARCHIVE_ENABLED: bool = False
+    ARCHIVE_AFTER_DAYS: int = 30
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_BATCH_PAUSE_SECONDS: float = 0.1
+    ARCHIVE_INTERVAL_SECONDS: int = 3600
+    
+    # Create missing tables on startup (local development; deployments use Alembic)
+    CREATE_TABLES: bool = False
+    
+    # Logging: root level, per-logger overrides ("app.core.email=DEBUG,
+    # uvicorn.access=WARNING") and JSON lines vs plain text
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""
+    LOG_JSON: bool = True
+    
+    # Prometheus metrics at /metrics (per worker process)
+    METRICS_ENABLED: bool = True
+    
+    # Server-Timing header (auth/db/serialize/email/total) and the fraction
+    # of requests that also log their timings as a JSON line
+    SERVER_TIMING_ENABLED: bool = True
+    SERVER_TIMING_LOG_SAMPLE_RATE: float = 0.0
+    
+    # On-demand request profiling: admins send "X-Profile: 1" and the report
+    # (speedscope JSON or collapsed stacks) is written to PROFILE_OUTPUT_DIR.
+    # Off by default; when off the middleware is not installed at all
+    PROFILING_ENABLED: bool = False
+    PROFILE_OUTPUT_DIR: str = "profiles"
+    PROFILE_FORMAT: str = "speedscope"
+    PROFILE_SAMPLE_INTERVAL_SECONDS: float = 0.001
+    
+    # Idempotency-Key on the task POST/PUT routes: responses are kept for
+    # the TTL; a duplicate waits up to the wait timeout for the first
+    # request, and a claim that never finished is dropped after the lock timeout
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_WAIT_TIMEOUT_SECONDS: float = 30
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS: float = 60
+    
+    # Live task updates (/api/user/tasks/stream and /api/user/tasks/ws).
+    # EVENT_BROKER is "memory" (this worker's clients only), "unix" (every
+    # worker on the host, via datagram sockets in EVENT_BROKER_SOCKET_DIR)
+    # or "package.module:ClassName"; see app.core.events. The socket
+    # directory defaults to $XDG_RUNTIME_DIR/todo-api-events (or a per-user
+    # one in the temp dir) and must be private to the app's user. Streams
+    # are closed after TASK_STREAM_MAX_SECONDS so clients reconnect and
+    # re-authenticate
+    EVENT_BROKER: str = "memory"
+    EVENT_BROKER_SOCKET_DIR: Optional[str] = None
+    EVENT_QUEUE_SIZE: int = 100
+    TASK_STREAM_MAX_SECONDS: float = 300
+    TASK_STREAM_HEARTBEAT_SECONDS: float = 15
+    
+    # SQL instrumentation: statements slower than this are logged
+    SQL_SLOW_QUERY_MS: float = 100.0
+    
     # Application
     APP_NAME: str = "Advanced Todo List API"
     APP_VERSION: str = "1.0.0"
@@ -35,5 +116,33 @@ class Settings(BaseSettings):
     )
 
 
-# Create settings instance
-settings = Settings()
+_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    """Settings for this process, read from the environment / .env on first use"""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+def configure_settings(new_settings: Settings) -> Settings:
+    """Use `new_settings` from now on (see main.create_app)"""
+    global _settings
+    _settings = new_settings
+    return new_settings
+
+
+class _LazySettings:
+    """
+    Stand-in for the module-level `settings`: attribute reads are passed to
+    get_settings(), so importing a module that uses settings does not parse
+    the environment or .env.
+    """
+    
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+
+settings: Settings = _LazySettings()  # type: ignore[assignment]
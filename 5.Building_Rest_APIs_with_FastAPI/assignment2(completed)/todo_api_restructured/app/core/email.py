@@ -1,37 +1,146 @@
-import aiosmtplib
+import asyncio
+import logging
+import time
+from typing import Optional
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from app.core import metrics
 from app.core.config import settings
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.core.smtp_pool import SMTPConnectionPool
 
+logger = logging.getLogger(__name__)
 
-async def send_email(to_email: str, subject: str, body: str):
-    try:
-        message = MIMEMultipart("alternative")
-        message["From"] = settings.FROM_EMAIL
-        message["To"] = to_email
-        message["Subject"] = subject
-        message.attach(MIMEText(body, "html"))
-
-        smtp = aiosmtplib.SMTP(
-            hostname="smtp.gmail.com",
-            port=465,
-            use_tls=True,      #  TLS FROM START
-            timeout=30,
+# Shared by every notification. Both are built on first use, so importing
+# this module does not read settings; the pool is closed from the app
+# lifespan on shutdown
+smtp_pool: Optional[SMTPConnectionPool] = None
+smtp_breaker: Optional[CircuitBreaker] = None
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """The process-wide SMTP connection pool, created from settings once"""
+    global smtp_pool
+    if smtp_pool is None:
+        smtp_pool = SMTPConnectionPool(
+            hostname=settings.SMTP_SERVER,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USER,
+            password=settings.SMTP_PASSWORD,
+            use_tls=settings.SMTP_USE_TLS,
+            timeout=settings.SMTP_TIMEOUT,
+            size=settings.SMTP_POOL_SIZE,
+            max_messages_per_connection=settings.SMTP_POOL_MAX_MESSAGES_PER_CONNECTION,
+            idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT_SECONDS,
+            health_check_after=settings.SMTP_POOL_HEALTH_CHECK_AFTER_SECONDS,
+        )
+    return smtp_pool
+
+
+def get_smtp_breaker() -> CircuitBreaker:
+    """
+    The SMTP circuit breaker, created from settings once. It stops requests
+    from waiting on SMTP timeouts while the relay is down.
+    """
+    global smtp_breaker
+    if smtp_breaker is None:
+        smtp_breaker = CircuitBreaker(
+            "smtp",
+            failure_threshold=settings.SMTP_BREAKER_FAILURE_THRESHOLD,
+            window_seconds=settings.SMTP_BREAKER_WINDOW_SECONDS,
+            reset_timeout=settings.SMTP_BREAKER_RESET_TIMEOUT_SECONDS,
         )
+    return smtp_breaker
+
+
+async def close_smtp_pool():
+    """Close the pool's idle connections, if the pool was ever used (app shutdown)"""
+    if smtp_pool is not None:
+        await smtp_pool.close()
 
-        await smtp.connect()
-        await smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-        await smtp.send_message(message)
-        await smtp.quit()
 
-        print(f"✅ Email sent to {to_email}")
+def _breaker_states():
+    breaker = get_smtp_breaker()
+    return {
+        (state,): int(breaker.state == state)
+        for state in (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN)
+    }
 
-    except Exception as e:
-        print("❌ EMAIL ERROR TYPE:", type(e))
-        print("❌ EMAIL ERROR:", e)
+
+def _breaker_events():
+    breaker = get_smtp_breaker()
+    return {
+        ("success",): breaker.successes,
+        ("failure",): breaker.failures,
+        ("rejected",): breaker.rejected,
+        ("opened",): breaker.times_opened,
+    }
+
+
+metrics.registry.callback_gauge(
+    "smtp_circuit_state", "1 for the SMTP circuit breaker's current state", ("state",),
+    collect=_breaker_states
+)
+metrics.registry.callback_counter(
+    "smtp_circuit_events", "SMTP circuit breaker counters since startup", ("event",),
+    collect=_breaker_events
+)
+metrics.registry.callback_counter(
+    "smtp_pool_connections_opened", "SMTP connections opened by the pool since startup",
+    collect=lambda: {(): smtp_pool.connections_opened if smtp_pool is not None else 0}
+)
+
+
+async def send_email(to_email: str, subject: str, body: str) -> bool:
+    """
+    Send an HTML email through the pool and the circuit breaker. Errors are
+    logged, not raised.
+    
+    Returns:
+        True if the relay accepted the message; False if it failed after
+        the retries, was rejected or was skipped because the circuit is open
+    """
+    message = MIMEMultipart("alternative")
+    message["From"] = settings.FROM_EMAIL
+    message["To"] = to_email
+    message["Subject"] = subject
+    message.attach(MIMEText(body, "html"))
+
+    pool = get_smtp_pool()
+    breaker = get_smtp_breaker()
+    start = time.perf_counter()
+    outcome = "failed"
+    try:
+        # Connection failures are retried with backoff; once the breaker opens
+        # the remaining attempts are skipped. Each attempt opens at most one
+        # connection (the pool only reconnects for a dropped pooled one), so
+        # the breaker sees every connect that fails
+        for attempt in range(settings.SMTP_SEND_RETRIES + 1):
+            try:
+                await breaker.call(pool.send_message, message)
+                outcome = "sent"
+                logger.info("Email sent", extra={"to": to_email})
+                return True
+            except CircuitOpenError as e:
+                outcome = "skipped"
+                logger.warning("Email skipped: %s", e, extra={"to": to_email})
+                return False
+            except breaker.failure_exceptions as e:
+                if attempt == settings.SMTP_SEND_RETRIES:
+                    logger.error(
+                        "Email failed after %d attempts: %s", attempt + 1, e,
+                        extra={"to": to_email, "error_type": type(e).__name__}
+                    )
+                    return False
+                await asyncio.sleep(settings.SMTP_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+            except Exception as e:
+                logger.error("Email failed: %s", e, extra={"to": to_email, "error_type": type(e).__name__})
+                return False
+    finally:
+        metrics.smtp_send_duration.labels(outcome).observe(time.perf_counter() - start)
 
 
-async def notify_task_assigned(user_email: str, task_name: str, admin_email: str):
+async def notify_task_assigned(user_email: str, task_name: str, admin_email: str) -> bool:
     subject = f"New Task Assigned: {task_name}"
     body = f"""
     <html>
@@ -45,10 +154,10 @@ async def notify_task_assigned(user_email: str, task_name: str, admin_email: str
     </body>
     </html>
     """
-    await send_email(user_email, subject, body)
+    return await send_email(user_email, subject, body)
 
 
-async def notify_task_completed(admin_email: str, task_name: str, user_email: str):
+async def notify_task_completed(admin_email: str, task_name: str, user_email: str) -> bool:
     subject = f"Task Completed: {task_name}"
     body = f"""
     <html>
@@ -61,4 +170,4 @@ async def notify_task_completed(admin_email: str, task_name: str, user_email: st
     </body>
     </html>
     """
-    await send_email(admin_email, subject, body)
+    return await send_email(admin_email, subject, body)
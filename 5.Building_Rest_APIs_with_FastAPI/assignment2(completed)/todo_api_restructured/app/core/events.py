@@ -0,0 +1,302 @@
+"""
+In-process publish/subscribe for live updates (the task stream endpoints).
+
+Publishers call broker.publish(channel, message) with an already encoded
+string; every open Subscription to that channel in this process gets it.
+Which processes a message reaches depends on the broker:
+
+- MemoryBroker: this process only. Enough for a single worker.
+- UnixSocketBroker: every worker on the host. Each worker binds a
+  datagram socket in a shared, private directory and publish() sends the
+  message to every other socket there, so no separate broker service is
+  needed. A local stand-in for Redis/NATS pub/sub when running
+  serve.py --workers.
+
+Other brokers (e.g. one backed by Redis) subclass Broker, override
+start/stop/publish and hand received messages to deliver(); select them
+with EVENT_BROKER="package.module:ClassName".
+
+publish() never blocks: a subscriber that falls more than `queue_size`
+messages behind has its backlog dropped and gets RESET instead, which
+tells the client to refetch rather than trust the stream.
+"""
+import asyncio
+import importlib
+import json
+import logging
+import os
+import socket
+import stat
+import tempfile
+import time
+from typing import Dict, List, Optional, Set
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Sent in place of the messages a slow subscriber missed
+RESET = json.dumps({"type": "stream.reset"})
+
+# Largest datagram UnixSocketBroker sends or reads; a bigger message
+# reaches other workers' subscribers as RESET
+MAX_DATAGRAM_BYTES = 65536
+
+event_subscribers = metrics.registry.gauge(
+    "event_subscribers", "Open live-update subscriptions in this process"
+)
+events_published = metrics.registry.counter(
+    "events_published", "Messages published to the event broker"
+)
+events_dropped = metrics.registry.counter(
+    "events_dropped", "Messages not delivered, by reason", ("reason",)
+)
+
+
+class Subscription:
+    """
+    Messages published to one channel since subscribing, in order.
+
+    Use as an async context manager (or call close()) so the broker stops
+    delivering to it; iterate it or await get() for the next message.
+    """
+
+    def __init__(self, broker: "Broker", channel: str, queue_size: int):
+        self.broker = broker
+        self.channel = channel
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def put(self, message: str):
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            events_dropped.labels("slow_subscriber").inc(self._queue.qsize())
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESET)
+
+    async def get(self) -> str:
+        return await self._queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        return await self.get()
+
+
+class Broker:
+    """
+    Base broker: keeps this process's subscriptions and delivers to them.
+
+    publish() and deliver() must be called from the event loop thread.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+
+    async def start(self):
+        """Called from the app lifespan, on the event loop that serves requests"""
+
+    async def stop(self):
+        """Called from the app lifespan on shutdown"""
+
+    def publish(self, channel: str, message: str):
+        events_published.inc()
+        self.deliver(channel, message)
+
+    def deliver(self, channel: str, message: str):
+        """Hand a message to this process's subscribers of `channel`"""
+        for subscription in list(self._subscriptions.get(channel, ())):
+            subscription.put(message)
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel, self.queue_size)
+        self._subscriptions.setdefault(channel, set()).add(subscription)
+        event_subscribers.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscriptions.get(subscription.channel)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscriptions[subscription.channel]
+        event_subscribers.dec()
+
+
+class MemoryBroker(Broker):
+    """Delivers to subscribers in this process only"""
+
+
+class UnixSocketBroker(Broker):
+    """
+    Fans messages out to every worker on the host through Unix datagram
+    sockets in `socket_dir` (one per process, named after its pid).
+
+    `socket_dir` is created with mode 0700 and must be owned by this user
+    and closed to everyone else, since any process that can write to it
+    could inject events. The list of peer sockets is read at most every
+    `peer_refresh_seconds`, so a worker that just started may miss the
+    events published in its first moments.
+
+    Sockets left behind by workers that died are removed the first time a
+    send to them is refused. Datagrams are never retried: a message a peer
+    has no buffer space for is dropped and counted, like a slow subscriber.
+    A message over MAX_DATAGRAM_BYTES is sent to other workers as RESET.
+    """
+
+    def __init__(self, socket_dir: Optional[str] = None, queue_size: int = 100, peer_refresh_seconds: float = 1.0):
+        super().__init__(queue_size)
+        self.socket_dir = socket_dir or default_socket_dir()
+        self.peer_refresh_seconds = peer_refresh_seconds
+        self.path: Optional[str] = None
+        self._sock: Optional[socket.socket] = None
+        self._peers: List[str] = []
+        self._peers_listed_at: Optional[float] = None
+
+    async def start(self):
+        ensure_private_dir(self.socket_dir)
+        self.path = os.path.join(self.socket_dir, f"{os.getpid()}.sock")
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.setblocking(False)
+        asyncio.get_running_loop().add_reader(self._sock.fileno(), self._receive)
+
+    async def stop(self):
+        if self._sock is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def publish(self, channel: str, message: str):
+        super().publish(channel, message)
+        if self._sock is None:
+            return
+        datagram = json.dumps([channel, message]).encode()
+        if len(datagram) > MAX_DATAGRAM_BYTES:
+            logger.warning("Event of %d bytes is too large for other workers, sending a reset", len(datagram))
+            events_dropped.labels("too_large").inc()
+            datagram = json.dumps([channel, RESET]).encode()
+        for peer in self._list_peers():
+            try:
+                self._sock.sendto(datagram, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Its worker is gone
+                self._peers.remove(peer)
+                try:
+                    os.unlink(peer)
+                except FileNotFoundError:
+                    pass
+            except OSError:
+                events_dropped.labels("peer_unavailable").inc()
+
+    def _list_peers(self) -> List[str]:
+        """The other workers' sockets, re-read from socket_dir when the cached list is old"""
+        now = time.monotonic()
+        if self._peers_listed_at is None or now - self._peers_listed_at >= self.peer_refresh_seconds:
+            self._peers = [
+                os.path.join(self.socket_dir, name)
+                for name in os.listdir(self.socket_dir)
+                if name.endswith(".sock") and os.path.join(self.socket_dir, name) != self.path
+            ]
+            self._peers_listed_at = now
+        return list(self._peers)
+
+    def _receive(self):
+        while True:
+            try:
+                datagram = self._sock.recv(MAX_DATAGRAM_BYTES)
+            except BlockingIOError:
+                return
+            try:
+                channel, message = json.loads(datagram)
+            except ValueError:
+                logger.warning("Ignoring malformed event datagram")
+                continue
+            self.deliver(channel, message)
+
+
+def default_socket_dir() -> str:
+    """$XDG_RUNTIME_DIR/todo-api-events, or a per-user directory in the temp dir"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "todo-api-events")
+    return os.path.join(tempfile.gettempdir(), f"todo-api-events-{os.getuid()}")
+
+
+def ensure_private_dir(path: str):
+    """
+    Create `path` with mode 0700 if needed, and check it is a directory
+    owned by this user that no one else can use.
+
+    Raises:
+        PermissionError: If it is a symlink, is owned by another user or
+        is open to group/others
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"Event socket directory {path} is not a directory")
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"Event socket directory {path} is owned by uid {info.st_uid}, not {os.getuid()}")
+    if info.st_mode & 0o077:
+        raise PermissionError(
+            f"Event socket directory {path} has mode {stat.S_IMODE(info.st_mode):o}; it must be 0700"
+        )
+
+
+BROKERS = {
+    "memory": MemoryBroker,
+    "unix": UnixSocketBroker,
+}
+
+
+def create_broker(name: str) -> Broker:
+    """
+    Build the broker named by EVENT_BROKER.
+
+    Args:
+        name: "memory", "unix" or "package.module:ClassName" of a Broker subclass
+
+    Returns:
+        The broker; not started yet
+
+    Raises:
+        ValueError: If the name is not a known broker or importable class
+    """
+    queue_size = settings.EVENT_QUEUE_SIZE
+    if name == "unix":
+        return UnixSocketBroker(settings.EVENT_BROKER_SOCKET_DIR, queue_size)
+    if name in BROKERS:
+        return BROKERS[name](queue_size)
+    module_name, _, class_name = name.partition(":")
+    try:
+        broker_class = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError, ValueError) as exc:
+        raise ValueError(f"Unknown EVENT_BROKER {name!r}") from exc
+    return broker_class(queue_size=queue_size)
+
+
+# Shared by the publishers and the stream endpoints; started and stopped
+# from the app lifespan
+broker = create_broker(settings.EVENT_BROKER)
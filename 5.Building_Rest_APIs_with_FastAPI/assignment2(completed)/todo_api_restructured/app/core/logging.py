@@ -0,0 +1,124 @@
+"""
+Non-blocking structured logging.
+
+Every record goes through a QueueHandler into an in-process queue; a
+QueueListener thread formats it as one JSON line and writes it to stdout.
+The event loop only pays for building the record and a queue put, so a
+slow or blocked stdout (a full pipe, a slow log driver) no longer stalls
+requests.
+
+Levels come from LOG_LEVEL (root) and LOG_LEVELS, a comma separated list
+of per-logger overrides, e.g. "app.core.email=DEBUG,uvicorn.access=WARNING".
+
+Call start_logging() in each worker process after it starts (threads do
+not survive fork) and stop_logging() on shutdown to flush the queue.
+"""
+import copy
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, `extra` fields, exception"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _NonFormattingQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stdlib version formats the record in the logging thread (it must,
+    for queues that pickle); here the queue is in-process, so only the
+    message is resolved eagerly (its args could change later) and the
+    JSON/traceback formatting happens off the event loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """"app.core.email=DEBUG, uvicorn.access=warning" -> {"app.core.email": "DEBUG", ...}"""
+    levels = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, level = item.partition("=")
+        if not level.strip():
+            raise ValueError(f"LOG_LEVELS entry {item.strip()!r} should look like logger=LEVEL")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def start_logging(level: str = "INFO", module_levels: str = "", json_format: bool = True,
+                  stream=None) -> QueueListener:
+    """
+    Route the root logger through a queue to a listener thread.
+
+    Args:
+        level: Root level
+        module_levels: Per-logger overrides, see parse_levels()
+        json_format: JSON lines; False for plain "time level logger: message"
+        stream: Output stream, default sys.stdout
+
+    Returns:
+        The started listener (also stopped by stop_logging())
+    """
+    global _listener, _queue_handler
+    stop_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(
+        JSONFormatter() if json_format
+        else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    records = queue.SimpleQueue()
+    _queue_handler = _NonFormattingQueueHandler(records)
+    _listener = QueueListener(records, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper())
+    for name, module_level in parse_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Flush queued records and detach the queue handler"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
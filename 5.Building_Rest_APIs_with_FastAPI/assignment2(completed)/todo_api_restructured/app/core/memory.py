@@ -0,0 +1,226 @@
+"""
+Heap tracking with tracemalloc, driven from the /internal/memory endpoints.
+
+start() begins tracing and keeps a baseline snapshot; snapshot() takes a
+new one and diffs it against the baseline (or the previous snapshot),
+grouping allocations by module or by source line. When grouping by
+module, each allocation is charged to the innermost frame inside the app
+package that led to it, so memory allocated inside SQLAlchemy or Jinja on
+behalf of an endpoint shows up under that endpoint's module.
+
+Optionally the peak traced memory of each task listing request is
+recorded (see app.middleware.memory). tracemalloc's peak is process
+wide, so requests that overlap inflate each other's figures.
+
+tracemalloc only sees allocations made through Python's allocator:
+Argon2's working memory (malloc'd by libargon2) and other C library
+buffers appear in RSS but not here, which is why status() reports both.
+"""
+import os
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_ROOT = os.path.dirname(APP_ROOT)
+
+# GET routes whose per-request peak is recorded while request tracking is on
+TRACKED_ROUTES = ("/api/admin/tasks", "/api/user/tasks")
+
+_baseline: Optional[tracemalloc.Snapshot] = None
+_previous: Optional[tracemalloc.Snapshot] = None
+_started_at: Optional[float] = None
+_module_names: Dict[str, str] = {}
+
+track_requests = False
+_request_peaks: Dict[str, Dict] = {}
+
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux), or None"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def module_name(filename: str) -> str:
+    """
+    "app.api.endpoints.admin" for files in the app package, otherwise the
+    top-level package or stdlib module ("sqlalchemy", "json")
+    """
+    name = _module_names.get(filename)
+    if name is not None:
+        return name
+    path = os.path.abspath(filename)
+    if path.startswith(APP_ROOT + os.sep):
+        name = os.path.splitext(os.path.relpath(path, PROJECT_ROOT))[0].replace(os.sep, ".")
+    else:
+        roots = [entry for entry in sys.path if entry and path.startswith(os.path.abspath(entry) + os.sep)]
+        if roots:
+            relative = os.path.relpath(path, os.path.abspath(max(roots, key=len)))
+            name = os.path.splitext(relative.split(os.sep)[0])[0]
+        else:
+            name = filename
+    _module_names[filename] = name
+    return name
+
+
+def status() -> Dict:
+    current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    return {
+        "tracing": tracemalloc.is_tracing(),
+        "frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else None,
+        "tracing_seconds": round(time.monotonic() - _started_at, 1) if _started_at else None,
+        "track_requests": track_requests,
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "rss_bytes": rss_bytes(),
+    }
+
+
+def start(frames: int = 10, requests: bool = False) -> Dict:
+    """
+    Start tracing (restarting if already on) and take the baseline snapshot.
+
+    Args:
+        frames: Stack frames stored per allocation; more frames attribute
+            allocations to app code better but cost more memory and time
+        requests: Also record per-request peaks for TRACKED_ROUTES
+    """
+    global _baseline, _previous, _started_at, track_requests
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    tracemalloc.start(frames)
+    _baseline = _previous = tracemalloc.take_snapshot()
+    _started_at = time.monotonic()
+    track_requests = requests
+    _request_peaks.clear()
+    return status()
+
+
+def stop() -> Dict:
+    """Stop tracing and drop the snapshots (their memory is released)"""
+    global _baseline, _previous, _started_at, track_requests
+    result = status()
+    track_requests = False
+    _baseline = _previous = None
+    _started_at = None
+    tracemalloc.stop()
+    return result
+
+
+def _filtered(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+    return snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+def _group_by_module(snapshot: tracemalloc.Snapshot, app_only: bool) -> Dict[str, List[int]]:
+    """module -> [bytes, blocks], each trace charged to its innermost app frame"""
+    groups: Dict[str, List[int]] = {}
+    for trace in snapshot.traces:
+        name = None
+        for frame in reversed(trace.traceback):  # most recent call first
+            if frame.filename.startswith(APP_ROOT):
+                name = module_name(frame.filename)
+                break
+        if name is None:
+            if app_only:
+                continue
+            name = module_name(trace.traceback[-1].filename)
+        group = groups.setdefault(name, [0, 0])
+        group[0] += trace.size
+        group[1] += 1
+    return groups
+
+
+def snapshot(group_by: str = "module", compare_to: str = "baseline", app_only: bool = True,
+             limit: int = 20) -> Dict:
+    """
+    Take a snapshot and diff it against the baseline or previous snapshot.
+
+    Args:
+        group_by: "module" (innermost app module) or "line" (allocating line)
+        compare_to: "baseline" (taken by start()) or "previous" (last snapshot)
+        app_only: Only allocations with an app frame on their stack
+        limit: Number of groups to return, largest growth first
+
+    Raises:
+        RuntimeError: If tracing is not on
+    """
+    global _previous
+    if not tracemalloc.is_tracing() or _baseline is None:
+        raise RuntimeError("tracemalloc is not running; start it first")
+    reference = _baseline if compare_to == "baseline" else _previous
+    current = _filtered(tracemalloc.take_snapshot())
+    reference = _filtered(reference)
+    _previous = current
+
+    if group_by == "line":
+        stats = current.compare_to(reference, "lineno")
+        if app_only:
+            stats = [stat for stat in stats if stat.traceback[-1].filename.startswith(APP_ROOT)]
+        top = [
+            {
+                "site": f"{os.path.relpath(stat.traceback[-1].filename, PROJECT_ROOT)}:{stat.traceback[-1].lineno}",
+                "size_bytes": stat.size,
+                "size_diff_bytes": stat.size_diff,
+                "blocks": stat.count,
+                "blocks_diff": stat.count_diff,
+            }
+            for stat in stats[:limit]
+        ]
+    else:
+        now, before = _group_by_module(current, app_only), _group_by_module(reference, app_only)
+        rows: List[Tuple[str, int, int, int, int]] = [
+            (name, size, size - before.get(name, [0, 0])[0], count, count - before.get(name, [0, 0])[1])
+            for name, (size, count) in now.items()
+        ]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        top = [
+            {"site": name, "size_bytes": size, "size_diff_bytes": size_diff,
+             "blocks": count, "blocks_diff": count_diff}
+            for name, size, size_diff, count, count_diff in rows[:limit]
+        ]
+    return {**status(), "group_by": group_by, "compare_to": compare_to, "top": top}
+
+
+def begin_request() -> int:
+    """Reset the peak before a tracked request; returns the traced size at its start"""
+    tracemalloc.reset_peak()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def finish_request(route: str, start_bytes: int) -> None:
+    if not tracemalloc.is_tracing():
+        return
+    peak = tracemalloc.get_traced_memory()[1] - start_bytes
+    stats = _request_peaks.setdefault(route, {"requests": 0, "total": 0, "max": 0, "last": 0})
+    stats["requests"] += 1
+    stats["total"] += peak
+    stats["last"] = peak
+    stats["max"] = max(stats["max"], peak)
+
+
+def request_peaks() -> Dict:
+    """Per-route peak memory of tracked requests, in bytes"""
+    return {
+        "track_requests": track_requests,
+        "routes": {
+            route: {
+                "requests": stats["requests"],
+                "avg_peak_bytes": stats["total"] // stats["requests"],
+                "max_peak_bytes": stats["max"],
+                "last_peak_bytes": stats["last"],
+            }
+            for route, stats in _request_peaks.items()
+        },
+    }
@@ -0,0 +1,278 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Counters, gauges and histograms are plain objects updated without locks:
+every update is a few attribute/list increments made from the event loop
+thread (or under the GIL from a worker thread), and a scrape only reads
+them. A scrape racing an update may see a histogram's _sum one
+observation ahead of its _count, which Prometheus tolerates.
+
+Children for each label combination are created on first use and cached,
+so recording a sample allocates nothing after warm-up. Values that
+already live elsewhere (DB pool, SMTP breaker) are collected by
+callbacks at scrape time instead of being mirrored on every change.
+
+Each worker process has its own registry; scrape every worker (or run
+one worker) when comparing totals.
+"""
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Starlette appends "; charset=utf-8" to text/ responses
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds; suits both API requests and SMTP sends
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    kind = ""
+    # Appended to the name of the samples and, as the text format requires,
+    # of the HELP/TYPE lines ("_total" for counters)
+    _suffix = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    @abstractmethod
+    def _new_child(self):
+        """Value object for one label combination"""
+
+    def labels(self, *values: str):
+        """Child for one label combination, created on first use"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Sample lines of the exposition format"""
+
+    def render(self) -> List[str]:
+        family = self.name + self._suffix
+        return [f"# HELP {family} {self.documentation}", f"# TYPE {family} {self.kind}", *self._samples()]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _ValueMetric(_Metric):
+    """A single number per label combination"""
+
+    def _new_child(self):
+        return _Value()
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._suffix}{_label_text(self.labelnames, values)} {_format_value(child.value)}"
+            for values, child in list(self._children.items())
+        ]
+
+
+class Counter(_ValueMetric):
+    """Monotonically increasing count; use .labels(...).inc() or .inc() when unlabelled"""
+    kind = "counter"
+    _suffix = "_total"
+
+    def inc(self, amount: float = 1):
+        self._children[()].value += amount
+
+
+class Gauge(_ValueMetric):
+    """Value that goes up and down (in-flight requests, hashes in progress)"""
+    kind = "gauge"
+
+    def inc(self, amount: float = 1):
+        self._children[()].value += amount
+
+    def dec(self, amount: float = 1):
+        self._children[()].value -= amount
+
+    def set(self, value: float):
+        self._children[()].value = value
+
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # One slot per bucket plus +Inf; made cumulative when rendered
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (seconds) in fixed buckets"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), list(child.counts)):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, values, le)} {cumulative}")
+            labels = _label_text(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _CallbackMetric(_Metric):
+    """
+    Metric whose samples are read from `collect` at scrape time. `collect`
+    returns {label values tuple: value}; an exception or None skips it.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 collect: Optional[Callable[[], Optional[Dict[Tuple[str, ...], float]]]] = None):
+        self.collect = collect
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return None
+
+    def _samples(self) -> List[str]:
+        try:
+            values = self.collect() if self.collect else None
+        except Exception:
+            values = None
+        return [
+            f"{self.name}{self._suffix}{_label_text(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in (values or {}).items()
+        ]
+
+
+class CallbackGauge(_CallbackMetric):
+    """Gauge read at scrape time (e.g. pool connections in use)"""
+    kind = "gauge"
+
+
+class CallbackCounter(_CallbackMetric):
+    """Totals that only go up, kept elsewhere and read at scrape time (e.g. breaker counters)"""
+    kind = "counter"
+    _suffix = "_total"
+
+
+class Registry:
+    """Ordered collection of metrics rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback_gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                       collect: Optional[Callable] = None) -> CallbackGauge:
+        return self.register(CallbackGauge(name, documentation, labelnames, collect))
+
+    def callback_counter(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                         collect: Optional[Callable] = None) -> CallbackCounter:
+        return self.register(CallbackCounter(name, documentation, labelnames, collect))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# HTTP (recorded by app.middleware.metrics.MetricsMiddleware)
+http_requests = registry.counter(
+    "http_requests", "Requests handled, by route template and status code", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time from receiving a request to finishing its response", ("method", "route")
+)
+http_requests_in_progress = registry.gauge("http_requests_in_progress", "Requests currently being handled")
+
+# Password hashing (app.core.security). Request handlers run Argon2 in
+# worker threads, at most ARGON2_MAX_CONCURRENCY at once; the queue depth
+# is the number of requests waiting for one of those slots
+argon2_in_progress = registry.gauge("argon2_operations_in_progress", "Argon2 hash/verify calls in progress")
+argon2_queue_depth = registry.gauge(
+    "argon2_queue_depth", "Argon2 hash/verify calls waiting for a free slot"
+)
+argon2_duration = registry.histogram(
+    "argon2_duration_seconds", "Time spent in one Argon2 hash or verify", ("operation",)
+)
+
+# Outgoing email (app.core.email)
+smtp_send_duration = registry.histogram(
+    "smtp_send_duration_seconds", "Time to send one email including retries, by outcome", ("outcome",)
+)
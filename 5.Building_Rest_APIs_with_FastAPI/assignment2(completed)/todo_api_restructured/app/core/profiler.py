@@ -0,0 +1,104 @@
+"""
+Sampling profiler for a single thread.
+
+A background thread reads the target thread's current Python stack
+(sys._current_frames) every `interval` seconds and counts identical
+stacks. Each sample is weighted by the time since the previous one: while
+the target holds the GIL the sampler only gets to run every
+sys.getswitchinterval() (5 ms by default), so fixed weights would
+under-count busy code.
+
+Reports:
+- collapsed(): "outer;inner;leaf <ms>" lines, for flamegraph.pl / speedscope
+- speedscope(): speedscope's JSON file format (https://www.speedscope.app)
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        # co_qualname (Class.method) is Python 3.11+; older ones get the bare name
+        stack.append((getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _label(frame: Frame) -> str:
+    name, filename, line = frame
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class StackSampler:
+    """Samples one thread's stack until stop(); use as a context manager"""
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        start = previous = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.samples[_stack(frame)] += now - previous
+            previous = now
+        self.duration = time.perf_counter() - start
+
+    def collapsed(self) -> str:
+        """One line per distinct stack, root first, with milliseconds"""
+        return "".join(
+            f"{';'.join(_label(frame) for frame in stack)} {weight * 1000:.3f}\n"
+            for stack, weight in self.samples.most_common()
+        )
+
+    def speedscope(self, name: str) -> dict:
+        """A speedscope "sampled" profile in milliseconds"""
+        frames: List[Frame] = []
+        index: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, weight in self.samples.items():
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append(frame)
+            samples.append([index[frame] for frame in stack])
+            weights.append(round(weight * 1000, 3))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "todo-api stack sampler",
+            "name": name,
+            "activeProfileIndex": 0,
+            "shared": {"frames": [{"name": f, "file": path, "line": line} for f, path, line in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
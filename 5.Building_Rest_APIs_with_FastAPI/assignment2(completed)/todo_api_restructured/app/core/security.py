@@ -1,13 +1,82 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Optional
+
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 
+from app.core import metrics, timing
+from app.core.config import settings
+
 # Initialize Argon2 password hasher
 ph = PasswordHasher()
 
+# Bounds the Argon2 calls running at once in this process; created on
+# first use, on the loop that serves requests
+_slots: Optional[asyncio.Semaphore] = None
+_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _check_length(password: str):
+    if len(password) < 8:
+        raise ValueError("Password must be at least 8 characters")
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    try:
+        ph.verify(hashed_password, plain_password)
+        return True
+    except (VerifyMismatchError, Exception):
+        return False
+
+
+@contextmanager
+def _measured(operation: str):
+    """Count the enclosed Argon2 call as in progress and record its duration"""
+    metrics.argon2_in_progress.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.argon2_duration.labels(operation).observe(elapsed)
+        timing.add("auth", elapsed)
+        metrics.argon2_in_progress.dec()
+
+
+def _semaphore() -> asyncio.Semaphore:
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if loop is not _slots_loop:
+        _slots = asyncio.Semaphore(settings.ARGON2_MAX_CONCURRENCY)
+        _slots_loop = loop
+    return _slots
+
+
+async def _run_bounded(operation: str, func, *args):
+    """
+    Run an Argon2 call in a worker thread, at most ARGON2_MAX_CONCURRENCY
+    at a time. Callers waiting for a slot are counted in
+    argon2_queue_depth; only the call itself is timed.
+    """
+    slots = _semaphore()
+    metrics.argon2_queue_depth.inc()
+    try:
+        await slots.acquire()
+    finally:
+        metrics.argon2_queue_depth.dec()
+    try:
+        with _measured(operation):
+            return await asyncio.to_thread(func, *args)
+    finally:
+        slots.release()
+
 
 def hash_password(password: str) -> str:
     """
-    Hash password using Argon2.
+    Hash password using Argon2, in the calling thread. Request handlers
+    use hash_password_async() so the event loop is not blocked.
     
     Args:
         password: Plain text password
@@ -18,14 +87,15 @@ def hash_password(password: str) -> str:
     Raises:
         ValueError: If password is too short
     """
-    if len(password) < 8:
-        raise ValueError("Password must be at least 8 characters")
-    return ph.hash(password)
+    _check_length(password)
+    with _measured("hash"):
+        return ph.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Verify password against hash.
+    Verify password against hash, in the calling thread. Request handlers
+    use verify_password_async() so the event loop is not blocked.
     
     Args:
         plain_password: Plain text password
@@ -34,8 +104,21 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
-    try:
-        ph.verify(hashed_password, plain_password)
-        return True
-    except (VerifyMismatchError, Exception):
-        return False
+    with _measured("verify"):
+        return _verify(plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    hash_password() in a worker thread, bounded by ARGON2_MAX_CONCURRENCY.
+    
+    Raises:
+        ValueError: If password is too short
+    """
+    _check_length(password)
+    return await _run_bounded("hash", ph.hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() in a worker thread, bounded by ARGON2_MAX_CONCURRENCY"""
+    return await _run_bounded("verify", _verify, plain_password, hashed_password)
@@ -0,0 +1,191 @@
+import asyncio
+import ssl
+from collections import deque
+from email.message import Message
+from typing import Optional
+
+import aiosmtplib
+
+
+class _PooledConnection:
+    """An open SMTP session plus the bookkeeping the pool needs"""
+    __slots__ = ("smtp", "messages_sent", "last_used")
+    
+    def __init__(self, smtp: aiosmtplib.SMTP, now: float):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = now
+
+
+class SMTPConnectionPool:
+    """
+    Keeps authenticated SMTP connections open between sends.
+    
+    - At most `size` connections exist; extra senders wait for one.
+    - Idle connections are reused most-recently-used first. One that sat
+      idle for `health_check_after` seconds is checked with NOOP before
+      reuse, and one idle for `idle_timeout` seconds is closed.
+    - A connection is retired after `max_messages_per_connection` sends.
+    - A connection whose send or health check fails or is cancelled is
+      closed, never returned to the pool.
+    - `tls_context` replaces the default certificate checks for
+      `use_tls` and STARTTLS (e.g. a relay signed by a private CA).
+    - If a send over a reused connection fails because the connection
+      dropped, it is retried once on a fresh connection. A send that
+      opened its own connection is not retried, so one send_message()
+      opens at most one connection and callers' retry budgets hold.
+    """
+    
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        timeout: float = 30,
+        size: int = 4,
+        max_messages_per_connection: int = 100,
+        idle_timeout: float = 60,
+        health_check_after: float = 5,
+        tls_context: Optional[ssl.SSLContext] = None
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.size = size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.tls_context = tls_context
+        
+        self._idle = deque()
+        self._semaphore = None
+        self._loop = None
+        self.connections_opened = 0
+    
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Connections and the semaphore belong to one event loop. If the
+        pool is used from a new loop (tests, a restarted worker) the old
+        state is dropped rather than reused.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            for connection in self._idle:
+                connection.smtp.close()
+            self._idle.clear()
+            self._semaphore = asyncio.Semaphore(self.size)
+            self._loop = loop
+        return loop
+    
+    async def _connect(self) -> _PooledConnection:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.use_tls,
+            tls_context=self.tls_context,
+            timeout=self.timeout
+        )
+        ready = False
+        try:
+            await smtp.connect()
+            if self.username:
+                # Extensions are only known after EHLO; skip AUTH on servers
+                # that don't offer it (e.g. a local sink)
+                if smtp.is_ehlo_or_helo_needed:
+                    await smtp.ehlo()
+                if smtp.supports_extension("auth"):
+                    await smtp.login(self.username, self.password)
+            ready = True
+        finally:
+            if not ready:
+                # Failed or cancelled half way through: don't leak the socket
+                smtp.close()
+        self.connections_opened += 1
+        return _PooledConnection(smtp, self._loop.time())
+    
+    async def _discard(self, connection: _PooledConnection, graceful: bool = True):
+        """Close a connection, with QUIT when `graceful`; closed even if cancelled"""
+        try:
+            if graceful and connection.smtp.is_connected:
+                await connection.smtp.quit()
+        except Exception:
+            pass
+        finally:
+            connection.smtp.close()
+    
+    async def _acquire(self) -> _PooledConnection:
+        now = self._loop.time()
+        while self._idle:
+            connection = self._idle.pop()
+            idle_for = now - connection.last_used
+            if not connection.smtp.is_connected or idle_for >= self.idle_timeout:
+                await self._discard(connection)
+                continue
+            if idle_for >= self.health_check_after:
+                healthy = False
+                try:
+                    await connection.smtp.noop()
+                    healthy = True
+                except Exception:
+                    pass
+                finally:
+                    # Failed, or cancelled mid-NOOP: the session is in an
+                    # unknown state and is not pooled again
+                    if not healthy:
+                        connection.smtp.close()
+                if not healthy:
+                    continue
+            return connection
+        return await self._connect()
+    
+    async def _release(self, connection: _PooledConnection):
+        connection.messages_sent += 1
+        connection.last_used = self._loop.time()
+        if connection.messages_sent >= self.max_messages_per_connection:
+            await self._discard(connection)
+        else:
+            self._idle.append(connection)
+    
+    async def send_message(self, message: Message):
+        """
+        Send a message over a pooled connection.
+        
+        Raises:
+            aiosmtplib.SMTPException / OSError: If connecting fails, the
+            send still fails after replacing a dropped pooled connection,
+            or the server rejects the message
+        """
+        self._bind_loop()
+        async with self._semaphore:
+            connection = await self._acquire()
+            # Taken from the idle list rather than opened just now
+            reused = connection.messages_sent > 0
+            sent = False
+            try:
+                try:
+                    await connection.smtp.send_message(message)
+                except OSError:
+                    if not reused:
+                        raise
+                    # A pooled connection the server dropped: reconnect once
+                    connection.smtp.close()
+                    connection = await self._connect()
+                    await connection.smtp.send_message(message)
+                sent = True
+            finally:
+                if not sent:
+                    # Failed or cancelled (e.g. a caller's timeout): the
+                    # session may be mid-message, so it cannot go back to
+                    # the pool
+                    connection.smtp.close()
+            await self._release(connection)
+    
+    async def close(self):
+        """Close idle connections (called on application shutdown)"""
+        while self._idle:
+            await self._discard(self._idle.pop())
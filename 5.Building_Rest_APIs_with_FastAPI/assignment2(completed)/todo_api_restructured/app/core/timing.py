@@ -0,0 +1,117 @@
+"""
+Per-request timing spans for the Server-Timing header.
+
+ServerTimingMiddleware starts a RequestTimings for each request in a
+context variable; code on the request path adds to it with span() or
+add(). Durations with the same name are summed, and spans may nest (the
+"auth" span includes the query that loads the user, which is also in
+"db"), so they are a breakdown to read side by side, not parts of a sum.
+
+Spans recorded:
+- auth: token check and user lookup, Argon2 hash/verify
+- db: every SQL statement (from the engine hooks in app.db.session)
+- serialize: from the endpoint returning to the response being built
+  (response_model validation and JSON encoding), see TimedRoute
+- email: notification fan-out awaited by the request
+- total: added by the middleware
+"""
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from fastapi.routing import APIRoute
+
+
+class RequestTimings:
+    """Summed span durations (seconds) for one request"""
+    __slots__ = ("spans", "endpoint_done")
+
+    def __init__(self):
+        self.spans: Dict[str, float] = {}
+        self.endpoint_done = 0.0
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def header_value(self) -> str:
+        """Server-Timing value, e.g. "auth;dur=1.20, db;dur=0.85" (milliseconds)"""
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.spans.items())
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def begin_request() -> tuple:
+    """Start recording spans for a request; returns (timings, token) for finish_request"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish_request(token) -> None:
+    _current.reset(token)
+
+
+def add(name: str, seconds: float) -> None:
+    """Add a measured duration to the current request, if there is one"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as `name` for the current request"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that records the "serialize" span: the time between the
+    endpoint returning and FastAPI finishing the response (response_model
+    validation, jsonable_encoder and JSON rendering).
+
+    Use as APIRouter(route_class=TimedRoute). Only async endpoints are
+    timed; sync ones run in the threadpool and get no serialize span.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = _mark_when_done(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timings = _current.get()
+            if timings is not None and timings.endpoint_done:
+                timings.add("serialize", time.perf_counter() - timings.endpoint_done)
+            return response
+
+        return timed_handler
+
+
+def _mark_when_done(endpoint):
+    # functools.wraps keeps the signature FastAPI reads parameters from
+    @functools.wraps(endpoint)
+    async def timed_endpoint(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            timings = _current.get()
+            if timings is not None:
+                timings.endpoint_done = time.perf_counter()
+
+    return timed_endpoint
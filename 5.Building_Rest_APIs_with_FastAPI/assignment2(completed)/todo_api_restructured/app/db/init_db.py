@@ -1,13 +1,13 @@
 from app.db.base_class import Base
-from app.db.session import engine
 from app.models.user import User
-from app.models.task import Task
+from app.models.task import Task, TaskArchive
+from app.models.idempotency import IdempotencyKey
 
 
-def init_db():
-    pass # Alembic will handle database initialization and migrations
+def init_db(engine):
     """
-    Initialize database tables.
-    Creates all tables defined in models.
+    Create any missing tables defined in models.
+    Only runs when CREATE_TABLES is set (local development); deployed
+    databases are managed by Alembic migrations.
     """
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,142 @@
+"""
+Per-request SQL statement accounting.
+
+The engine hooks in app.db.session call record_statement() for every
+cursor execution. Statements are attributed to the request running in the
+current context (set up by SQLStatsMiddleware) and rolled up per route for
+the /internal/sql-stats view.
+"""
+import logging
+import re
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestQueryStats:
+    """Statement count and DB time for one in-flight request"""
+    __slots__ = ("scope", "count", "duration")
+    
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.count = 0
+        self.duration = 0.0
+    
+    @property
+    def route_name(self) -> str:
+        """Route template (e.g. "GET /api/user/tasks/{task_id}") once routing has run"""
+        if self.scope is None:
+            return "-"
+        route = self.scope.get("route")
+        path = route.path if route is not None else self.scope.get("path", "-")
+        return f"{self.scope.get('method', '')} {path}"
+
+
+class RouteQueryTotals:
+    """Aggregated statement stats for one route"""
+    __slots__ = ("requests", "statements", "duration", "max_statements", "slow_statements")
+    
+    def __init__(self):
+        self.requests = 0
+        self.statements = 0
+        self.duration = 0.0
+        self.max_statements = 0
+        self.slow_statements = 0
+
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+_route_totals: Dict[str, RouteQueryTotals] = {}
+_slow_queries = deque(maxlen=50)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Collapse a statement to its shape so identical queries group together:
+    literals become ?, IN-lists become (?...) and whitespace is squashed.
+    """
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    return _PLACEHOLDER_LIST.sub("(?...)", statement)
+
+
+def begin_request(scope: dict) -> tuple:
+    """Start accounting for a request; returns (stats, token) for finish_request"""
+    stats = RequestQueryStats(scope)
+    return stats, _current.set(stats)
+
+
+def finish_request(stats: RequestQueryStats, token) -> None:
+    """Stop accounting for a request and fold it into the per-route totals"""
+    _current.reset(token)
+    name = stats.route_name
+    totals = _route_totals.get(name)
+    if totals is None:
+        totals = _route_totals[name] = RouteQueryTotals()
+    totals.requests += 1
+    totals.statements += stats.count
+    totals.duration += stats.duration
+    if stats.count > totals.max_statements:
+        totals.max_statements = stats.count
+
+
+def record_statement(statement: str, elapsed: float) -> None:
+    """
+    Attribute one executed statement to the current request and log it
+    if it ran longer than SQL_SLOW_QUERY_MS.
+    
+    Args:
+        statement: SQL as sent to the driver
+        elapsed: Execution time in seconds
+    """
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+    
+    elapsed_ms = elapsed * 1000
+    if elapsed_ms < settings.SQL_SLOW_QUERY_MS:
+        return
+    
+    route = stats.route_name if stats is not None else "-"
+    sql = normalize_sql(statement)
+    totals = _route_totals.get(route)
+    if totals is not None:
+        totals.slow_statements += 1
+    _slow_queries.append({"route": route, "duration_ms": round(elapsed_ms, 2), "sql": sql})
+    logger.warning("Slow query (%.1f ms) on %s: %s", elapsed_ms, route, sql)
+
+
+def get_stats() -> dict:
+    """Snapshot of per-route totals, busiest DB time first, plus recent slow queries"""
+    routes = [
+        {
+            "route": name,
+            "requests": totals.requests,
+            "statements": totals.statements,
+            "avg_statements": round(totals.statements / totals.requests, 2),
+            "max_statements": totals.max_statements,
+            "db_time_ms": round(totals.duration * 1000, 2),
+            "avg_db_time_ms": round(totals.duration * 1000 / totals.requests, 2),
+            "slow_statements": totals.slow_statements,
+        }
+        for name, totals in list(_route_totals.items())
+        if totals.requests
+    ]
+    routes.sort(key=lambda route: route["db_time_ms"], reverse=True)
+    return {"routes": routes, "slow_queries": list(_slow_queries)}
+
+
+def reset_stats() -> None:
+    """Clear the aggregated totals and the slow query log"""
+    _route_totals.clear()
+    _slow_queries.clear()
@@ -1,16 +1,88 @@
-from sqlalchemy import create_engine
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
+from app.core import metrics, timing
 from app.core.config import settings
+from app.db import query_stats
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    query_stats.record_statement(statement, elapsed)
+    timing.add("db", elapsed)
+
+
+def instrument_engine(engine):
+    """
+    Attach the SQL timing hooks to an engine. Every statement is
+    attributed to the current request (see app.db.query_stats).
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+# Created by init_engine(), normally from the app lifespan, so importing
+# this module does not touch the database
+engine = None
+
+# Create session factory (bound to the engine by init_engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+def init_engine(database_url: Optional[str] = None):
+    """
+    Create the database engine (once) and bind SessionLocal to it.
+    
+    Args:
+        database_url: Defaults to settings.DATABASE_URL
+    
+    Returns:
+        The engine
+    """
+    global engine
+    if engine is None:
+        database_url = database_url or settings.DATABASE_URL
+        engine = instrument_engine(create_engine(
+            database_url,
+            connect_args={"check_same_thread": False} if "sqlite" in database_url else {}
+        ))
+        SessionLocal.configure(bind=engine)
+    return engine
+
+
+def dispose_engine():
+    """Close pooled connections and drop the engine (app shutdown)"""
+    global engine
+    if engine is not None:
+        engine.dispose()
+        engine = None
+
+
+def _pool_metrics():
+    """Connection counts of the engine's pool, for /metrics"""
+    pool = engine.pool if engine is not None else None
+    if pool is None or not hasattr(pool, "checkedout"):
+        # e.g. SingletonThreadPool/StaticPool used for in-memory SQLite
+        return None
+    return {
+        ("size",): pool.size(),
+        ("checked_out",): pool.checkedout(),
+        ("checked_in",): pool.checkedin(),
+        ("overflow",): max(pool.overflow(), 0),
+    }
+
+
+metrics.registry.callback_gauge(
+    "db_pool_connections", "Database pool connections by state", ("state",), collect=_pool_metrics
+)
 
 
 def get_db():
@@ -18,6 +90,9 @@ def get_db():
     Dependency that provides database session.
     Automatically closes session after request.
     """
+    if engine is None:
+        # e.g. a TestClient used without running the lifespan
+        init_engine()
     db = SessionLocal()
     try:
         yield db
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+
+from app.core import metrics
+from app.db.session import SessionLocal, init_engine
+from app.services import idempotency_service
+from app.services.auth_service import decode_token
+
+logger = logging.getLogger(__name__)
+
+# POST/PUT requests under these paths honour Idempotency-Key
+IDEMPOTENT_PATHS = ("/api/admin/tasks", "/api/user/tasks")
+IDEMPOTENT_METHODS = ("POST", "PUT")
+MAX_KEY_LENGTH = 255
+
+# Expired rows are deleted at most this often, from a request that claims a key
+PURGE_INTERVAL_SECONDS = 600
+
+idempotent_requests = metrics.registry.counter(
+    "idempotent_requests", "Requests carrying an Idempotency-Key, by outcome", ("outcome",)
+)
+
+
+class IdempotencyMiddleware:
+    """
+    Idempotency-Key support for the task POST/PUT routes.
+
+    The first request with a given key (per user) runs normally and its
+    response is stored with a hash of the request for `ttl` seconds. A
+    retry with the same key and request gets the stored response back,
+    with `Idempotent-Replayed: true`, without running the handler again,
+    so a client retrying `POST /api/admin/tasks` over a flaky network
+    does not create a second task or send a second email.
+
+    - Same key, different request (method, path, query or body): 422
+    - Same key while the first request is still running in this worker:
+      waits up to `wait_timeout` for it to finish, then replays
+    - ... running in another worker process: 409 with Retry-After
+    - Only 2xx responses are stored. For a 4xx, a 5xx or a request that
+      raises the key is released, so a retry runs again: a client error
+      may not hold once the client has fixed the request or the data has
+      changed (e.g. a 404 for a task about to be created)
+
+    Requests without the header, or without a valid bearer token (which
+    the route will reject anyway), pass straight through.
+    """
+
+    def __init__(self, app, ttl: float = 86400, wait_timeout: float = 30, lock_timeout: float = 60):
+        self.app = app
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.lock_timeout = lock_timeout
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._next_purge = 0.0
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in IDEMPOTENT_METHODS
+            or not scope["path"].startswith(IDEMPOTENT_PATHS)
+        ):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                {"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"}, status_code=400
+            )
+            await response(scope, receive, send)
+            return
+        subject = self._subject(headers.get("authorization"))
+        if subject is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        key = idempotency_service.storage_key(subject, idempotency_key)
+        fingerprint = idempotency_service.request_hash(scope["method"], scope["path"], scope["query_string"], body)
+
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            first = self._in_flight.get(key)
+            if first is not None:
+                # A duplicate of a request this worker is running: wait for it, then look again
+                try:
+                    await asyncio.wait_for(asyncio.shield(first), max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    await self._conflict(scope, receive, send)
+                    return
+                continue
+
+            outcome, row = self._claim(key, fingerprint)
+            if outcome == idempotency_service.CLAIMED:
+                break
+            idempotent_requests.labels(outcome).inc()
+            if outcome == idempotency_service.REPLAY:
+                response = Response(
+                    row.response_body, status_code=row.status_code, media_type=row.content_type,
+                    headers={"Idempotent-Replayed": "true"}
+                )
+            elif outcome == idempotency_service.MISMATCH:
+                response = JSONResponse(
+                    {"detail": "Idempotency-Key was already used for a different request"}, status_code=422
+                )
+            else:
+                await self._conflict(scope, receive, send)
+                return
+            await response(scope, receive, send)
+            return
+
+        idempotent_requests.labels("executed").inc()
+        self._in_flight[key] = asyncio.get_running_loop().create_future()
+        try:
+            await self._run_and_store(scope, self._replay_body(body, receive), send, key)
+        finally:
+            self._in_flight.pop(key).set_result(None)
+
+    @staticmethod
+    def _subject(authorization: Optional[str]) -> Optional[str]:
+        """The token's user, so keys are scoped per user"""
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        try:
+            return decode_token(token)
+        except HTTPException:
+            return None
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    @staticmethod
+    def _replay_body(body: bytes, receive):
+        """receive() that hands the already-read body to the app once"""
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+        return replay
+
+    def _claim(self, key: str, fingerprint: str):
+        init_engine()
+        db = SessionLocal()
+        try:
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+                idempotency_service.purge_expired(db)
+            return idempotency_service.claim(db, key, fingerprint, self.ttl, self.lock_timeout)
+        finally:
+            db.close()
+
+    async def _run_and_store(self, scope, receive, send, key: str):
+        status_code, content_type, chunks, finished = None, None, [], False
+
+        async def capture(message):
+            nonlocal status_code, content_type, finished
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = Headers(raw=message["headers"]).get("content-type")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                finished = not message.get("more_body", False)
+            await send(message)
+
+        stored = False
+        try:
+            await self.app(scope, receive, capture)
+            if finished and 200 <= status_code < 300:
+                db = SessionLocal()
+                try:
+                    idempotency_service.complete(db, key, status_code, content_type, b"".join(chunks))
+                finally:
+                    db.close()
+                stored = True
+        finally:
+            if not stored:
+                db = SessionLocal()
+                try:
+                    idempotency_service.release(db, key)
+                except Exception:
+                    logger.exception("Could not release idempotency key")
+                finally:
+                    db.close()
+
+    async def _conflict(self, scope, receive, send):
+        idempotent_requests.labels("conflict").inc()
+        response = JSONResponse(
+            {"detail": "A request with this Idempotency-Key is still being processed"},
+            status_code=409, headers={"Retry-After": "1"}
+        )
+        await response(scope, receive, send)
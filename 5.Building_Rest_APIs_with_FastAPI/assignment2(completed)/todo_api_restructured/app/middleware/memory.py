@@ -0,0 +1,28 @@
+from app.core import memory
+
+
+class RequestMemoryMiddleware:
+    """
+    Records the peak traced memory of each task listing request while
+    request tracking is switched on (POST /api/internal/memory/start with
+    requests=true). Otherwise it is a single flag check per request.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if (
+            not memory.track_requests
+            or scope["type"] != "http"
+            or scope["method"] != "GET"
+            or scope["path"] not in memory.TRACKED_ROUTES
+        ):
+            await self.app(scope, receive, send)
+            return
+        
+        start_bytes = memory.begin_request()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            memory.finish_request(f"GET {scope['path']}", start_bytes)
@@ -0,0 +1,42 @@
+import time
+
+from app.core import metrics
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request counts, latency and in-flight
+    requests (see app.core.metrics).
+
+    Requests are labelled with the route template ("/api/user/tasks/{task_id}"),
+    not the raw path, so IDs do not create new series; requests no route
+    matched share the "unmatched" label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.http_requests_in_progress.dec()
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            metrics.http_request_duration.labels(method, path).observe(time.perf_counter() - start)
+            metrics.http_requests.labels(method, path, str(status_code)).inc()
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.profiler import StackSampler
+from app.db.session import SessionLocal, init_engine
+from app.services.auth_service import is_admin_token
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("speedscope", "collapsed")
+
+
+class ProfilingMiddleware:
+    """
+    Profiles single requests on demand with a sampling profiler.
+
+    Only installed when PROFILING_ENABLED is set, so it costs nothing
+    otherwise. A request from an admin (bearer token) carrying
+    `X-Profile: 1` (or `X-Profile: speedscope|collapsed`) is sampled while
+    it runs; the report is written to `output_dir` and named in the
+    `X-Profile-Report` response header. The header is ignored for anyone
+    else.
+
+    The sampler records the event loop thread, so other requests running
+    at the same time show up in the report too; profile on an otherwise
+    idle worker. Only one request is profiled at a time.
+    """
+
+    def __init__(self, app, output_dir: str = "profiles", default_format: str = "speedscope",
+                 interval: float = 0.001):
+        self.app = app
+        self.output_dir = output_dir
+        self.default_format = default_format
+        self.interval = interval
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        requested = headers.get("x-profile")
+        if not requested or requested == "0":
+            await self.app(scope, receive, send)
+            return
+        report_format = self.default_format if requested == "1" else requested
+        if report_format not in FORMATS or not await self._is_admin(headers.get("authorization")):
+            await self.app(scope, receive, send)
+            return
+        if self._busy:
+            await self.app(scope, receive, self._with_header(send, "X-Profile-Report", "busy"))
+            return
+
+        name = self._report_name(scope, report_format)
+
+        self._busy = True
+        try:
+            with StackSampler(threading.get_ident(), self.interval) as sampler:
+                await self.app(scope, receive, self._with_header(send, "X-Profile-Report", name))
+        finally:
+            self._busy = False
+        await asyncio.to_thread(self._write_report, sampler, scope, name, report_format)
+
+    @staticmethod
+    def _with_header(send, header: str, value: str):
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(header, value)
+            await send(message)
+        return send_with_header
+
+    @staticmethod
+    async def _is_admin(authorization: Optional[str]) -> bool:
+        """get_admin_user's check, for a request that has not been routed yet"""
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        return await asyncio.to_thread(ProfilingMiddleware._check_token, token)
+
+    @staticmethod
+    def _check_token(token: str) -> bool:
+        init_engine()
+        db = SessionLocal()
+        try:
+            return is_admin_token(token, db)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _report_name(scope, report_format: str) -> str:
+        path = scope["path"].strip("/").replace("/", "_") or "root"
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        extension = "speedscope.json" if report_format == "speedscope" else "collapsed.txt"
+        return f"{stamp}_{scope['method']}_{path}.{extension}"
+
+    def _write_report(self, sampler: StackSampler, scope, name: str, report_format: str):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, name)
+        title = f"{scope['method']} {scope['path']}"
+        with open(path, "w") as f:
+            if report_format == "speedscope":
+                json.dump(sampler.speedscope(title), f)
+            else:
+                f.write(sampler.collapsed())
+        logger.info(
+            "Profiled %s in %.1f ms", title, sampler.duration * 1000,
+            extra={"report": path, "stacks": len(sampler.samples)}
+        )
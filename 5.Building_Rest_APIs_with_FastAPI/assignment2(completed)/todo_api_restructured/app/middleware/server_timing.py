@@ -0,0 +1,70 @@
+import logging
+import random
+import time
+
+from starlette.datastructures import MutableHeaders
+
+from app.core import timing
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware that records per-request spans (see
+    app.core.timing) and reports them in the Server-Timing response header,
+    with "total" measured up to the start of the response.
+
+    A fraction `log_sample_rate` of requests is also logged, with the
+    spans as structured fields (see app.core.logging.JSONFormatter). The
+    line is written when the response has finished, so it includes work
+    done after the headers were sent.
+    """
+
+    def __init__(self, app, log_sample_rate: float = 0.0):
+        self.app = app
+        self.log_sample_rate = log_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings, token = timing.begin_request()
+        status_code = 500
+
+        async def send_with_header(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timings.add("total", time.perf_counter() - start)
+                MutableHeaders(scope=message).append("Server-Timing", timings.header_value())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            timing.finish_request(token)
+            if self.log_sample_rate and random.random() < self.log_sample_rate:
+                self._log(scope, status_code, time.perf_counter() - start, timings)
+
+    @staticmethod
+    def _log(scope, status_code: int, duration: float, timings: timing.RequestTimings):
+        route = scope.get("route")
+        spans = {name: round(seconds * 1000, 2) for name, seconds in timings.spans.items()}
+        spans.pop("total", None)
+        path = route.path if route is not None else scope["path"]
+        duration_ms = round(duration * 1000, 2)
+        # Fields go in `extra` so JSONFormatter writes them as top-level keys
+        logger.info(
+            "Request timing %s %s %d %.2fms", scope["method"], path, status_code, duration_ms,
+            extra={
+                "event": "request_timing",
+                "method": scope["method"],
+                "route": path,
+                "status": status_code,
+                "duration_ms": duration_ms,
+                "spans_ms": spans,
+            }
+        )
@@ -0,0 +1,35 @@
+from starlette.datastructures import MutableHeaders
+
+from app.db import query_stats
+
+
+class SQLStatsMiddleware:
+    """
+    Pure ASGI middleware that scopes SQL accounting to each request and
+    reports it in the X-SQL-Count / X-SQL-Time-Ms response headers.
+    
+    Statements issued after the response has started (e.g. dependency
+    teardown) are not in the headers but still reach the route totals.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        stats, token = query_stats.begin_request(scope)
+        
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-SQL-Count", str(stats.count))
+                headers.append("X-SQL-Time-Ms", f"{stats.duration * 1000:.2f}")
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            query_stats.finish_request(stats, token)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from datetime import datetime
+
+from app.db.base_class import Base
+
+
+class IdempotencyKey(Base):
+    """
+    A request sent with an Idempotency-Key header and, once it has
+    finished, its response (see app.middleware.idempotency).
+    status_code is NULL while the first request is still running.
+    """
+    __tablename__ = "idempotency_keys"
+
+    # sha256 of the caller and the header value, so keys are fixed width
+    # and one user's keys never collide with another's
+    key = Column(String(64), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -47,3 +47,35 @@ class Task(Base):
         back_populates="assigned_tasks",
         foreign_keys=[assigned_to_id]
     )
+    
+    # Lets the archiver find old terminal-state rows without a full scan.
+    # AUTOINCREMENT stops SQLite from handing out max(id) + 1, which would
+    # reuse the ids of archived tasks once the newest rows are gone
+    __table_args__ = (
+        Index("ix_tasks_status_updated_at", "status", "updated_at"),
+        {"sqlite_autoincrement": True},
+    )
+
+
+class TaskArchive(Base):
+    """
+    Completed/cancelled tasks moved out of `tasks` by the archiver.
+    Same columns as Task plus archived_at; rows are never updated.
+    """
+    __tablename__ = "tasks_archive"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    assigned_to_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    name = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    priority = Column(Enum(TaskPriority))
+    status = Column(Enum(TaskStatus))
+    is_admin_assigned = Column(Boolean, default=False)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Read-only relationships so ?expand= works on archived rows too
+    creator = relationship("User", foreign_keys=[created_by_id], viewonly=True)
+    assigned_user = relationship("User", foreign_keys=[assigned_to_id], viewonly=True)
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 from datetime import datetime
 from app.models.task import TaskStatus, TaskPriority
+from app.schemas.user import UserSummary
 
 
 class TaskCreate(BaseModel):
@@ -35,3 +36,14 @@ class TaskResponse(BaseModel):
     is_admin_assigned: bool
     created_at: datetime
     updated_at: datetime
+
+
+class TaskExpandedResponse(TaskResponse):
+    """
+    Schema for task listings that support ?expand=creator,assignee.
+    Relations that were not requested are returned as null.
+    archived_at is only set for rows read from tasks_archive.
+    """
+    creator: Optional[UserSummary] = None
+    assignee: Optional[UserSummary] = Field(default=None, validation_alias="assigned_user")
+    archived_at: Optional[datetime] = None
@@ -28,6 +28,14 @@ class UserResponse(BaseModel):
     created_at: datetime
 
 
+class UserSummary(BaseModel):
+    """Compact user representation embedded in task responses"""
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: int
+    email: EmailStr
+
+
 class Token(BaseModel):
     """Schema for JWT token response"""
     access_token: str
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import DateTime, delete, exists, insert, literal, select
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.task import Task, TaskArchive, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+
+# Tasks in these states are never modified again and can be archived
+TERMINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.CANCELLED)
+
+# Columns copied verbatim from tasks to tasks_archive
+_COPIED_COLUMNS = [column.name for column in Task.__table__.columns]
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """
+    Move one batch of terminal-state tasks last updated before `cutoff`
+    into tasks_archive, in a single short transaction.
+    
+    Args:
+        db: Database session
+        cutoff: Only tasks with updated_at older than this are moved
+        batch_size: Maximum number of rows moved
+        
+    Returns:
+        Number of rows archived (0 when nothing is left to move)
+    """
+    # Task ids are never reused (tasks is AUTOINCREMENT on SQLite), but a
+    # database that reused one before that migration would otherwise fail
+    # every batch on the tasks_archive primary key; such rows stay live
+    eligible = (
+        Task.status.in_(TERMINAL_STATUSES),
+        Task.updated_at < cutoff,
+        ~exists().where(TaskArchive.id == Task.id),
+    )
+    ids = [
+        row.id for row in
+        db.query(Task.id).filter(*eligible).order_by(Task.id).limit(batch_size)
+    ]
+    if not ids:
+        return 0
+    
+    # Re-check the predicate in both statements so a row that changed
+    # since the SELECT above is neither copied nor deleted
+    tasks = Task.__table__
+    source = select(
+        *[tasks.c[name] for name in _COPIED_COLUMNS],
+        literal(datetime.utcnow(), DateTime).label("archived_at")
+    ).where(tasks.c.id.in_(ids), *eligible)
+    
+    db.execute(
+        insert(TaskArchive.__table__).from_select(_COPIED_COLUMNS + ["archived_at"], source)
+    )
+    db.execute(delete(tasks).where(tasks.c.id.in_(ids), *eligible))
+    db.commit()
+    return len(ids)
+
+
+def archive_completed_tasks(
+    older_than_days: int = None,
+    batch_size: int = None,
+    pause_seconds: float = None
+) -> int:
+    """
+    Archive every eligible task, one bounded batch per transaction.
+    Pauses between batches so request traffic can take the write lock.
+    
+    Returns:
+        Total number of rows archived
+    """
+    older_than_days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    pause_seconds = settings.ARCHIVE_BATCH_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    
+    total = 0
+    while True:
+        db = SessionLocal()
+        try:
+            moved = archive_batch(db, cutoff, batch_size)
+        finally:
+            db.close()
+        total += moved
+        if moved < batch_size:
+            return total
+        time.sleep(pause_seconds)
+
+
+async def run_archiver():
+    """
+    Background loop started from the app lifespan when ARCHIVE_ENABLED.
+    The batches run in a worker thread so the event loop stays free.
+    """
+    while True:
+        try:
+            archived = await asyncio.to_thread(archive_completed_tasks)
+            if archived:
+                logger.info("Archived %d tasks", archived)
+        except Exception:
+            logger.exception("Task archiver failed")
+        await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+
+
+def paginate_with_archive(
+    active_query: Query,
+    archive_query: Query,
+    skip: int,
+    limit: int
+) -> List:
+    """
+    Page through active tasks first, then archived ones, as if they were
+    one result set. Only counts active rows when the page starts past them.
+    """
+    rows = active_query.offset(skip).limit(limit).all()
+    if len(rows) >= limit:
+        return rows
+    
+    if rows:
+        archive_skip = 0
+    else:
+        archive_skip = max(0, skip - active_query.count())
+    
+    return rows + archive_query.offset(archive_skip).limit(limit - len(rows)).all()
@@ -5,6 +5,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
+from app.core import timing
 from app.core.config import settings
 from app.db.session import get_db
 from app.models.user import User
@@ -51,6 +52,49 @@ def decode_token(token: str) -> str:
 
 
 
+def get_user_by_token(db: Session, token: str) -> User:
+    """
+    Resolve a bearer token to its user.
+
+    Args:
+        db: Database session
+        token: JWT access token
+
+    Returns:
+        The user named by the token's subject
+
+    Raises:
+        HTTPException: If the token is invalid or its user does not exist
+    """
+    email = decode_token(token)
+    user = db.query(User).filter(User.email == email).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    return user
+
+
+
+def is_admin(user: User) -> bool:
+    return user.role == "ADMIN"
+
+
+
+def is_admin_token(token: str, db: Session) -> bool:
+    """
+    Whether get_admin_user would accept this bearer token; for callers
+    outside the dependency system (middleware). Runs a query, so call it
+    off the event loop.
+    """
+    try:
+        return is_admin(get_user_by_token(db, token))
+    except HTTPException:
+        return False
+
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -62,16 +106,8 @@ async def get_current_user(
             detail="Authorization token missing"
         )
 
-    email = decode_token(credentials.credentials)
-
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
-        )
-
-    return user
+    with timing.span("auth"):
+        return get_user_by_token(db, credentials.credentials)
 
 
 
@@ -88,7 +124,7 @@ async def get_admin_user(current_user: User = Depends(get_current_user)) -> User
     Raises:
         HTTPException: If user is not admin
     """
-    if current_user.role != "ADMIN":
+    if not is_admin(current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
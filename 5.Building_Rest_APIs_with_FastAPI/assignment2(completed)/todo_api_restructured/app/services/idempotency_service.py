@@ -0,0 +1,103 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.idempotency import IdempotencyKey
+
+# Outcomes of claim()
+CLAIMED = "claimed"          # the caller runs the request and must complete() or release()
+REPLAY = "replay"            # a stored response is available
+MISMATCH = "mismatch"        # the key was used for a different request
+IN_PROGRESS = "in_progress"  # another process is running the request
+
+
+def storage_key(subject: str, idempotency_key: str) -> str:
+    """Fixed-width primary key for a caller's Idempotency-Key"""
+    return hashlib.sha256(f"{subject}\n{idempotency_key}".encode()).hexdigest()
+
+
+def request_hash(method: str, path: str, query_string: bytes, body: bytes) -> str:
+    digest = hashlib.sha256(f"{method} {path}?".encode())
+    digest.update(query_string)
+    digest.update(b"\n")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def claim(db: Session, key: str, fingerprint: str, ttl: float,
+          lock_timeout: float) -> Tuple[str, Optional[IdempotencyKey]]:
+    """
+    Look up a key and, if it is free, record that this request owns it.
+
+    Expired rows, and claims older than `lock_timeout` that never
+    completed (the process running them died), are replaced.
+
+    Args:
+        db: Database session
+        key: storage_key() of the request
+        fingerprint: request_hash() of the request
+        ttl: Seconds a new row is kept
+        lock_timeout: Seconds after which an unfinished claim is abandoned
+
+    Returns:
+        (outcome, row); row is the stored response for REPLAY
+    """
+    now = datetime.utcnow()
+    row = db.get(IdempotencyKey, key)
+    if row is not None:
+        abandoned = row.status_code is None and row.created_at < now - timedelta(seconds=lock_timeout)
+        if row.expires_at <= now or abandoned:
+            db.delete(row)
+            db.flush()
+        elif row.request_hash != fingerprint:
+            return MISMATCH, row
+        elif row.status_code is None:
+            return IN_PROGRESS, row
+        else:
+            return REPLAY, row
+
+    db.add(IdempotencyKey(
+        key=key,
+        request_hash=fingerprint,
+        created_at=now,
+        expires_at=now + timedelta(seconds=ttl),
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another process claimed it between the lookup and the insert
+        db.rollback()
+        return IN_PROGRESS, None
+    return CLAIMED, None
+
+
+def complete(db: Session, key: str, status_code: int, content_type: Optional[str], body: bytes):
+    """Store the response of a claimed request"""
+    db.query(IdempotencyKey).filter(IdempotencyKey.key == key).update({
+        IdempotencyKey.status_code: status_code,
+        IdempotencyKey.content_type: content_type,
+        IdempotencyKey.response_body: body,
+    })
+    db.commit()
+
+
+def release(db: Session, key: str):
+    """Drop a claim without storing a response, so the request can be retried"""
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+    db.commit()
+
+
+def purge_expired(db: Session) -> int:
+    """
+    Delete expired rows.
+
+    Returns:
+        Number of rows deleted
+    """
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+    db.commit()
+    return result.rowcount
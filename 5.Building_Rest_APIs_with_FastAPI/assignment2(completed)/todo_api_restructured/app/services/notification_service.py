@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from sqlalchemy.orm import Session, load_only
+
+from app.core import timing
+from app.core.config import settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+def load_recipients(db: Session, user_ids: Iterable[int]) -> List[User]:
+    """
+    Fetch the users an event should notify, with their notification
+    preference, in a single query.
+
+    Args:
+        db: Database session
+        user_ids: Recipient user IDs (duplicates are ignored)
+
+    Returns:
+        The users that exist, opted out or not; fan_out() applies the
+        receive_notifications preference
+    """
+    ids = set(user_ids)
+    if not ids:
+        return []
+    return (
+        db.query(User)
+        .options(load_only(User.id, User.email, User.receive_notifications))
+        .filter(User.id.in_(ids))
+        .all()
+    )
+
+
+async def fan_out(
+    recipients: Iterable[User],
+    send: Callable[[User], Awaitable[bool]],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None
+) -> Dict[str, int]:
+    """
+    Send one notification per recipient concurrently.
+
+    Recipients with receive_notifications off are skipped. At most
+    `concurrency` sends run at once, and each is given `timeout` seconds;
+    a slow or failing recipient does not hold up or break the others.
+
+    Args:
+        recipients: Users to notify, e.g. from load_recipients()
+        send: Coroutine function sending the email to one user; returns
+            whether it was sent (send_email() logs rather than raises)
+        concurrency: Defaults to NOTIFY_FANOUT_CONCURRENCY
+        timeout: Per-recipient limit, defaults to NOTIFY_RECIPIENT_TIMEOUT_SECONDS
+
+    Returns:
+        Counts: sent, skipped (opted out), failed (send returned False
+        or raised), timed_out
+    """
+    concurrency = concurrency or settings.NOTIFY_FANOUT_CONCURRENCY
+    timeout = timeout or settings.NOTIFY_RECIPIENT_TIMEOUT_SECONDS
+    semaphore = asyncio.Semaphore(concurrency)
+    result = {"sent": 0, "skipped": 0, "failed": 0, "timed_out": 0}
+
+    async def send_one(user: User):
+        async with semaphore:
+            try:
+                sent = await asyncio.wait_for(send(user), timeout)
+                result["sent" if sent else "failed"] += 1
+            except asyncio.TimeoutError:
+                result["timed_out"] += 1
+                logger.warning("Notification timed out after %ss", timeout, extra={"to": user.email})
+            except Exception as e:
+                result["failed"] += 1
+                logger.error("Notification failed: %s", e, extra={"to": user.email})
+
+    sends = []
+    for user in recipients:
+        if user.receive_notifications:
+            sends.append(send_one(user))
+        else:
+            result["skipped"] += 1
+
+    with timing.span("email"):
+        await asyncio.gather(*sends)
+    return result
@@ -0,0 +1,90 @@
+import json
+from typing import List, Optional, Set
+from fastapi import HTTPException, status
+from sqlalchemy.orm import noload, selectinload
+
+from app.core.events import broker
+from app.models.task import Task
+from app.schemas.task import TaskResponse
+
+
+# Relations that can be requested via ?expand=..., mapped to the
+# relationship attribute on Task / TaskArchive
+EXPANDABLE_RELATIONS = {
+    "creator": "creator",
+    "assignee": "assigned_user",
+}
+
+
+def parse_expand(expand: Optional[str]) -> Set[str]:
+    """
+    Parse a comma separated ?expand= value.
+    
+    Args:
+        expand: Raw query parameter, e.g. "creator,assignee"
+        
+    Returns:
+        Set of requested relation names
+        
+    Raises:
+        HTTPException: If an unknown relation is requested
+    """
+    if not expand:
+        return set()
+    
+    requested = {part.strip() for part in expand.split(",") if part.strip()}
+    unknown = requested - EXPANDABLE_RELATIONS.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot expand: {', '.join(sorted(unknown))}. "
+                   f"Allowed: {', '.join(EXPANDABLE_RELATIONS)}"
+        )
+    return requested
+
+
+def task_load_options(expand: Optional[str], model=Task) -> List:
+    """
+    Build loader options for a task listing query on `model`
+    (Task or TaskArchive).
+    
+    Requested relations are batch loaded with selectinload (one extra
+    statement per relation, whatever the page size). The others use
+    noload so serializing the response never triggers a lazy load.
+    """
+    requested = parse_expand(expand)
+    options = []
+    for name, attribute in EXPANDABLE_RELATIONS.items():
+        relation = getattr(model, attribute)
+        options.append(selectinload(relation) if name in requested else noload(relation))
+    return options
+
+
+# Live update event types (see publish_task_event)
+TASK_CREATED = "task.created"
+TASK_UPDATED = "task.updated"
+TASK_COMPLETED = "task.completed"
+TASK_DELETED = "task.deleted"
+
+
+def task_channel(user_id: int) -> str:
+    """Broker channel carrying events for tasks assigned to `user_id`"""
+    return f"tasks:user:{user_id}"
+
+
+def publish_task_event(event_type: str, task: Task):
+    """
+    Tell the assignee's open task streams that a task changed.
+    
+    Call after the change is committed. The event is encoded once here,
+    as {"type": ..., "task": TaskResponse}; task.deleted only carries the id.
+    
+    Args:
+        event_type: One of TASK_CREATED, TASK_UPDATED, TASK_COMPLETED, TASK_DELETED
+        task: The task, with its columns loaded
+    """
+    if event_type == TASK_DELETED:
+        payload = {"id": task.id}
+    else:
+        payload = TaskResponse.model_validate(task).model_dump(mode="json")
+    broker.publish(task_channel(task.assigned_to_id), json.dumps({"type": event_type, "task": payload}))
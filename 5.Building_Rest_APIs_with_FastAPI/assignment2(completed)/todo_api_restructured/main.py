@@ -1,49 +1,146 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.core.config import settings
-from app.api.router import api_router
-#from app.db.init_db import init_db
-
-# Initialize database tables
-#init_db()
-
-# Create FastAPI application
-app = FastAPI(
-    title=settings.APP_NAME,
-    version=settings.APP_VERSION,
-    description="Advanced Todo List API with role-based access control"
-)
+from app.core.config import Settings, configure_settings, get_settings
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Include API router
-app.include_router(api_router, prefix="/api")
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Build the FastAPI application.
+    
+    Importing this module only loads FastAPI and the settings class:
+    settings are read, routers imported and the database engine created
+    when the app is built or started, not at import time.
+    
+    Args:
+        settings: Settings to use; defaults to the environment / .env
+    
+    Returns:
+        The configured application
+    """
+    settings = configure_settings(settings) if settings else get_settings()
+    
+    # Imported here so nothing reads settings before they are configured
+    from app.api.router import api_router
+    from app.api.endpoints import metrics
+    from app.middleware.memory import RequestMemoryMiddleware
+    from app.middleware.metrics import MetricsMiddleware
+    from app.middleware.server_timing import ServerTimingMiddleware
+    from app.middleware.sql_stats import SQLStatsMiddleware
+    
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Start logging, create the engine and start background jobs; undo all on shutdown"""
+        from app.core.email import close_smtp_pool
+        from app.core.events import broker
+        from app.core.logging import start_logging, stop_logging
+        from app.db.session import init_engine, dispose_engine
+        from app.services.archive_service import run_archiver
+        
+        start_logging(settings.LOG_LEVEL, settings.LOG_LEVELS, settings.LOG_JSON)
+        engine = init_engine(settings.DATABASE_URL)
+        if settings.CREATE_TABLES:
+            from app.db.init_db import init_db
+            init_db(engine)
+        await broker.start()
+        archiver = asyncio.create_task(run_archiver()) if settings.ARCHIVE_ENABLED else None
+        yield
+        if archiver:
+            archiver.cancel()
+        await broker.stop()
+        await close_smtp_pool()
+        dispose_engine()
+        stop_logging()
+    
+    # Create FastAPI application
+    app = FastAPI(
+        title=settings.APP_NAME,
+        version=settings.APP_VERSION,
+        description="Advanced Todo List API with role-based access control",
+        lifespan=lifespan
+    )
+    
+    # Idempotency-Key replay for the task POST/PUT routes; added first so
+    # it sits inside CORS and replayed responses still get CORS headers
+    if settings.IDEMPOTENCY_ENABLED:
+        from app.middleware.idempotency import IdempotencyMiddleware
+        app.add_middleware(
+            IdempotencyMiddleware,
+            ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+            wait_timeout=settings.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS,
+            lock_timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS
+        )
+    
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Configure appropriately for production
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    # Per-request SQL statement counts (X-SQL-Count / X-SQL-Time-Ms)
+    app.add_middleware(SQLStatsMiddleware)
+    
+    # Per-request peak memory of the task listings while tracemalloc tracking is on
+    app.add_middleware(RequestMemoryMiddleware)
+    
+    # Per-request span breakdown in the Server-Timing header
+    if settings.SERVER_TIMING_ENABLED:
+        app.add_middleware(ServerTimingMiddleware, log_sample_rate=settings.SERVER_TIMING_LOG_SAMPLE_RATE)
+    
+    # Request counts, latency histograms and in-flight requests for /metrics
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+    
+    # Admin-only "X-Profile: 1" request profiling
+    if settings.PROFILING_ENABLED:
+        from app.middleware.profiling import ProfilingMiddleware
+        app.add_middleware(
+            ProfilingMiddleware,
+            output_dir=settings.PROFILE_OUTPUT_DIR,
+            default_format=settings.PROFILE_FORMAT,
+            interval=settings.PROFILE_SAMPLE_INTERVAL_SECONDS
+        )
+    
+    # Include API router
+    app.include_router(api_router, prefix="/api")
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics.router)
+    
+    @app.get("/")
+    async def root():
+        """Health check endpoint"""
+        return {
+            "message": settings.APP_NAME,
+            "version": settings.APP_VERSION,
+            "status": "running",
+            "docs": "/docs"
+        }
+    
+    return app
 
 
-@app.get("/")
-async def root():
-    """Health check endpoint"""
-    return {
-        "message": settings.APP_NAME,
-        "version": settings.APP_VERSION,
-        "status": "running",
-        "docs": "/docs"
-    }
+def __getattr__(name: str):
+    """Keep `main:app` working (uvicorn main:app, `from main import app`); built on first use"""
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
-        "main:app",
+        "main:create_app",
+        factory=True,
         host="0.0.0.0",
         port=8000,
-        reload=settings.DEBUG
+        reload=get_settings().DEBUG
     )
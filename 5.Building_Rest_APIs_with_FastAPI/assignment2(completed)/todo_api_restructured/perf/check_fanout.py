@@ -0,0 +1,95 @@
+"""
+Check notification fan-out against a local aiosmtpd sink: recipients are
+loaded with one query, opted-out users are skipped, sends overlap up to
+the concurrency limit, a slow relay only costs each recipient its own
+timeout and sends the relay refuses are counted as failed, not sent.
+
+Usage (from the project root):
+    python -m perf.check_fanout
+"""
+import asyncio
+import os
+import sys
+import time
+
+from perf.smtp_sink import SMTPSink, free_port
+
+PORT = free_port()
+LATENCY = 0.05
+os.environ.update(
+    SMTP_SERVER="127.0.0.1", SMTP_PORT=str(PORT), SMTP_USE_TLS="false", SMTP_POOL_SIZE="20",
+    SMTP_RETRY_BACKOFF_SECONDS="0.01"
+)
+
+from perf.harness import Harness
+from app.core import email
+from app.models.user import User
+from app.services.notification_service import fan_out, load_recipients
+from main import app
+
+RECIPIENTS = 20
+
+
+def notify(user: User):
+    return email.notify_task_assigned(user.email, "Fan-out task", "admin@example.com")
+
+
+async def run_checks(sink: SMTPSink, recipients: list) -> list:
+    failures = []
+
+    def check(label, condition, detail):
+        print(f"{'ok  ' if condition else 'FAIL'} {label}: {detail}")
+        if not condition:
+            failures.append(label)
+
+    start = time.perf_counter()
+    result = await fan_out(recipients, notify, concurrency=10)
+    elapsed = time.perf_counter() - start
+    opted_in = RECIPIENTS - RECIPIENTS // 4
+    check("opted-out users skipped", result["skipped"] == RECIPIENTS // 4 and result["sent"] == opted_in,
+          f"{result}")
+    check("all opted-in users delivered", sink.message_count == opted_in, f"{sink.message_count}/{opted_in}")
+    sequential = opted_in * LATENCY
+    check("sends overlap", elapsed < sequential / 2,
+          f"{elapsed * 1000:.0f} ms for {opted_in} sends, sequential would be >= {sequential * 1000:.0f} ms")
+
+    sink.handler.latency = 1.0
+    start = time.perf_counter()
+    result = await fan_out(recipients, notify, concurrency=10, timeout=0.2)
+    elapsed = time.perf_counter() - start
+    check("slow relay bounded by per-recipient timeout", result["timed_out"] == opted_in and elapsed < 1.0,
+          f"{result['timed_out']} timed out, batch took {elapsed * 1000:.0f} ms")
+
+    await email.close_smtp_pool()
+    sink.stop()
+    result = await fan_out(recipients, notify, concurrency=10)
+    check("relay down counts as failed", result["failed"] == opted_in and result["sent"] == 0, f"{result}")
+    sink.start()
+    return failures
+
+
+def main() -> int:
+    harness = Harness(app, task_count=0, distinct_users=RECIPIENTS)
+    db = harness.SessionLocal()
+    users = db.query(User).filter(User.email.like("user%")).all()
+    for user in users[:RECIPIENTS // 4]:
+        user.receive_notifications = False
+    db.commit()
+    ids = [user.id for user in users]
+    db.close()
+
+    db = harness.SessionLocal()
+    with harness.count_statements() as counter:
+        recipients = load_recipients(db, ids)
+    db.close()
+    harness.close()
+    print(f"{'ok  ' if counter.count == 1 else 'FAIL'} preferences loaded in one query: "
+          f"{counter.count} statements for {len(recipients)} recipients")
+
+    with SMTPSink(PORT, latency=LATENCY) as sink:
+        failures = asyncio.run(run_checks(sink, recipients))
+    return 1 if failures or counter.count != 1 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
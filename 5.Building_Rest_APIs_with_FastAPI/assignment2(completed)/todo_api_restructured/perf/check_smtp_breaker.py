@@ -0,0 +1,94 @@
+"""
+Check the SMTP circuit breaker against a local aiosmtpd sink: it opens
+after repeated connection failures, then fails fast instead of waiting on
+the relay, and closes again once a half-open trial send succeeds. Also
+checks that a cancelled trial frees its slot and that successes do not
+reset the failure window.
+
+Usage (from the project root):
+    python -m perf.check_smtp_breaker
+"""
+import asyncio
+import os
+import sys
+import time
+
+from perf.smtp_sink import SMTPSink, free_port
+
+PORT = free_port()
+os.environ.update(
+    SMTP_SERVER="127.0.0.1", SMTP_PORT=str(PORT), SMTP_USE_TLS="false",
+    SMTP_TIMEOUT="1", SMTP_BREAKER_FAILURE_THRESHOLD="3",
+    SMTP_BREAKER_RESET_TIMEOUT_SECONDS="0.5", SMTP_RETRY_BACKOFF_SECONDS="0.01",
+)
+
+from perf import harness  # noqa: F401  (sets the remaining required settings)
+from app.core import email
+from app.core.circuit_breaker import CircuitBreaker
+
+
+async def notify(i: int):
+    await email.notify_task_assigned(f"user{i}@example.com", f"Task {i}", "admin@example.com")
+
+
+async def run_checks(sink: SMTPSink) -> list:
+    breaker = email.get_smtp_breaker()
+    failures = []
+
+    def check(label, condition, detail):
+        print(f"{'ok  ' if condition else 'FAIL'} {label}: {detail}")
+        if not condition:
+            failures.append(label)
+
+    await notify(0)
+    check("closed while relay is up", breaker.state == breaker.CLOSED and sink.message_count == 1,
+          f"state {breaker.state}, {sink.message_count}/1 delivered")
+
+    await email.close_smtp_pool()
+    sink.stop()
+    await notify(1)
+    check("opens after repeated failures", breaker.state == breaker.OPEN,
+          f"state {breaker.state} after {breaker.failures} failures")
+
+    start = time.perf_counter()
+    for i in range(20):
+        await notify(i)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    check("open circuit fails fast", elapsed_ms < 50 and breaker.rejected >= 20,
+          f"20 sends in {elapsed_ms:.1f} ms, {breaker.rejected} rejected")
+
+    sink.start()
+    await asyncio.sleep(breaker.reset_timeout)
+    check("half-open after reset timeout", breaker.state == breaker.HALF_OPEN, f"state {breaker.state}")
+
+    await notify(2)
+    check("trial send closes the circuit", breaker.state == breaker.CLOSED and sink.message_count == 2,
+          f"state {breaker.state}, {sink.message_count}/2 delivered")
+    print(breaker.snapshot())
+
+    await email.close_smtp_pool()
+
+    trial = CircuitBreaker("trial", failure_threshold=1, reset_timeout=0)
+    trial.record_failure()
+    task = asyncio.create_task(trial.call(asyncio.sleep, 10))
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    check("cancelled trial frees its slot", trial.allow_request(), f"state {trial.state}")
+
+    window = CircuitBreaker("window", failure_threshold=3)
+    for record in (window.record_failure, window.record_failure, window.record_success, window.record_failure):
+        record()
+    check("successes keep the failure window", window.state == window.OPEN,
+          f"state {window.state} after 3 failures around a success")
+    return failures
+
+
+def main() -> int:
+    with SMTPSink(PORT) as sink:
+        failures = asyncio.run(run_checks(sink))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Check the pooled SMTP sender against a local aiosmtpd sink: connections
+are reused, capped at the pool size, retired after the per-connection
+message limit and re-opened after the server drops them. A second,
+implicit-TLS sink checks that pooled connections log in when the server
+only announces AUTH in reply to EHLO.
+
+Usage (from the project root):
+    python -m perf.check_smtp_pool
+"""
+import asyncio
+import os
+import sys
+from email.message import EmailMessage
+
+from perf.smtp_sink import SMTPSink, free_port
+
+PORT = free_port()
+os.environ.update(SMTP_SERVER="127.0.0.1", SMTP_PORT=str(PORT), SMTP_USE_TLS="false")
+
+from perf import harness  # noqa: F401  (sets the remaining required settings)
+from app.core import email
+from app.core.smtp_pool import SMTPConnectionPool
+
+
+async def send_batch(count: int, concurrent: bool):
+    sends = [
+        email.notify_task_assigned(f"user{i}@example.com", f"Task {i}", "admin@example.com")
+        if i % 2 else
+        email.notify_task_completed("admin@example.com", f"Task {i}", f"user{i}@example.com")
+        for i in range(count)
+    ]
+    if concurrent:
+        await asyncio.gather(*sends)
+    else:
+        for send in sends:
+            await send
+
+
+async def run_checks(sink: SMTPSink) -> list:
+    pool = email.get_smtp_pool()
+    failures = []
+    
+    def check(label, condition, detail):
+        print(f"{'ok  ' if condition else 'FAIL'} {label}: {detail}")
+        if not condition:
+            failures.append(label)
+    
+    await send_batch(40, concurrent=True)
+    check("concurrent sends delivered", sink.message_count == 40, f"{sink.message_count}/40")
+    check("connections capped at pool size", pool.connections_opened <= pool.size,
+          f"{pool.connections_opened} opened, pool size {pool.size}")
+    
+    opened = pool.connections_opened
+    await send_batch(10, concurrent=False)
+    check("idle connections reused", pool.connections_opened == opened,
+          f"{pool.connections_opened - opened} new connections for 10 sequential sends")
+    
+    sink.restart()
+    await send_batch(4, concurrent=False)
+    check("reconnect after server drop", sink.message_count == 54, f"{sink.message_count}/54")
+    
+    await pool.close()
+    pool.max_messages_per_connection = 5
+    opened = pool.connections_opened
+    await send_batch(20, concurrent=False)
+    check("connections retired after message limit", pool.connections_opened - opened == 4,
+          f"{pool.connections_opened - opened} connections for 20 sends at 5 per connection")
+    
+    await pool.close()
+    
+    # connect() does not send EHLO on an implicit TLS connection, so the
+    # pool must before it checks for AUTH
+    with SMTPSink(auth=True, tls=True) as tls_sink:
+        tls_pool = SMTPConnectionPool(
+            "127.0.0.1", tls_sink.port, username="user", password="secret",
+            use_tls=True, tls_context=tls_sink.client_tls_context()
+        )
+        message = EmailMessage()
+        message["From"], message["To"], message["Subject"] = "app@example.com", "user@example.com", "TLS"
+        message.set_content("Pooled over implicit TLS")
+        await tls_pool.send_message(message)
+        await tls_pool.close()
+    check("login over implicit TLS", tls_sink.handler.logins == 1 and tls_sink.message_count == 1,
+          f"{tls_sink.handler.logins} logins, {tls_sink.message_count}/1 delivered")
+    return failures
+
+
+def main() -> int:
+    with SMTPSink(PORT, latency=0.01) as sink:
+        failures = asyncio.run(run_checks(sink))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Check the live task update endpoints against a real server with two
+worker processes sharing events through the "unix" broker: SSE streams
+and WebSockets opened on either worker get task.created / updated /
+completed / deleted for their own tasks only, bad tokens are refused,
+and idle streams get heartbeats.
+
+Usage (from the project root):
+    python -m perf.check_task_stream
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from perf.harness import StatementCounter  # noqa: F401  (sets the required settings)
+from perf.server import start_server, stop_server
+from perf.smtp_sink import SMTPSink, free_port
+
+import httpx
+from websockets.asyncio.client import connect
+from websockets.exceptions import InvalidStatus
+
+from app.db import session
+from app.db.init_db import init_db
+from app.models.user import User, UserRole
+from app.services.auth_service import create_access_token
+
+# Enough connections that both workers almost certainly hold some
+SSE_STREAMS = 6
+EXPECTED = ["task.created", "task.updated", "task.completed", "task.deleted"]
+
+
+def seed():
+    """An admin and two users; returns their tokens and the first user's id"""
+    init_db(session.init_engine())
+    db = session.SessionLocal()
+    accounts = [
+        User(email="admin@example.com", hashed_password="x", role=UserRole.ADMIN),
+        User(email="user@example.com", hashed_password="x", role=UserRole.USER),
+        User(email="other@example.com", hashed_password="x", role=UserRole.USER),
+    ]
+    db.add_all(accounts)
+    db.commit()
+    tokens = [create_access_token({"sub": user.email}) for user in accounts]
+    user_id = accounts[1].id
+    db.close()
+    session.dispose_engine()
+    return tokens, user_id
+
+
+async def read_sse(client: httpx.AsyncClient, token: str, events: list, pings: list, opened: asyncio.Event):
+    """Append each event of one SSE stream to `events` until cancelled"""
+    async with client.stream("GET", "/api/user/tasks/stream", headers={"Authorization": f"Bearer {token}"}) as r:
+        async for line in r.aiter_lines():
+            if line == ": connected":
+                opened.set()
+            elif line == ": ping":
+                pings.append(line)
+            elif line.startswith("data: "):
+                events.append(json.loads(line[6:])["type"])
+
+
+async def read_ws(url: str, events: list, opened: asyncio.Event, **options):
+    async with connect(url, **options) as websocket:
+        opened.set()
+        async for message in websocket:
+            events.append(json.loads(message)["type"])
+
+
+async def run_checks(port: int) -> list:
+    failures = []
+    base_url = f"http://127.0.0.1:{port}"
+    ws_url = f"ws://127.0.0.1:{port}/api/user/tasks/ws"
+
+    def check(label, condition, detail):
+        print(f"{'ok  ' if condition else 'FAIL'} {label}: {detail}")
+        if not condition:
+            failures.append(label)
+
+    (admin, user, other), user_id = seed()
+    async with httpx.AsyncClient(base_url=base_url, timeout=10) as client:
+        anonymous = await client.get("/api/user/tasks/stream")
+        check("stream needs a token", anonymous.status_code in (401, 403), f"{anonymous.status_code}")
+        try:
+            async with connect(ws_url, additional_headers={"Authorization": "Bearer not-a-token"}):
+                refused = None
+        except InvalidStatus as exc:
+            refused = exc.response.status_code
+        check("websocket refuses a bad token", refused == 403, f"{refused}")
+
+        readers, opened = [], []
+        sse_events = [[] for _ in range(SSE_STREAMS)]
+        pings, other_events = [], []
+        for events in sse_events:
+            opened.append(asyncio.Event())
+            readers.append(asyncio.create_task(read_sse(client, user, events, pings, opened[-1])))
+        opened.append(asyncio.Event())
+        readers.append(asyncio.create_task(read_sse(client, other, other_events, [], opened[-1])))
+        ws_header_events, ws_protocol_events = [], []
+        opened.append(asyncio.Event())
+        readers.append(asyncio.create_task(read_ws(
+            ws_url, ws_header_events, opened[-1], additional_headers={"Authorization": f"Bearer {user}"}
+        )))
+        opened.append(asyncio.Event())
+        readers.append(asyncio.create_task(read_ws(
+            ws_url, ws_protocol_events, opened[-1], subprotocols=["bearer", user]
+        )))
+        await asyncio.wait_for(asyncio.gather(*(event.wait() for event in opened)), 10)
+
+        admin_headers = {"Authorization": f"Bearer {admin}"}
+        created = await client.post("/api/admin/tasks", headers=admin_headers,
+                                    json={"assigned_to_id": user_id, "name": "Streamed task"})
+        task_id = created.json()["id"]
+        await client.put(f"/api/admin/tasks/{task_id}", headers=admin_headers, json={"priority": "high"})
+        await client.put(f"/api/user/tasks/{task_id}/complete", headers={"Authorization": f"Bearer {user}"})
+        await client.delete(f"/api/admin/tasks/{task_id}", headers=admin_headers)
+        await asyncio.sleep(1.5)
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+
+    complete = [events == EXPECTED for events in sse_events]
+    check(f"all {SSE_STREAMS} SSE streams across workers got every event", all(complete),
+          f"{complete.count(True)}/{SSE_STREAMS}, e.g. {sse_events[complete.index(False)] if False in complete else EXPECTED}")
+    check("websocket with Authorization header", ws_header_events == EXPECTED, f"{ws_header_events}")
+    check("websocket with bearer subprotocol", ws_protocol_events == EXPECTED, f"{ws_protocol_events}")
+    check("other users get nothing", other_events == [], f"{other_events}")
+    check("idle streams get heartbeats", len(pings) >= SSE_STREAMS, f"{len(pings)} pings")
+    return failures
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory(prefix="check-task-stream-") as workdir:
+        smtp_port = free_port()
+        # The server process inherits these: a throwaway database, the local
+        # sink and a socket directory of its own
+        os.environ.update(
+            DATABASE_URL=f"sqlite:///{workdir}/stream.db",
+            SMTP_SERVER="127.0.0.1", SMTP_PORT=str(smtp_port), SMTP_USE_TLS="false",
+            EVENT_BROKER="unix", EVENT_BROKER_SOCKET_DIR=os.path.join(workdir, "events"),
+            TASK_STREAM_HEARTBEAT_SECONDS="0.5", LOG_LEVEL="WARNING",
+        )
+        with SMTPSink(smtp_port, latency=0):
+            port = free_port()
+            server = start_server(["--workers", "2"], port)
+            try:
+                failures = asyncio.run(run_checks(port))
+            finally:
+                stop_server(server)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
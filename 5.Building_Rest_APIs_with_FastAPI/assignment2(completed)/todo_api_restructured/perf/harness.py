@@ -0,0 +1,152 @@
+"""
+Shared helpers for the perf/ scripts and the tests/ fixtures.
+
+Boots the API against a seeded in-memory SQLite database and counts the
+SQL statements each request issues. Run scripts from the project root,
+e.g. `python -m perf.check_fanout`.
+"""
+import os
+from contextlib import contextmanager
+
+# Settings() needs these before anything under app/ is imported
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "perf-harness-secret-key-not-for-production")
+os.environ.setdefault("SMTP_USER", "perf@example.com")
+os.environ.setdefault("SMTP_PASSWORD", "perf")
+os.environ.setdefault("FROM_EMAIL", "perf@example.com")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import email
+from app.core.security import hash_password
+from app.db.base_class import Base
+from app.db import session
+from app.db.session import get_db, instrument_engine
+from app.models.user import User, UserRole
+from app.models.task import Task, TaskPriority, TaskStatus
+from app.services.auth_service import create_access_token
+
+
+class StatementCounter:
+    """Counts statements sent to the DBAPI cursor of an engine"""
+    
+    def __init__(self, engine):
+        self.count = 0
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+    
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+    
+    def reset(self):
+        self.count = 0
+        self.statements = []
+
+
+# Password of the seeded admin/user, for routes that log in
+SEED_PASSWORD = "perf-harness-password"
+
+
+class Harness:
+    """
+    In-memory database + TestClient wired to the FastAPI app, through
+    get_db and through app.db.session for code that opens its own sessions
+    (e.g. the Idempotency-Key middleware). Outgoing email is recorded
+    instead of sent while the harness is open.
+    
+    Attributes:
+        client: TestClient bound to the app
+        counter: StatementCounter for the in-memory engine
+        admin, user: Seeded accounts
+        admin_headers, user_headers: Bearer auth headers for them
+        sent_emails: (to_email, subject) of every email the app sent
+    """
+    
+    def __init__(self, app, task_count: int = 10, distinct_users: int = 1):
+        self.app = app
+        self.engine = instrument_engine(create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        ))
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.counter = StatementCounter(self.engine)
+        self._seed(task_count, distinct_users)
+        
+        def override_get_db():
+            db = self.SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+        
+        self.app.dependency_overrides[get_db] = override_get_db
+        self._engine = session.engine
+        session.engine = self.engine
+        session.SessionLocal.configure(bind=self.engine)
+        self.sent_emails = []
+        self._send_email = email.send_email
+        email.send_email = self._record_email
+        self.client = TestClient(self.app)
+    
+    async def _record_email(self, to_email: str, subject: str, body: str) -> bool:
+        """Stand-in for app.core.email.send_email so harness runs never touch SMTP"""
+        self.sent_emails.append((to_email, subject))
+        return True
+    
+    def _seed(self, task_count: int, distinct_users: int):
+        """
+        Seed `distinct_users` admins and users. Tasks are spread over them
+        round-robin so relationship loads cannot all be served from the
+        identity map. `self.admin` / `self.user` are the first of each.
+        """
+        db = self.SessionLocal()
+        # Only the first admin/user get a real (slow to compute) hash
+        seed_hash = hash_password(SEED_PASSWORD)
+        admins = [
+            User(email=f"admin{i}@example.com", hashed_password=seed_hash if i == 0 else "x", role=UserRole.ADMIN)
+            for i in range(distinct_users)
+        ]
+        users = [
+            User(email=f"user{i}@example.com", hashed_password=seed_hash if i == 0 else "x", role=UserRole.USER)
+            for i in range(distinct_users)
+        ]
+        db.add_all(admins + users)
+        db.commit()
+        self.admin, self.user = admins[0], users[0]
+        priorities = list(TaskPriority)
+        db.add_all([
+            Task(
+                created_by_id=admins[i % distinct_users].id,
+                assigned_to_id=users[i % distinct_users].id,
+                name=f"Seeded task {i}",
+                description="Seeded by perf.harness",
+                priority=priorities[i % len(priorities)],
+                status=TaskStatus.PENDING,
+                is_admin_assigned=True
+            )
+            for i in range(task_count)
+        ])
+        db.commit()
+        self.admin_headers = {"Authorization": f"Bearer {create_access_token({'sub': self.admin.email})}"}
+        self.user_headers = {"Authorization": f"Bearer {create_access_token({'sub': self.user.email})}"}
+        db.close()
+    
+    @contextmanager
+    def count_statements(self):
+        """Yield the counter after resetting it; read .count afterwards"""
+        self.counter.reset()
+        yield self.counter
+    
+    def close(self):
+        self.client.close()
+        self.app.dependency_overrides.pop(get_db, None)
+        session.engine = self._engine
+        session.SessionLocal.configure(bind=self._engine)
+        email.send_email = self._send_email
+        self.engine.dispose()
@@ -0,0 +1,15 @@
+"""
+Scenario-driven load tests against the API served by serve.py.
+
+A scenario (a JSON file in scenarios/, see runner.py for the format)
+describes groups of virtual users, each looping over a list of actions
+with a think time between them. The runner seeds a temporary SQLite
+database, starts a local SMTP sink and the server, runs the scenario and
+reports throughput, latency percentiles and error rates per endpoint as
+JSON, so runs on different commits can be compared.
+
+Usage (from the project root):
+    python -m perf.loadtest user_polling
+    python -m perf.loadtest mixed --duration 30 --workers 2 --output mixed.json
+    python -m perf.loadtest mixed --compare mixed.json
+"""
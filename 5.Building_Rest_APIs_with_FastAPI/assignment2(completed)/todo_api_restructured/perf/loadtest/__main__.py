@@ -0,0 +1,5 @@
+import sys
+
+from perf.loadtest.runner import main
+
+sys.exit(main())
@@ -0,0 +1,496 @@
+"""
+Load test runner.
+
+Scenario file format (JSON):
+
+    {
+      "name": "user_polling",
+      "description": "...",
+      "duration_seconds": 20,          # measured time, after the warmup
+      "warmup_seconds": 3,             # requests started before this are not counted
+      "seed": {"admins": 1, "users": 20, "tasks_per_user": 25},
+      "groups": [
+        {
+          "name": "pollers",
+          "role": "user",              # "admin", "user" or "anonymous"
+          "count": 10,                 # virtual users in this group
+          "think_time_ms": [50, 150],  # pause after each step, uniform in range
+          "steps": [
+            {"action": "list_my_tasks", "params": {"expand": "creator"}},
+            {"action": "get_task"}
+          ]
+        }
+      ]
+    }
+
+Each virtual user loops over its group's steps until the time is up.
+Virtual users of the "user" group take the seeded users round-robin (so
+more virtual users than seeded users share accounts); admins likewise.
+Actions (see ACTIONS) and the endpoint each one is reported under:
+
+    register        POST /api/auth/register       a new, unique account
+    login           POST /api/auth/login          the account registered last by this
+                                                  virtual user, else a seeded user
+    list_my_tasks   GET  /api/user/tasks          params become the query string
+    get_task        GET  /api/user/tasks/{id}     one of the user's tasks
+    complete_task   PUT  /api/user/tasks/{id}/complete
+                                                  the user's pending tasks first, then
+                                                  cycles through all of them again
+    list_all_tasks  GET  /api/admin/tasks         params become the query string
+    assign_task     POST /api/admin/tasks         a new task for a random seeded user
+                                                  (emails the assignee); params are
+                                                  merged into the body
+
+Any response of 400 or above, and any transport error, counts as an error.
+
+The load generator runs in this process on one event loop; on a machine
+with few cores it competes with the server for CPU, so compare runs made
+on the same machine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from perf.server import start_server, stop_server
+from perf.smtp_sink import SMTPSink, free_port
+from perf.stats import percentile
+
+from perf.harness import SEED_PASSWORD  # (sets the required settings)
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.security import hash_password
+from app.db.init_db import init_db
+from app.models.task import Task, TaskPriority, TaskStatus
+from app.models.user import User, UserRole
+from app.services.auth_service import create_access_token
+
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")
+ROLES = ("admin", "user", "anonymous")
+
+
+@dataclass
+class Account:
+    """A seeded user and what the actions need to know about it"""
+    id: int
+    email: str
+    headers: Dict[str, str]
+    task_ids: List[int] = field(default_factory=list)
+    pending: List[int] = field(default_factory=list)
+    completions: int = 0
+
+
+@dataclass
+class VirtualUser:
+    id: int
+    account: Optional[Account]  # None for anonymous virtual users
+    login_account: Account
+    seeded_users: List[Account]
+    rng: random.Random
+    registered: Optional[str] = None
+    sequence: int = 0
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return self.account.headers if self.account else {}
+
+
+# An action builds one request: (method, route template, path, httpx keyword arguments)
+Request = Tuple[str, str, str, Dict]
+
+
+def _register(vu: VirtualUser, params: Dict) -> Request:
+    vu.sequence += 1
+    vu.registered = f"lt-{os.getpid()}-{vu.id}-{vu.sequence}@example.com"
+    body = {"email": vu.registered, "password": SEED_PASSWORD, **params}
+    return "POST", "/api/auth/register", "/api/auth/register", {"json": body}
+
+
+def _login(vu: VirtualUser, params: Dict) -> Request:
+    body = {"email": vu.registered or vu.login_account.email, "password": SEED_PASSWORD}
+    return "POST", "/api/auth/login", "/api/auth/login", {"json": body}
+
+
+def _list_my_tasks(vu: VirtualUser, params: Dict) -> Request:
+    return "GET", "/api/user/tasks", "/api/user/tasks", {"params": params}
+
+
+def _get_task(vu: VirtualUser, params: Dict) -> Request:
+    task_id = vu.rng.choice(vu.account.task_ids)
+    return "GET", "/api/user/tasks/{task_id}", f"/api/user/tasks/{task_id}", {}
+
+
+def _complete_task(vu: VirtualUser, params: Dict) -> Request:
+    account = vu.account
+    if account.pending:
+        task_id = account.pending.pop()
+    else:
+        task_id = account.task_ids[account.completions % len(account.task_ids)]
+    account.completions += 1
+    return "PUT", "/api/user/tasks/{task_id}/complete", f"/api/user/tasks/{task_id}/complete", {}
+
+
+def _list_all_tasks(vu: VirtualUser, params: Dict) -> Request:
+    return "GET", "/api/admin/tasks", "/api/admin/tasks", {"params": params}
+
+
+def _assign_task(vu: VirtualUser, params: Dict) -> Request:
+    vu.sequence += 1
+    body = {
+        "assigned_to_id": vu.rng.choice(vu.seeded_users).id,
+        "name": f"Load test task {vu.id}-{vu.sequence}",
+        "description": "Assigned by perf.loadtest",
+        **params,
+    }
+    return "POST", "/api/admin/tasks", "/api/admin/tasks", {"json": body}
+
+
+# action -> (request builder, roles allowed to run it)
+ACTIONS: Dict[str, Tuple[Callable[[VirtualUser, Dict], Request], Tuple[str, ...]]] = {
+    "register": (_register, ROLES),
+    "login": (_login, ROLES),
+    "list_my_tasks": (_list_my_tasks, ("user",)),
+    "get_task": (_get_task, ("user",)),
+    "complete_task": (_complete_task, ("user",)),
+    "list_all_tasks": (_list_all_tasks, ("admin",)),
+    "assign_task": (_assign_task, ("admin",)),
+}
+
+
+def load_scenario(name_or_path: str) -> Dict:
+    """
+    Read and check a scenario.
+
+    Args:
+        name_or_path: A file path, or the name of a file in scenarios/
+
+    Raises:
+        ValueError: If the scenario is malformed
+    """
+    path = name_or_path
+    if not os.path.exists(path):
+        path = os.path.join(SCENARIO_DIR, f"{name_or_path}.json")
+    with open(path) as f:
+        scenario = json.load(f)
+
+    seed = {"admins": 1, "users": 1, "tasks_per_user": 10, **scenario.get("seed", {})}
+    if seed["admins"] < 1 or seed["users"] < 1:
+        raise ValueError("seed needs at least one admin and one user")
+    scenario["seed"] = seed
+    scenario.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    scenario.setdefault("duration_seconds", 20)
+    scenario.setdefault("warmup_seconds", 3)
+    if not scenario.get("groups"):
+        raise ValueError("scenario has no groups")
+    for group in scenario["groups"]:
+        if group.get("role") not in ROLES:
+            raise ValueError(f"group {group.get('name')!r}: role must be one of {', '.join(ROLES)}")
+        group.setdefault("count", 1)
+        group.setdefault("think_time_ms", [0, 0])
+        for step in group.get("steps") or []:
+            if step.get("action") not in ACTIONS:
+                raise ValueError(f"group {group.get('name')!r}: unknown action {step.get('action')!r}")
+            if group["role"] not in ACTIONS[step["action"]][1]:
+                raise ValueError(f"group {group.get('name')!r}: {step['action']} needs another role")
+            if step["action"] in ("get_task", "complete_task") and seed["tasks_per_user"] < 1:
+                raise ValueError(f"{step['action']} needs seeded tasks")
+        if not group.get("steps"):
+            raise ValueError(f"group {group.get('name')!r} has no steps")
+    return scenario
+
+
+def seed(config: Dict) -> Dict[str, List[Account]]:
+    """Create the schema, admins, users and their pending tasks; returns the accounts"""
+    engine = create_engine(os.environ["DATABASE_URL"])
+    init_db(engine)
+    db = sessionmaker(bind=engine)()
+    seed_hash = hash_password(SEED_PASSWORD)  # hashing once keeps seeding fast
+    admins = [
+        User(email=f"admin{i}@example.com", hashed_password=seed_hash, role=UserRole.ADMIN)
+        for i in range(config["admins"])
+    ]
+    users = [
+        User(email=f"user{i}@example.com", hashed_password=seed_hash, role=UserRole.USER)
+        for i in range(config["users"])
+    ]
+    db.add_all(admins + users)
+    db.commit()
+
+    priorities = list(TaskPriority)
+    tasks = [
+        Task(
+            created_by_id=admins[i % len(admins)].id,
+            assigned_to_id=user.id,
+            name=f"Seeded task {i}",
+            description="Seeded by perf.loadtest",
+            priority=priorities[i % len(priorities)],
+            status=TaskStatus.PENDING,
+            is_admin_assigned=True
+        )
+        for user in users
+        for i in range(config["tasks_per_user"])
+    ]
+    db.add_all(tasks)
+    db.commit()
+
+    def account(user: User) -> Account:
+        token = create_access_token({"sub": user.email})
+        return Account(id=user.id, email=user.email, headers={"Authorization": f"Bearer {token}"})
+
+    accounts = {"admin": [account(admin) for admin in admins], "user": [account(user) for user in users]}
+    by_id = {acc.id: acc for acc in accounts["user"]}
+    for task in tasks:
+        by_id[task.assigned_to_id].task_ids.append(task.id)
+    for acc in accounts["user"]:
+        acc.pending = list(reversed(acc.task_ids))
+    db.close()
+    engine.dispose()
+    return accounts
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+
+    def record(self, status, latency: float):
+        self.latencies.append(latency)
+        self.statuses[str(status)] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors += 1
+
+
+def summarize(stats: EndpointStats, elapsed: float) -> Dict:
+    latencies = stats.latencies
+    count = len(latencies)
+
+    def ms(value: float) -> float:
+        return round(value * 1000, 2)
+
+    return {
+        "requests": count,
+        "errors": stats.errors,
+        "error_rate": round(stats.errors / count, 4) if count else 0.0,
+        "rps": round(count / elapsed, 1),
+        "p50_ms": ms(statistics.median(latencies)) if count else None,
+        "p90_ms": ms(percentile(latencies, 90)) if count else None,
+        "p99_ms": ms(percentile(latencies, 99)) if count else None,
+        "max_ms": ms(max(latencies)) if count else None,
+        "status_codes": dict(sorted(stats.statuses.items())),
+    }
+
+
+def virtual_users(scenario: Dict, accounts: Dict[str, List[Account]], rng_seed: int) -> List[Tuple[Dict, VirtualUser]]:
+    result = []
+    counters = Counter()
+    for group in scenario["groups"]:
+        role = group["role"]
+        for _ in range(group["count"]):
+            n = counters[role]
+            counters[role] += 1
+            vu_id = len(result)
+            vu = VirtualUser(
+                id=vu_id,
+                account=accounts[role][n % len(accounts[role])] if role != "anonymous" else None,
+                login_account=accounts["user"][n % len(accounts["user"])],
+                seeded_users=accounts["user"],
+                rng=random.Random(rng_seed + vu_id),
+            )
+            result.append((group, vu))
+    return result
+
+
+async def run_virtual_user(client: httpx.AsyncClient, group: Dict, vu: VirtualUser,
+                           measure_from: float, deadline: float, stats: Dict[str, EndpointStats]):
+    low, high = group["think_time_ms"]
+    # Spread the start over one think time so the groups do not move in lockstep
+    await asyncio.sleep(vu.rng.uniform(0, high) / 1000)
+    while True:
+        for step in group["steps"]:
+            if time.perf_counter() >= deadline:
+                return
+            build, _ = ACTIONS[step["action"]]
+            method, template, path, kwargs = build(vu, step.get("params", {}))
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, headers=vu.headers, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            if start >= measure_from:
+                stats.setdefault(f"{method} {template}", EndpointStats()).record(
+                    status, time.perf_counter() - start
+                )
+            if high:
+                await asyncio.sleep(vu.rng.uniform(low, high) / 1000)
+
+
+async def drive(port: int, scenario: Dict, accounts: Dict[str, List[Account]], sink: SMTPSink,
+                rng_seed: int) -> Dict:
+    users = virtual_users(scenario, accounts, rng_seed)
+    stats: Dict[str, EndpointStats] = {}
+    limits = httpx.Limits(max_connections=len(users), max_keepalive_connections=len(users))
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        measure_from = start + scenario["warmup_seconds"]
+        deadline = measure_from + scenario["duration_seconds"]
+
+        async def emails_at_warmup_end() -> int:
+            await asyncio.sleep(scenario["warmup_seconds"])
+            return sink.message_count
+
+        warmup_emails = asyncio.create_task(emails_at_warmup_end())
+        await asyncio.gather(*(
+            run_virtual_user(client, group, vu, measure_from, deadline, stats) for group, vu in users
+        ))
+        # In-flight requests may finish after the deadline; rates use the actual span
+        elapsed = time.perf_counter() - measure_from
+        emails = sink.message_count - await warmup_emails
+
+    endpoints = {name: summarize(stats[name], elapsed) for name in sorted(stats)}
+    total = EndpointStats()
+    for endpoint in stats.values():
+        total.latencies.extend(endpoint.latencies)
+        total.statuses.update(endpoint.statuses)
+        total.errors += endpoint.errors
+    return {
+        "virtual_users": len(users),
+        "measured_seconds": round(elapsed, 2),
+        "totals": summarize(total, elapsed),
+        "emails_delivered": emails,
+        "endpoints": endpoints,
+    }
+
+
+def git_revision() -> Dict:
+    def git(*args) -> str:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--", "."))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def print_report(report: Dict, out=sys.stdout):
+    print(f"{report['scenario']}: {report['virtual_users']} virtual users, "
+          f"{report['measured_seconds']}s measured, {report['emails_delivered']} emails\n", file=out)
+    print(f"{'endpoint':<42}{'reqs':>7}{'rps':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'err %':>7}", file=out)
+    rows = list(report["endpoints"].items()) + [("total", report["totals"])]
+    for name, row in rows:
+        print(f"{name:<42}{row['requests']:>7}{row['rps']:>8.1f}{row['p50_ms'] or 0:>9.2f}"
+              f"{row['p90_ms'] or 0:>9.2f}{row['p99_ms'] or 0:>9.2f}{row['error_rate'] * 100:>7.1f}", file=out)
+
+
+def print_comparison(previous: Dict, report: Dict, out=sys.stdout):
+    """rps and latency change per endpoint, relative to a previous report"""
+
+    def change(old, new) -> str:
+        if not old or new is None:
+            return "-"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    print(f"\nvs {previous.get('commit') or 'previous run'} ({previous['scenario']}):", file=out)
+    print(f"{'endpoint':<42}{'rps':>9}{'p50':>9}{'p99':>9}{'err % before/after':>20}", file=out)
+    before = {**previous["endpoints"], "total": previous["totals"]}
+    after = {**report["endpoints"], "total": report["totals"]}
+    for name in list(report["endpoints"]) + ["total"]:
+        if name not in before:
+            continue
+        old, new = before[name], after[name]
+        errors = f"{old['error_rate'] * 100:.1f}/{new['error_rate'] * 100:.1f}"
+        print(f"{name:<42}{change(old['rps'], new['rps']):>9}{change(old['p50_ms'], new['p50_ms']):>9}"
+              f"{change(old['p99_ms'], new['p99_ms']):>9}{errors:>20}", file=out)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a load test scenario against serve.py")
+    parser.add_argument("scenario", help="scenario name (perf/loadtest/scenarios) or path to a JSON file")
+    parser.add_argument("--duration", type=float, help="measured seconds (overrides the scenario)")
+    parser.add_argument("--warmup", type=float, help="warmup seconds (overrides the scenario)")
+    parser.add_argument("--workers", type=int, default=1, help="server worker processes")
+    parser.add_argument("--server-args", default="", help="extra serve.py arguments, e.g. \"--loop asyncio\"")
+    parser.add_argument("--smtp-latency-ms", type=float, default=0, help="delay of the SMTP sink per message")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the virtual users")
+    parser.add_argument("--output", help="write the JSON report here (\"-\" for stdout)")
+    parser.add_argument("--compare", help="previous JSON report to compare with")
+    options = parser.parse_args()
+
+    try:
+        scenario = load_scenario(options.scenario)
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+    if options.duration is not None:
+        scenario["duration_seconds"] = options.duration
+    if options.warmup is not None:
+        scenario["warmup_seconds"] = options.warmup
+    previous = None
+    if options.compare:
+        with open(options.compare) as f:
+            previous = json.load(f)
+
+    server_args = ["--workers", str(options.workers), *options.server_args.split()]
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        smtp_port = free_port()
+        # The server process inherits these: a throwaway database and the local sink
+        os.environ.update(
+            DATABASE_URL=f"sqlite:///{workdir}/loadtest.db",
+            SMTP_SERVER="127.0.0.1", SMTP_PORT=str(smtp_port), SMTP_USE_TLS="false",
+        )
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        accounts = seed(scenario["seed"])
+        with SMTPSink(smtp_port, options.smtp_latency_ms / 1000) as sink:
+            port = free_port()
+            server = start_server(server_args, port)
+            try:
+                result = asyncio.run(drive(port, scenario, accounts, sink, options.seed))
+            finally:
+                stop_server(server)
+
+    report = {
+        "scenario": scenario["name"],
+        "description": scenario.get("description"),
+        **git_revision(),
+        "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            "duration_seconds": scenario["duration_seconds"],
+            "warmup_seconds": scenario["warmup_seconds"],
+            "server_args": " ".join(server_args),
+            "smtp_latency_ms": options.smtp_latency_ms,
+            "seed": scenario["seed"],
+            "groups": scenario["groups"],
+        },
+        **result,
+    }
+
+    # The table goes to stderr when the JSON report takes stdout
+    out = sys.stderr if options.output == "-" else sys.stdout
+    print_report(report, out)
+    if previous:
+        print_comparison(previous, report, out)
+    if options.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
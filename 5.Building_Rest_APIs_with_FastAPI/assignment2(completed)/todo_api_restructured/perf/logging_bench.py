@@ -0,0 +1,137 @@
+"""
+Logging throughput under load on the event loop.
+
+Simulates concurrent requests that each log one line (the "Email sent"
+line send_email writes) and compares three ways of writing it:
+
+- print: the old print() straight to the stream, flushed per line as
+  with PYTHONUNBUFFERED=1 (usual in containers)
+- sync-json: a StreamHandler with the JSON formatter on the root logger,
+  formatting and writing on the event loop
+- queue-json: app.core.logging (QueueHandler -> QueueListener thread)
+
+The stream is a temporary file, optionally slowed down by --write-latency-us
+per flush to stand in for a slow stdout (a full pipe or log driver). For
+each mode it reports lines per second on the loop, p50/p99 latency of one
+logging call, the worst event loop stall seen by a 1 ms ticker, and how
+long the queue took to drain after the load stopped.
+
+Usage (from the project root):
+    python -m perf.logging_bench
+    python -m perf.logging_bench --lines 20000 --concurrency 100 --write-latency-us 50
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import tempfile
+import time
+
+from app.core.logging import JSONFormatter, start_logging, stop_logging
+from perf.stats import percentile
+
+logger = logging.getLogger("app.core.email")
+
+
+class SlowStream:
+    """File stream whose flush (the actual write to the OS) takes `latency` seconds longer"""
+
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text: str):
+        return self.stream.write(text)
+
+    def flush(self):
+        if self.latency:
+            time.sleep(self.latency)
+        self.stream.flush()
+
+
+async def drive(log_line, lines: int, concurrency: int) -> dict:
+    """`concurrency` coroutines log `lines` lines in total, yielding between lines"""
+    latencies, stalls = [], []
+    per_worker = lines // concurrency
+    done = False
+
+    async def ticker():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stalls.append(time.perf_counter() - start - 0.001)
+
+    async def worker(n: int):
+        for i in range(per_worker):
+            start = time.perf_counter()
+            log_line(f"user{n}-{i}@example.com")
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    done = True
+    await tick
+    return {
+        "lines": len(latencies),
+        "lines_per_s": round(len(latencies) / elapsed),
+        "p50_us": round(statistics.median(latencies) * 1e6, 1),
+        "p99_us": round(percentile(latencies, 99) * 1e6, 1),
+        "max_stall_ms": round(max(stalls, default=0) * 1000, 2),
+    }
+
+
+def run_mode(mode: str, stream, lines: int, concurrency: int) -> dict:
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    handler = None
+
+    if mode == "print":
+        def log_line(to):
+            print(f"✅ Email sent to {to}", file=stream, flush=True)
+    else:
+        if mode == "sync-json":
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(JSONFormatter())
+            root.addHandler(handler)
+        else:
+            start_logging("INFO", stream=stream)
+
+        def log_line(to):
+            logger.info("Email sent", extra={"to": to})
+
+    result = asyncio.run(drive(log_line, lines, concurrency))
+
+    start = time.perf_counter()
+    if mode == "queue-json":
+        stop_logging()
+    if handler is not None:
+        root.removeHandler(handler)
+    stream.flush()
+    result["drain_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return {"mode": mode, **result}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare print, sync and queued logging on the event loop")
+    parser.add_argument("--lines", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent simulated requests")
+    parser.add_argument("--write-latency-us", type=float, default=0,
+                        help="artificial delay per flush of the output stream")
+    args = parser.parse_args()
+
+    print(f"{args.lines} lines, {args.concurrency} concurrent, {args.write_latency_us:g} us per flush\n")
+    print(f"{'mode':<12}{'lines/s':>10}{'p50 us':>9}{'p99 us':>9}{'max stall ms':>14}{'drain ms':>10}")
+    for mode in ("print", "sync-json", "queue-json"):
+        with tempfile.TemporaryFile("w+") as output:
+            result = run_mode(mode, SlowStream(output, args.write_latency_us / 1e6), args.lines, args.concurrency)
+        print(f"{mode:<12}{result['lines_per_s']:>10}{result['p50_us']:>9.1f}{result['p99_us']:>9.1f}"
+              f"{result['max_stall_ms']:>14.2f}{result['drain_ms']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
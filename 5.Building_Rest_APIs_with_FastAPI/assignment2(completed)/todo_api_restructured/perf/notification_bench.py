@@ -0,0 +1,146 @@
+"""
+Notification throughput benchmark against the local SMTP sink.
+
+Seeds users and tasks, then drives notify_task_assigned and
+notify_task_completed (alternating) at increasing concurrency through the
+real send path: pooled SMTP connections and the circuit breaker. For each
+pool size and concurrency level it reports messages per second, p50/p99
+latency per notification and failures (notifications the sink never
+received). Use it to choose SMTP_POOL_SIZE for a given relay latency.
+
+Usage (from the project root):
+    python -m perf.notification_bench
+    python -m perf.notification_bench --latency-ms 50 --pool-sizes 1,4,8 \\
+        --concurrency 1,4,16,64 --messages 500 --json bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+from perf.smtp_sink import SMTPSink, free_port
+from perf.stats import percentile
+
+PORT = free_port()
+os.environ.update(SMTP_SERVER="127.0.0.1", SMTP_PORT=str(PORT), SMTP_USE_TLS="false")
+
+from perf.harness import Harness
+from app.core import email
+from app.core.config import settings
+from app.core.smtp_pool import SMTPConnectionPool
+from app.models.task import Task
+from main import app
+
+
+def seed_notifications(count: int, distinct_users: int) -> list:
+    """(user_email, admin_email, task_name) for `count` seeded tasks"""
+    harness = Harness(app, task_count=count, distinct_users=distinct_users)
+    try:
+        db = harness.SessionLocal()
+        tasks = db.query(Task).order_by(Task.id).all()
+        rows = [(task.assigned_user.email, task.creator.email, task.name) for task in tasks]
+        db.close()
+    finally:
+        # Also puts the real send_email back in place
+        harness.close()
+    return rows
+
+
+async def run_level(rows: list, concurrency: int) -> list:
+    """Send one notification per row with `concurrency` workers; returns latencies"""
+    queue = asyncio.Queue()
+    for i, row in enumerate(rows):
+        queue.put_nowait((i, row))
+    latencies = []
+
+    async def worker():
+        while not queue.empty():
+            i, (user_email, admin_email, task_name) = queue.get_nowait()
+            start = time.perf_counter()
+            if i % 2:
+                await email.notify_task_completed(admin_email, task_name, user_email)
+            else:
+                await email.notify_task_assigned(user_email, task_name, admin_email)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    await email.close_smtp_pool()
+    return latencies
+
+
+def bench(sink: SMTPSink, rows: list, pool_size: int, concurrency: int) -> dict:
+    email.smtp_pool = SMTPConnectionPool(
+        hostname=settings.SMTP_SERVER,
+        port=settings.SMTP_PORT,
+        username=settings.SMTP_USER,
+        password=settings.SMTP_PASSWORD,
+        use_tls=settings.SMTP_USE_TLS,
+        timeout=settings.SMTP_TIMEOUT,
+        size=pool_size,
+        max_messages_per_connection=settings.SMTP_POOL_MAX_MESSAGES_PER_CONNECTION,
+        idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT_SECONDS,
+        health_check_after=settings.SMTP_POOL_HEALTH_CHECK_AFTER_SECONDS,
+    )
+    email.get_smtp_breaker().reset()
+    delivered_before = sink.message_count
+
+    start = time.perf_counter()
+    latencies = asyncio.run(run_level(rows, concurrency))
+    elapsed = time.perf_counter() - start
+
+    delivered = sink.message_count - delivered_before
+    return {
+        "pool_size": pool_size,
+        "concurrency": concurrency,
+        "messages": len(rows),
+        "delivered": delivered,
+        "failures": len(rows) - delivered,
+        "seconds": round(elapsed, 3),
+        "messages_per_second": round(delivered / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "connections_opened": email.smtp_pool.connections_opened,
+        "breaker_state": email.get_smtp_breaker().state,
+    }
+
+
+def int_list(value: str) -> list:
+    return [int(part) for part in value.split(",") if part]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency-ms", type=float, default=20, help="artificial sink delay per message")
+    parser.add_argument("--pool-sizes", type=int_list, default=[1, 4, 8])
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16, 64])
+    parser.add_argument("--messages", type=int, default=200, help="notifications per run")
+    parser.add_argument("--users", type=int, default=20, help="distinct seeded users/admins")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    rows = seed_notifications(args.messages, args.users)
+    results = []
+    print(f"SMTP sink latency {args.latency_ms:.0f} ms, {args.messages} notifications per run\n")
+    print(f"{'pool':>5}{'conc':>6}{'msg/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'failed':>8}{'conns':>7}")
+    with SMTPSink(PORT, latency=args.latency_ms / 1000) as sink:
+        for pool_size in args.pool_sizes:
+            for concurrency in args.concurrency:
+                result = bench(sink, rows, pool_size, concurrency)
+                results.append(result)
+                print(
+                    f"{pool_size:>5}{concurrency:>6}{result['messages_per_second']:>9.1f}"
+                    f"{result['p50_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+                    f"{result['failures']:>8}{result['connections_opened']:>7}"
+                )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"latency_ms": args.latency_ms, "results": results}, f, indent=2)
+    return 1 if any(result["failures"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
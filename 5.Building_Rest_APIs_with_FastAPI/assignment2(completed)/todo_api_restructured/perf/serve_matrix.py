@@ -0,0 +1,202 @@
+"""
+Benchmark matrix for serve.py configurations.
+
+Seeds a temporary SQLite database, starts the API through serve.py with
+each configuration in turn and drives GET /api/user/tasks and
+GET /api/admin/tasks (alternating) with keep-alive connections for a fixed
+time. For each configuration it reports requests per second, p50/p99
+latency, errors (including 503s from --limit-concurrency) and the memory
+of the whole server process tree: RSS and PSS, where PSS splits shared
+pages between the processes sharing them, so it shows what --preload
+saves.
+
+The load generator runs in this process, so on a machine with few cores
+it competes with the workers; compare configurations with each other,
+not with numbers from another machine. Run with --connections above 15
+to see the difference --limit-concurrency makes (503s instead of a
+worker stalled on the database pool).
+
+Usage (from the project root, Linux):
+    python -m perf.serve_matrix
+    python -m perf.serve_matrix --duration 10 --connections 32 --tasks 200 \\
+        --workers 4 --only uvloop-httptools,workers,preload --json matrix.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from perf.server import process_tree, start_server, stop_server
+from perf.smtp_sink import free_port
+from perf.stats import percentile
+
+from perf.harness import SEED_PASSWORD  # (sets the required settings)
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.security import hash_password
+from app.db.init_db import init_db
+from app.models.task import Task, TaskPriority, TaskStatus
+from app.models.user import User, UserRole
+from app.services.auth_service import create_access_token
+
+
+def configurations(workers: int) -> Dict[str, List[str]]:
+    """name -> serve.py arguments"""
+    return {
+        "asyncio-h11": ["--workers", "1", "--loop", "asyncio", "--http", "h11"],
+        "uvloop-httptools": ["--workers", "1", "--loop", "uvloop", "--http", "httptools"],
+        "workers": ["--workers", str(workers)],
+        "preload": ["--workers", str(workers), "--preload"],
+        "limit-concurrency": ["--workers", str(workers), "--limit-concurrency", "15"],
+    }
+
+
+def seed(task_count: int) -> Dict[str, str]:
+    """Create the schema, one admin, one user and their tasks; returns auth headers"""
+    engine = create_engine(os.environ["DATABASE_URL"])
+    init_db(engine)
+    db = sessionmaker(bind=engine)()
+    seed_hash = hash_password(SEED_PASSWORD)
+    admin = User(email="admin@example.com", hashed_password=seed_hash, role=UserRole.ADMIN)
+    user = User(email="user@example.com", hashed_password=seed_hash, role=UserRole.USER)
+    db.add_all([admin, user])
+    db.commit()
+    priorities = list(TaskPriority)
+    db.add_all([
+        Task(
+            created_by_id=admin.id,
+            assigned_to_id=user.id,
+            name=f"Seeded task {i}",
+            description="Seeded by perf.serve_matrix",
+            priority=priorities[i % len(priorities)],
+            status=TaskStatus.PENDING,
+            is_admin_assigned=True
+        )
+        for i in range(task_count)
+    ])
+    db.commit()
+    headers = {
+        "admin": f"Bearer {create_access_token({'sub': admin.email})}",
+        "user": f"Bearer {create_access_token({'sub': user.email})}",
+    }
+    db.close()
+    engine.dispose()
+    return headers
+
+
+def tree_memory_mb(pid: int) -> Dict[str, Optional[float]]:
+    """Summed RSS and PSS of a process tree"""
+    rss = pss = 0
+    for current in process_tree(pid):
+        try:
+            with open(f"/proc/{current}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Rss:"):
+                        rss += int(line.split()[1])
+                    elif line.startswith("Pss:"):
+                        pss += int(line.split()[1])
+        except OSError:
+            return {"rss_mb": None, "pss_mb": None}
+    return {"rss_mb": round(rss / 1024, 1), "pss_mb": round(pss / 1024, 1)}
+
+
+async def drive(port: int, headers: Dict[str, str], connections: int, duration: float) -> Dict:
+    """Alternate the user and admin task listings on `connections` keep-alive connections"""
+    targets = [("/api/user/tasks", headers["user"]), ("/api/admin/tasks", headers["admin"])]
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+
+        async def connection(offset: int):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                path, token = targets[i % len(targets)]
+                i += 1
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path, headers={"Authorization": token})
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(connection(n) for n in range(connections)))
+        elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+def bench_configuration(name: str, args: List[str], headers: Dict[str, str], options) -> Dict:
+    port = free_port()
+    server = start_server(args, port)
+    try:
+        # Warm up every worker's connection pool and caches
+        asyncio.run(drive(port, headers, options.connections, min(1.0, options.duration)))
+        result = asyncio.run(drive(port, headers, options.connections, options.duration))
+        result.update(tree_memory_mb(server.pid))
+    finally:
+        stop_server(server)
+    return {"configuration": name, "args": " ".join(args), **result}
+
+
+def main() -> int:
+    default_workers = max(2, os.cpu_count() or 1)
+    parser = argparse.ArgumentParser(description="Compare serve.py configurations on the task listings")
+    parser.add_argument("--duration", type=float, default=5, help="seconds of load per configuration")
+    # Above 15 (the database pool) unlimited workers stall; see serve.py
+    parser.add_argument("--connections", type=int, default=12, help="concurrent keep-alive connections")
+    parser.add_argument("--tasks", type=int, default=50, help="seeded tasks returned by each listing")
+    parser.add_argument("--workers", type=int, default=default_workers,
+                        help="worker count for the multi-worker configurations")
+    parser.add_argument("--only", help="comma separated configuration names")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    options = parser.parse_args()
+
+    matrix = configurations(options.workers)
+    names = options.only.split(",") if options.only else list(matrix)
+    unknown = set(names) - matrix.keys()
+    if unknown:
+        parser.error(f"unknown configurations: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix="serve-matrix-") as workdir:
+        # The servers inherit it
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/serve_matrix.db"
+        headers = seed(options.tasks)
+        print(f"{options.tasks} tasks per listing, {options.connections} connections, "
+              f"{options.duration:g}s per configuration, {os.cpu_count()} CPUs\n")
+        print(f"{'configuration':<20}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'RSS MB':>9}{'PSS MB':>9}")
+        results = []
+        for name in names:
+            result = bench_configuration(name, matrix[name], headers, options)
+            results.append(result)
+            print(f"{name:<20}{result['req_per_s']:>9.1f}{result['p50_ms'] or 0:>9.2f}{result['p99_ms'] or 0:>9.2f}"
+                  f"{result['errors']:>8}{result['rss_mb'] or 0:>9.1f}{result['pss_mb'] or 0:>9.1f}")
+
+    if options.json_path:
+        with open(options.json_path, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "tasks": options.tasks, "connections": options.connections,
+                       "duration": options.duration, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
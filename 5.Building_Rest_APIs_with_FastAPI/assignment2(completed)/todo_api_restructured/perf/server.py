@@ -0,0 +1,77 @@
+"""
+Start and stop the API as a real server (serve.py) for the perf scripts
+that measure it over HTTP. The server inherits this process's
+environment, so set DATABASE_URL, SMTP_* etc. before starting it.
+start_process() runs any other server command the same way.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def process_tree(pid: int) -> List[int]:
+    """pid and all its descendants (Linux /proc)"""
+    pids = [pid]
+    for current in pids:
+        try:
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def start_process(command: List[str], port: int, cwd: str, env: Optional[Dict[str, str]] = None,
+                  timeout: float = 30) -> subprocess.Popen:
+    """Run `command` in `cwd` and wait until GET http://127.0.0.1:port/ returns 200"""
+    # stderr goes to a file: a pipe nobody reads would block a chatty server
+    errors = tempfile.TemporaryFile()
+    server = subprocess.Popen(
+        command, cwd=cwd, env=dict(os.environ) if env is None else env,
+        stdout=subprocess.DEVNULL, stderr=errors
+    )
+    server.error_log = errors
+    start = time.perf_counter()
+    while True:
+        if server.poll() is not None:
+            errors.seek(0)
+            lines = errors.read().decode().strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else f"server exited with {server.returncode}")
+        if time.perf_counter() - start > timeout:
+            stop_server(server)
+            raise RuntimeError(f"server not ready within {timeout}s")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            time.sleep(0.05)
+
+
+def start_server(args: List[str], port: int, timeout: float = 30) -> subprocess.Popen:
+    """Run serve.py with `args` on 127.0.0.1:port and wait until GET / answers"""
+    return start_process(
+        [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log", *args],
+        port, PROJECT_ROOT, timeout=timeout
+    )
+
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        for pid in process_tree(server.pid):
+            try:
+                os.kill(pid, 9)
+            except OSError:
+                pass
+        server.wait()
+    server.error_log.close()
@@ -0,0 +1,182 @@
+"""
+Local SMTP stand-in built on aiosmtpd.
+
+Accepts every message, optionally after an artificial delay, and keeps
+counts so pool/batching behaviour can be checked without a real relay.
+It can also require implicit TLS (a throwaway self-signed certificate)
+and offer AUTH, to check how clients log in.
+Point the app at it with SMTP_SERVER=127.0.0.1, SMTP_PORT=<port> and
+SMTP_USE_TLS=false.
+
+Standalone usage (from the project root):
+    python -m perf.smtp_sink --port 8025 --latency-ms 50
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import socket
+import logging
+import ssl
+import tempfile
+import time
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+
+class SinkHandler:
+    """aiosmtpd handler that counts sessions and messages"""
+    
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.messages = []
+        self.peers = set()
+        self.logins = 0
+    
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        self.peers.add(session.peer)
+        return responses
+    
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+    
+    def authenticate(self, server, session, envelope, mechanism, auth_data) -> AuthResult:
+        """aiosmtpd authenticator: every login succeeds and is counted"""
+        self.logins += 1
+        return AuthResult(success=True)
+
+
+class SMTPSink:
+    """
+    Runs a SinkHandler on a background thread.
+    
+    With auth=True it offers AUTH on the plain connection and accepts any
+    credentials, for clients that always log in. With tls=True the
+    connection is TLS from the start (implicit TLS, as on port 465);
+    clients trust it through client_tls_context().
+    
+    Attributes:
+        port: Listening port (a free one is picked when not given)
+        handler: The SinkHandler, for message and session counts
+    """
+    
+    def __init__(self, port: int = None, latency: float = 0.0, auth: bool = False, tls: bool = False):
+        self.port = port or free_port()
+        self.handler = SinkHandler(latency)
+        self.auth = auth
+        self.tls = tls
+        self._controller = None
+        self._cert_file = None
+    
+    @property
+    def message_count(self) -> int:
+        return len(self.handler.messages)
+    
+    @property
+    def session_count(self) -> int:
+        return len(self.handler.peers)
+    
+    def start(self):
+        options = {}
+        if self.auth:
+            options = {"authenticator": self.handler.authenticate, "auth_require_tls": False}
+            # aiosmtpd logs a deprecation warning about its own login_data on every AUTH
+            logging.getLogger("mail.log").addFilter(_not_login_data_warning)
+        if self.tls:
+            if self._cert_file is None:
+                self._cert_file = _self_signed_certificate()
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(self._cert_file)
+            options["ssl_context"] = context
+        self._controller = Controller(self.handler, hostname="127.0.0.1", port=self.port, **options)
+        self._controller.start()
+        return self
+    
+    def stop(self):
+        if self._controller:
+            self._controller.stop()
+            self._controller = None
+    
+    def client_tls_context(self) -> ssl.SSLContext:
+        """A client context that trusts this sink's certificate"""
+        return ssl.create_default_context(cafile=self._cert_file)
+    
+    def restart(self):
+        """Drop every open client connection, then listen again on the same port"""
+        self.stop()
+        self.start()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+        if self._cert_file:
+            os.remove(self._cert_file)
+            self._cert_file = None
+
+
+def _self_signed_certificate() -> str:
+    """Write a key and a certificate for 127.0.0.1 to one temporary PEM file; returns its path"""
+    # cryptography comes with python-jose[cryptography]
+    import ipaddress
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+    
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    fd, path = tempfile.mkstemp(prefix="smtp-sink-", suffix=".pem")
+    with os.fdopen(fd, "wb") as pem:
+        pem.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ))
+        pem.write(certificate.public_bytes(serialization.Encoding.PEM))
+    return path
+
+
+def _not_login_data_warning(record: logging.LogRecord) -> bool:
+    return "login_data is deprecated" not in record.getMessage()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP sink")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    
+    with SMTPSink(args.port, args.latency_ms / 1000) as sink:
+        print(f"SMTP sink listening on 127.0.0.1:{sink.port} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(5)
+                print(f"{sink.message_count} messages over {sink.session_count} sessions")
+        except KeyboardInterrupt:
+            pass
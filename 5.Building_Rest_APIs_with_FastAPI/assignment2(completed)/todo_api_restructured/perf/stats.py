@@ -0,0 +1,10 @@
+"""
+Summary statistics shared by the perf scripts and the benchmarks.
+"""
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list of samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
@@ -0,0 +1,261 @@
+"""
+Production launcher for the API.
+
+    python serve.py                      # one worker per CPU, uvloop/httptools when installed
+    python serve.py --workers 4 --limit-concurrency 200
+    python serve.py --preload            # build the app once, then fork the workers
+
+Workers default to WEB_CONCURRENCY or the CPU count. uvloop and httptools
+are used when importable (both come with uvicorn[standard]) and fall back
+to asyncio and h11 otherwise.
+
+Without --preload, uvicorn starts each worker as a fresh process that
+imports and builds the app itself. With --preload the app is built once
+in the parent (imports, routers, templates), the parent's objects are
+frozen out of the garbage collector and the workers are forked from it,
+so that memory is shared copy-on-write. Per-process resources (database
+engine, SMTP pool, background jobs) are still created in each worker by
+the app lifespan, after the fork.
+
+With --preload the parent also supervises the workers: a worker that
+exits after it has booted is replaced, with an exponential backoff
+between restarts, and more than MAX_RESTARTS restarts within
+RESTART_WINDOW_SECONDS stop the server. A worker that exits before it
+finished booting (bad DATABASE_URL, lifespan error) stops the server
+straight away, since its replacements would fail the same way. In both
+cases the parent exits with status 1.
+
+--limit-concurrency makes a worker answer 503 instead of queueing once it
+has that many connections and requests in progress. The endpoints run
+their queries on the event loop, so a worker with more requests in
+flight than database connections (pool 5 + overflow 10 by default)
+blocks its loop waiting for one; keep the limit at or below that when
+clients open many connections.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+from collections import deque
+from typing import Optional
+
+import uvicorn
+
+# Restart policy for --preload workers that exit after booting
+RESTART_WINDOW_SECONDS = 60
+MAX_RESTARTS = 5
+RESTART_BACKOFF_SECONDS = 0.5
+RESTART_BACKOFF_MAX_SECONDS = 30
+
+# Exit status of a worker whose startup failed (as uvicorn uses)
+STARTUP_FAILURE = 3
+
+STOP_SIGNALS = {signal.SIGTERM, signal.SIGINT}
+
+
+def default_workers() -> int:
+    return int(os.environ.get("WEB_CONCURRENCY") or os.cpu_count() or 1)
+
+
+def best_available(module: str, fallback: str) -> str:
+    try:
+        __import__(module)
+        return module
+    except ImportError:
+        return fallback
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the API with production settings")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="worker processes (default: WEB_CONCURRENCY or CPU count)")
+    parser.add_argument("--loop", default="auto", choices=["auto", "uvloop", "asyncio"],
+                        help="event loop (auto: uvloop if installed)")
+    parser.add_argument("--http", default="auto", choices=["auto", "httptools", "h11"],
+                        help="HTTP parser (auto: httptools if installed)")
+    parser.add_argument("--backlog", type=int, default=2048,
+                        help="pending connections the socket queues")
+    parser.add_argument("--keep-alive", type=int, default=5,
+                        help="seconds an idle keep-alive connection stays open")
+    parser.add_argument("--limit-concurrency", type=int,
+                        default=int(os.environ["LIMIT_CONCURRENCY"]) if os.environ.get("LIMIT_CONCURRENCY") else None,
+                        help="per worker: answer 503 beyond this many connections/tasks")
+    parser.add_argument("--preload", action="store_true",
+                        help="build the app once and fork workers from it")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", action="store_true")
+    return parser.parse_args(argv)
+
+
+def server_options(args: argparse.Namespace) -> dict:
+    """uvicorn.Config keyword arguments shared by both modes"""
+    return {
+        "loop": best_available("uvloop", "asyncio") if args.loop == "auto" else args.loop,
+        "http": best_available("httptools", "h11") if args.http == "auto" else args.http,
+        "backlog": args.backlog,
+        "timeout_keep_alive": args.keep_alive,
+        "limit_concurrency": args.limit_concurrency,
+        "log_level": args.log_level,
+        "access_log": not args.no_access_log,
+    }
+
+
+def serve_preloaded(args: argparse.Namespace, options: dict) -> int:
+    """
+    Build the app in this process, bind the socket, fork `args.workers`
+    servers and supervise them until stopped.
+
+    Returns:
+        Exit status for the parent: 0 after a clean shutdown, 1 if workers
+        failed to boot or kept dying
+    """
+    from main import create_app
+    from app.core.config import get_settings
+
+    app = create_app()
+    if get_settings().CREATE_TABLES:
+        # Once here, so the workers' lifespans do not race to create them
+        from app.db.init_db import init_db
+        from app.db.session import dispose_engine, init_engine
+        init_db(init_engine())
+        dispose_engine()
+    # Objects that exist now are never touched by the collector again, so
+    # the workers' GC passes do not copy the shared pages
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+
+    # Workers write their pid here once they are serving
+    ready_r, ready_w = os.pipe()
+    os.set_blocking(ready_r, False)
+
+    class Worker(uvicorn.Server):
+        async def startup(self, sockets=None):
+            await super().startup(sockets=sockets)
+            if self.started:
+                os.write(ready_w, struct.pack("i", os.getpid()))
+
+    children = set()
+    booted = set()
+    restarts = deque()
+    stopping = False
+    exit_status = 0
+
+    def spawn():
+        # Blocked across the fork so a SIGTERM sent to a brand new worker
+        # is not handled by its copy of stop() below
+        signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+        pid = os.fork()
+        if pid != 0:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+        else:
+            status = 1
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+                server = Worker(uvicorn.Config(app, **options))
+                server.run(sockets=[sock])
+                status = 0 if server.started else STARTUP_FAILURE
+            finally:
+                os._exit(status)
+        children.add(pid)
+
+    def collect_ready():
+        try:
+            data = os.read(ready_r, 4096)
+        except BlockingIOError:
+            return
+        booted.update(pid for (pid,) in struct.iter_unpack("i", data))
+
+    def stop(signum=None, frame=None):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def backoff() -> Optional[float]:
+        """Seconds to wait before the next restart, or None to give up"""
+        now = time.monotonic()
+        while restarts and restarts[0] < now - RESTART_WINDOW_SECONDS:
+            restarts.popleft()
+        if len(restarts) >= MAX_RESTARTS:
+            return None
+        restarts.append(now)
+        return min(RESTART_BACKOFF_SECONDS * 2 ** (len(restarts) - 1), RESTART_BACKOFF_MAX_SECONDS)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"Preloaded app, forking {args.workers} workers on {args.host}:{args.port} "
+          f"(loop={options['loop']}, http={options['http']})")
+    for _ in range(args.workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        collect_ready()
+        status = os.waitstatus_to_exitcode(status)
+        if stopping:
+            continue
+        if pid not in booted:
+            print(f"Worker {pid} exited with status {status} before it finished booting, stopping",
+                  file=sys.stderr)
+            exit_status = 1
+            stop()
+            continue
+        booted.discard(pid)
+        delay = backoff()
+        if delay is None:
+            print(f"Worker {pid} exited with status {status}; more than {MAX_RESTARTS} restarts "
+                  f"in {RESTART_WINDOW_SECONDS}s, stopping", file=sys.stderr)
+            exit_status = 1
+            stop()
+            continue
+        print(f"Worker {pid} exited with status {status}, starting a new one in {delay:.1f}s")
+        deadline = time.monotonic() + delay
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if not stopping:
+            spawn()
+    sock.close()
+    os.close(ready_r)
+    os.close(ready_w)
+    return exit_status
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = server_options(args)
+    if args.preload:
+        sys.exit(serve_preloaded(args, options))
+    uvicorn.run(
+        "main:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        **options
+    )
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
@@ -0,0 +1,53 @@
+"""
+Fixtures shared by the tests: the app wired to a seeded in-memory
+database (perf.harness.Harness) and a counter of the SQL statements a
+request issues.
+"""
+import os
+
+# End /api/user/tasks/stream right after it opens so requests to it return
+os.environ.setdefault("TASK_STREAM_MAX_SECONDS", "0")
+
+import pytest  # noqa: E402
+
+from perf.harness import Harness  # noqa: E402  (sets the required settings)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from main import app
+    return app
+
+
+@pytest.fixture
+def make_harness(app):
+    """Build Harness(app, **options); every harness is closed after the test"""
+    harnesses = []
+
+    def make(**options) -> Harness:
+        harness = Harness(app, **options)
+        harnesses.append(harness)
+        return harness
+
+    yield make
+    # Newest first: each harness restores the send_email it replaced
+    for harness in reversed(harnesses):
+        harness.close()
+
+
+@pytest.fixture
+def harness(make_harness) -> Harness:
+    """10 tasks assigned by harness.admin to harness.user"""
+    return make_harness(task_count=10)
+
+
+@pytest.fixture
+def count_queries(harness):
+    """
+    Context manager counting the statements issued inside it:
+
+        with count_queries() as counter:
+            harness.client.get(...)
+        assert counter.count <= 2
+    """
+    return harness.count_statements
@@ -0,0 +1,33 @@
+"""
+is_admin_token accepts exactly the tokens get_admin_user accepts.
+"""
+import pytest
+
+from app.services.auth_service import create_access_token, is_admin_token
+
+
+@pytest.mark.parametrize("subject, expected", [
+    ("admin0@example.com", True),
+    ("user0@example.com", False),
+    ("nobody@example.com", False),
+])
+def test_is_admin_token(harness, subject, expected):
+    db = harness.SessionLocal()
+    try:
+        assert is_admin_token(create_access_token({"sub": subject}), db) is expected
+    finally:
+        db.close()
+
+
+def test_is_admin_token_rejects_garbage(harness):
+    db = harness.SessionLocal()
+    try:
+        assert is_admin_token("not-a-token", db) is False
+    finally:
+        db.close()
+
+
+def test_admin_routes_agree(harness):
+    # The same tokens, through get_admin_user
+    assert harness.client.get("/api/admin/tasks", headers=harness.admin_headers).status_code == 200
+    assert harness.client.get("/api/admin/tasks", headers=harness.user_headers).status_code == 403
@@ -0,0 +1,60 @@
+"""
+The event broker's building blocks: a slow subscriber gets RESET instead
+of an unbounded backlog, EVENT_BROKER names are validated, and the
+socket directory must be private to this user.
+"""
+import asyncio
+import os
+
+import pytest
+
+from app.core import events
+
+
+def test_subscription_overflow_resets():
+    broker = events.MemoryBroker(queue_size=3)
+
+    async def run():
+        async with broker.subscribe("user:1") as subscription:
+            for i in range(4):
+                broker.publish("user:1", f"message {i}")
+            first = await subscription.get()
+            broker.publish("user:1", "after reset")
+            return first, await subscription.get()
+
+    dropped = events.events_dropped.labels("slow_subscriber").value
+    assert asyncio.run(run()) == (events.RESET, "after reset")
+    assert events.events_dropped.labels("slow_subscriber").value == dropped + 3
+    assert broker._subscriptions == {}
+
+
+@pytest.mark.parametrize("name", ["redis", "no.such.module:Broker", "app.core.events:NoSuchBroker"])
+def test_create_broker_rejects_unknown_names(name):
+    with pytest.raises(ValueError, match="Unknown EVENT_BROKER"):
+        events.create_broker(name)
+
+
+def test_ensure_private_dir_creates_0700(tmp_path):
+    path = tmp_path / "events"
+
+    events.ensure_private_dir(str(path))
+
+    assert path.stat().st_mode & 0o777 == 0o700
+
+
+def test_ensure_private_dir_rejects_open_mode(tmp_path):
+    path = tmp_path / "events"
+    path.mkdir()
+    path.chmod(0o755)
+
+    with pytest.raises(PermissionError, match="must be 0700"):
+        events.ensure_private_dir(str(path))
+
+
+def test_ensure_private_dir_rejects_other_owner(tmp_path, monkeypatch):
+    path = tmp_path / "events"
+    path.mkdir(mode=0o700)
+    monkeypatch.setattr(os, "getuid", lambda: path.stat().st_uid + 1)
+
+    with pytest.raises(PermissionError, match="is owned by uid"):
+        events.ensure_private_dir(str(path))
@@ -0,0 +1,49 @@
+"""
+?expand= on the task listings issues a constant number of statements
+whatever the page size: no N+1 through Task.creator or Task.assigned_user.
+"""
+import pytest
+
+from app.models.task import Task
+
+
+PAGE_SIZES = [1, 10, 100]
+EXPANDS = [None, "creator", "assignee", "creator,assignee"]
+
+
+def _seed(make_harness, page_size: int, all_to_first_user: bool):
+    """
+    `page_size` tasks, each created by a different admin. Assignees are
+    distinct too, unless `all_to_first_user`, which gives every task to
+    harness.user so its own listing grows with the page size.
+    """
+    harness = make_harness(task_count=page_size, distinct_users=page_size)
+    if all_to_first_user:
+        db = harness.SessionLocal()
+        db.query(Task).update({Task.assigned_to_id: harness.user.id})
+        db.commit()
+        db.close()
+    return harness
+
+
+@pytest.mark.parametrize("expand", EXPANDS)
+@pytest.mark.parametrize("path, headers_attr, all_to_first_user", [
+    ("/api/admin/tasks", "admin_headers", False),
+    # One assignee, but a different creator per row
+    ("/api/user/tasks", "user_headers", True),
+])
+def test_statement_count_is_constant(make_harness, path, headers_attr, all_to_first_user, expand):
+    counts = {}
+    for page_size in PAGE_SIZES:
+        harness = _seed(make_harness, page_size, all_to_first_user)
+        url = f"{path}?limit={page_size}"
+        if expand:
+            url += f"&expand={expand}"
+        with harness.count_statements() as counter:
+            response = harness.client.get(url, headers=getattr(harness, headers_attr))
+
+        assert response.status_code == 200, response.text
+        assert len(response.json()) == page_size
+        counts[page_size] = counter.count
+
+    assert len(set(counts.values())) == 1, f"statements by page size: {counts}"
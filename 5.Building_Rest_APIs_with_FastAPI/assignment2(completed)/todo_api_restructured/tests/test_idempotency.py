@@ -0,0 +1,164 @@
+"""
+Idempotency-Key on the task POST/PUT routes (app.middleware.idempotency):
+concurrent duplicates and retries run the handler once, a reused key with
+a different request is rejected, only 2xx responses are replayed, and
+expired or foreign-process keys behave as documented.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app.models.idempotency import IdempotencyKey
+from app.models.task import Task
+from app.services.auth_service import create_access_token
+from app.services.idempotency_service import request_hash, storage_key
+
+
+DUPLICATES = 5
+
+
+@pytest.fixture
+def harness(make_harness):
+    """Two admins and two users, no tasks yet"""
+    return make_harness(task_count=0, distinct_users=2)
+
+
+@pytest.fixture
+def task_body(harness):
+    return {"assigned_to_id": harness.user.id, "name": "Retried task"}
+
+
+def post_task(harness, key, body, headers=None):
+    return harness.client.post(
+        "/api/admin/tasks", json=body,
+        headers={**(headers or harness.admin_headers), "Idempotency-Key": key}
+    )
+
+
+def task_count(harness) -> int:
+    db = harness.SessionLocal()
+    try:
+        return db.query(Task).count()
+    finally:
+        db.close()
+
+
+def test_concurrent_duplicates_run_once(harness, task_body):
+    async def send_all():
+        transport = httpx.ASGITransport(app=harness.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/api/admin/tasks", json=task_body,
+                            headers={**harness.admin_headers, "Idempotency-Key": "create-1"})
+                for _ in range(DUPLICATES)
+            ))
+
+    responses = asyncio.run(send_all())
+
+    assert [r.status_code for r in responses] == [201] * DUPLICATES
+    replayed = [r.headers.get("Idempotent-Replayed") == "true" for r in responses]
+    assert replayed.count(False) == 1
+    assert len({r.content for r in responses}) == 1
+    assert task_count(harness) == 1
+    assert len(harness.sent_emails) == 1
+
+
+def test_retry_replays_without_running_the_handler(harness, task_body):
+    first = post_task(harness, "create-1", task_body)
+
+    with harness.count_statements() as counter:
+        retry = post_task(harness, "create-1", task_body)
+
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    # Only the key lookup
+    assert counter.count == 1
+    assert task_count(harness) == 1
+    assert len(harness.sent_emails) == 1
+
+
+def test_same_key_different_request(harness, task_body):
+    post_task(harness, "create-1", task_body)
+
+    mismatch = post_task(harness, "create-1", {**task_body, "name": "Something else"})
+
+    assert mismatch.status_code == 422
+    assert task_count(harness) == 1
+
+
+def test_keys_are_per_user(harness, task_body):
+    other_headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin1@example.com'})}"}
+
+    post_task(harness, "create-1", task_body)
+    other = post_task(harness, "create-1", task_body, headers=other_headers)
+
+    assert other.status_code == 201
+    assert "Idempotent-Replayed" not in other.headers
+    assert task_count(harness) == 2
+
+
+def test_put_complete_replayed(harness, task_body):
+    task_id = post_task(harness, "create-1", task_body).json()["id"]
+    emails = len(harness.sent_emails)
+
+    completions = [
+        harness.client.put(f"/api/user/tasks/{task_id}/complete",
+                           headers={**harness.user_headers, "Idempotency-Key": "done-1"})
+        for _ in range(2)
+    ]
+
+    assert [r.status_code for r in completions] == [200, 200]
+    assert completions[1].headers.get("Idempotent-Replayed") == "true"
+    assert len(harness.sent_emails) == emails + 1
+
+
+def test_client_errors_not_stored(harness):
+    missing = [
+        harness.client.put("/api/user/tasks/999999/complete",
+                           headers={**harness.user_headers, "Idempotency-Key": "missing-1"})
+        for _ in range(2)
+    ]
+
+    assert [r.status_code for r in missing] == [404, 404]
+    assert "Idempotent-Replayed" not in missing[1].headers
+
+
+def test_expired_key_runs_again(harness, task_body):
+    post_task(harness, "create-1", task_body)
+    db = harness.SessionLocal()
+    db.query(IdempotencyKey).update({IdempotencyKey.expires_at: datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+
+    expired = post_task(harness, "create-1", task_body)
+
+    assert expired.status_code == 201
+    assert "Idempotent-Replayed" not in expired.headers
+    assert task_count(harness) == 2
+
+
+def test_key_held_by_another_process(harness, task_body):
+    # A claim another worker process made and has not finished yet
+    content = json.dumps(task_body).encode()
+    now = datetime.utcnow()
+    db = harness.SessionLocal()
+    db.add(IdempotencyKey(
+        key=storage_key(harness.admin.email, "busy-1"),
+        request_hash=request_hash("POST", "/api/admin/tasks", b"", content),
+        created_at=now, expires_at=now + timedelta(hours=1)
+    ))
+    db.commit()
+    db.close()
+
+    busy = harness.client.post(
+        "/api/admin/tasks", content=content,
+        headers={**harness.admin_headers, "Content-Type": "application/json", "Idempotency-Key": "busy-1"}
+    )
+
+    assert busy.status_code == 409
+    assert busy.headers.get("Retry-After") == "1"
+    assert task_count(harness) == 0
@@ -0,0 +1,131 @@
+"""
+SQL statement budgets for every API route.
+
+Each route is called once against a freshly seeded in-memory database and
+the statements it issues are counted. A route that goes over its budget,
+has no budget, or returns an error fails the test, so N+1 queries and
+extra refresh()/lazy loads show up in `pytest`.
+
+When a change legitimately needs more statements, raise the budget here in
+the same commit and say why. `pytest tests/test_query_budgets.py -v`
+lists the statements of a failing route.
+"""
+import tracemalloc
+
+import pytest
+from fastapi.routing import APIRoute
+
+from app.core import memory
+from perf.harness import SEED_PASSWORD
+
+
+# Maximum statements per request, keyed by "METHOD /route/template"
+BUDGETS = {
+    "GET /": 0,
+    "POST /api/auth/register": 3,
+    "POST /api/auth/login": 1,
+    "POST /api/auth/verify-email": 2,
+    "POST /api/admin/tasks": 6,
+    "GET /api/admin/tasks": 2,
+    "PUT /api/admin/tasks/{task_id}": 4,
+    "DELETE /api/admin/tasks/{task_id}": 3,
+    "GET /api/user/tasks": 2,
+    "GET /api/user/tasks/stream": 1,
+    "GET /api/user/tasks/{task_id}": 2,
+    "PUT /api/user/tasks/{task_id}/complete": 6,
+    "PUT /api/user/notifications": 2,
+    "POST /api/user/unsubscribe": 2,
+    "GET /api/internal/sql-stats": 1,
+    "GET /api/internal/smtp-breaker": 1,
+    "POST /api/internal/memory/start": 1,
+    "GET /api/internal/memory/snapshot": 1,
+    "GET /api/internal/memory/requests": 1,
+    "POST /api/internal/memory/stop": 1,
+    "GET /metrics": 0,
+}
+
+# Routes that need tracing started first (not counted)
+NEEDS_TRACING = {
+    "GET /api/internal/memory/snapshot",
+    "GET /api/internal/memory/requests",
+    "POST /api/internal/memory/stop",
+}
+
+
+def build_requests(harness):
+    """One representative, successful request per route: {route: (method, url, kwargs)}"""
+    admin = {"headers": harness.admin_headers}
+    user = {"headers": harness.user_headers}
+    return {
+        "GET /": ("GET", "/", {}),
+        "POST /api/auth/register": ("POST", "/api/auth/register",
+            {"json": {"email": "new@example.com", "password": "new-password"}}),
+        "POST /api/auth/login": ("POST", "/api/auth/login",
+            {"json": {"email": harness.user.email, "password": SEED_PASSWORD}}),
+        "POST /api/auth/verify-email": ("POST", "/api/auth/verify-email",
+            {"params": {"email": harness.user.email, "token": "seed-token"}}),
+        "POST /api/admin/tasks": ("POST", "/api/admin/tasks",
+            {"json": {"assigned_to_id": harness.user.id, "name": "Budget task"}, **admin}),
+        "GET /api/admin/tasks": ("GET", "/api/admin/tasks", admin),
+        "PUT /api/admin/tasks/{task_id}": ("PUT", "/api/admin/tasks/1", {"json": {"name": "Renamed"}, **admin}),
+        "DELETE /api/admin/tasks/{task_id}": ("DELETE", "/api/admin/tasks/1", admin),
+        "GET /api/user/tasks": ("GET", "/api/user/tasks", user),
+        "GET /api/user/tasks/stream": ("GET", "/api/user/tasks/stream", user),
+        "GET /api/user/tasks/{task_id}": ("GET", "/api/user/tasks/1", user),
+        "PUT /api/user/tasks/{task_id}/complete": ("PUT", "/api/user/tasks/1/complete", user),
+        "PUT /api/user/notifications": ("PUT", "/api/user/notifications",
+            {"json": {"receive_notifications": False}, **user}),
+        "POST /api/user/unsubscribe": ("POST", "/api/user/unsubscribe", {"params": {"email": harness.user.email}}),
+        "GET /api/internal/sql-stats": ("GET", "/api/internal/sql-stats", admin),
+        "GET /api/internal/smtp-breaker": ("GET", "/api/internal/smtp-breaker", admin),
+        "POST /api/internal/memory/start": ("POST", "/api/internal/memory/start", {"params": {"frames": 1}, **admin}),
+        "GET /api/internal/memory/snapshot": ("GET", "/api/internal/memory/snapshot", admin),
+        "GET /api/internal/memory/requests": ("GET", "/api/internal/memory/requests", admin),
+        "POST /api/internal/memory/stop": ("POST", "/api/internal/memory/stop", admin),
+        "GET /metrics": ("GET", "/metrics", {}),
+    }
+
+
+def app_routes(app):
+    """All "METHOD /path" pairs the app serves, docs/openapi excluded"""
+    routes = set()
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            routes.update(f"{method} {route.path}" for method in route.methods)
+    return routes
+
+
+@pytest.fixture
+def stop_tracing():
+    """Tracing is process wide; never leave it running for the next test"""
+    yield
+    if tracemalloc.is_tracing():
+        memory.stop()
+
+
+def test_every_route_has_a_budget(app):
+    assert sorted(app_routes(app) - BUDGETS.keys()) == []
+
+
+def test_every_budget_has_a_request(harness):
+    assert sorted(BUDGETS.keys() - build_requests(harness).keys()) == []
+
+
+@pytest.mark.parametrize("route", list(BUDGETS))
+def test_route_within_budget(route, harness, count_queries, stop_tracing):
+    db = harness.SessionLocal()
+    db.merge(harness.user).email_verification_token = "seed-token"
+    db.commit()
+    db.close()
+    if route in NEEDS_TRACING:
+        memory.start(1)
+    method, url, kwargs = build_requests(harness)[route]
+
+    with count_queries() as counter:
+        response = harness.client.request(method, url, **kwargs)
+
+    assert response.status_code < 400, response.text
+    statements = "\n".join(" ".join(statement.split())[:160] for statement in counter.statements)
+    assert counter.count <= BUDGETS[route], (
+        f"{counter.count} statements, budget is {BUDGETS[route]}:\n{statements}"
+    )
@@ -0,0 +1,40 @@
+"""
+Argon2 runs off the event loop with bounded concurrency, and callers
+waiting for a slot show up in argon2_queue_depth.
+"""
+import asyncio
+
+from app.core import metrics, security
+from app.core.config import get_settings
+
+
+def test_bounded_argon2_queue_depth(monkeypatch):
+    monkeypatch.setattr(get_settings(), "ARGON2_MAX_CONCURRENCY", 1)
+    hashed = security.hash_password("queue-depth-password")
+
+    async def run():
+        ticks = 0
+        depths = []
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                depths.append(metrics.argon2_queue_depth.labels().value)
+                await asyncio.sleep(0.005)
+
+        watch = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(
+            security.verify_password_async("queue-depth-password", hashed) for _ in range(3)
+        ))
+        watch.cancel()
+        return results, ticks, depths
+
+    results, ticks, depths = asyncio.run(run())
+
+    assert results == [True, True, True]
+    # The loop kept running while the three verifies were hashing
+    assert ticks > 3
+    assert max(depths) == 2
+    assert metrics.argon2_queue_depth.labels().value == 0
+    assert metrics.argon2_in_progress.labels().value == 0
@@ -0,0 +1,173 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the wrapped function while the breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker with a rolling failure window.
+
+    - closed: calls go through; failures inside the last window_seconds are
+      counted and failure_threshold of them open the circuit
+    - open: calls fail fast with CircuitOpenError for reset_timeout seconds
+    - half-open: up to half_open_max_calls trial calls go through; a success
+      closes the circuit, a failure opens it again
+
+    Only exceptions in failure_exceptions count as failures (by default
+    connection problems and timeouts), so e.g. a refused recipient does not
+    take the whole relay out of service. State is only touched between
+    awaits, so no lock is needed on a single event loop.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        window_seconds: float = 60,
+        reset_timeout: float = 30,
+        half_open_max_calls: int = 1,
+        failure_exceptions: Tuple[Type[BaseException], ...] = (OSError, asyncio.TimeoutError),
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window_seconds = window_seconds
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.failure_exceptions = failure_exceptions
+
+        self._state = self.CLOSED
+        self._failures: deque = deque()
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+        # Counters for the stats endpoint
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self.retry_after() <= 0:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a trial call through"""
+        if self._state != self.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow_request(self) -> bool:
+        """Whether a call may go through now; reserves a half-open trial slot"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        # In the closed state the failure window is left alone: it only
+        # forgets failures as they age out, so successes in between do not
+        # hide a burst of failures
+        self.successes += 1
+        if self._state == self.HALF_OPEN:
+            self._state = self.CLOSED
+            self._failures.clear()
+
+    def record_failure(self, error: Optional[BaseException] = None):
+        now = time.monotonic()
+        self.failures += 1
+        if error is not None:
+            self.last_error = f"{type(error).__name__}: {error}"
+
+        if self._state == self.HALF_OPEN:
+            self._open(now)
+            return
+
+        self._failures.append(now)
+        self._prune(now)
+        if self._state == self.CLOSED and len(self._failures) >= self.failure_threshold:
+            self._open(now)
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Await func(*args, **kwargs) through the breaker.
+
+        Raises:
+            CircuitOpenError: The circuit is open (func is not called)
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_after())
+        recorded = False
+        try:
+            result = await func(*args, **kwargs)
+        except self.failure_exceptions as e:
+            recorded = True
+            self.record_failure(e)
+            raise
+        else:
+            recorded = True
+            self.record_success()
+            return result
+        finally:
+            if not recorded:
+                # Not a relay failure: another error, or cancelled. Free the
+                # half-open slot without changing state, or no trial would
+                # ever be let through again
+                self._release_trial()
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._prune(time.monotonic())
+        return {
+            "name": self.name,
+            "state": self.state,
+            "failures_in_window": len(self._failures),
+            "failure_threshold": self.failure_threshold,
+            "window_seconds": self.window_seconds,
+            "retry_after_seconds": round(self.retry_after(), 3),
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+            "last_error": self.last_error,
+        }
+
+    def reset(self):
+        """Force the circuit closed and forget recent failures"""
+        self._state = self.CLOSED
+        self._failures.clear()
+        self._half_open_calls = 0
+
+    def _release_trial(self):
+        if self._state == self.HALF_OPEN:
+            self._half_open_calls = max(0, self._half_open_calls - 1)
+
+    def _open(self, now: float):
+        self._state = self.OPEN
+        self._opened_at = now
+        self._failures.clear()
+        self.times_opened += 1
+
+    def _prune(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._failures and self._failures[0] < cutoff:
+            self._failures.popleft()
@@ -5,6 +5,8 @@ load_dotenv()
 
 # Database Configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./advanced_todo.db")
+# Create missing tables when the app starts (not at import time)
+CREATE_TABLES = os.getenv("CREATE_TABLES", "true").lower() == "true"
 
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
@@ -17,6 +19,35 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
 SMTP_USER = os.getenv("SMTP_USER", "your-email@gmail.com")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "your-app-password")
 FROM_EMAIL = os.getenv("FROM_EMAIL", "noreply@todoapp.com")
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 30))
+
+# SMTP circuit breaker: this many connection failures within the window
+# open the circuit; the outbox then holds mail until the reset timeout passes
+SMTP_BREAKER_FAILURE_THRESHOLD = int(os.getenv("SMTP_BREAKER_FAILURE_THRESHOLD", 5))
+SMTP_BREAKER_WINDOW_SECONDS = float(os.getenv("SMTP_BREAKER_WINDOW_SECONDS", 60))
+SMTP_BREAKER_RESET_TIMEOUT_SECONDS = float(os.getenv("SMTP_BREAKER_RESET_TIMEOUT_SECONDS", 30))
+
+# Compiled email templates are cached here between runs ("" uses Jinja's
+# default directory under the system temp dir)
+EMAIL_TEMPLATE_CACHE_DIR = os.getenv("EMAIL_TEMPLATE_CACHE_DIR", "")
+
+# Email Outbox Configuration
+OUTBOX_WORKER_IN_APP = os.getenv("OUTBOX_WORKER_IN_APP", "true").lower() == "true"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 50))
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", 2))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", 30))
+OUTBOX_CLAIM_TIMEOUT_SECONDS = int(os.getenv("OUTBOX_CLAIM_TIMEOUT_SECONDS", 300))
+
+# EmailNotificationLog rows are buffered and written in batches
+LOG_BUFFER_BATCH_SIZE = int(os.getenv("LOG_BUFFER_BATCH_SIZE", 200))
+LOG_BUFFER_FLUSH_INTERVAL_SECONDS = float(os.getenv("LOG_BUFFER_FLUSH_INTERVAL_SECONDS", 1))
+LOG_BUFFER_MAX_ROWS = int(os.getenv("LOG_BUFFER_MAX_ROWS", 10000))
+
+# Notifications for the same recipient and event type queued within this
+# window are sent as one digest email (0 sends each one immediately)
+DIGEST_WINDOW_SECONDS = int(os.getenv("DIGEST_WINDOW_SECONDS", 60))
+DIGEST_MAX_ITEMS = int(os.getenv("DIGEST_MAX_ITEMS", 100))
 
 # OAuth Configuration
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
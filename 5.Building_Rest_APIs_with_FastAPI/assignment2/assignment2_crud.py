@@ -115,8 +115,12 @@ def create_or_get_oauth_user(
 
 # ==================== Task CRUD ====================
 
-def create_task(db: Session, task: TaskCreate, admin_id: int) -> Task:
-    """Create a new task and assign it to a user"""
+def create_task(db: Session, task: TaskCreate, admin_id: int, commit: bool = True) -> Task:
+    """
+    Create a new task and assign it to a user.
+    With commit=False the task is only flushed, so the caller can add more
+    rows (e.g. an outbox email) to the same transaction.
+    """
     db_task = Task(
         created_by_id=admin_id,
         assigned_to_id=task.assigned_to_id,
@@ -129,8 +133,11 @@ def create_task(db: Session, task: TaskCreate, admin_id: int) -> Task:
         is_admin_assigned=True
     )
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    if commit:
+        db.commit()
+        db.refresh(db_task)
+    else:
+        db.flush()
     return db_task
 
 
@@ -211,9 +218,13 @@ def update_task_status(
     db: Session,
     task_id: int,
     user_id: int,
-    new_status: TaskStatus
+    new_status: TaskStatus,
+    commit: bool = True
 ) -> Optional[Task]:
-    """Update task status (User can only update their assigned tasks)"""
+    """
+    Update task status (User can only update their assigned tasks).
+    With commit=False the change is only flushed (see create_task).
+    """
     db_task = db.query(Task).filter(
         Task.id == task_id,
         Task.assigned_to_id == user_id
@@ -229,8 +240,11 @@ def update_task_status(
     db_task.status = new_status
     db_task.updated_at = datetime.utcnow()
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    if commit:
+        db.commit()
+        db.refresh(db_task)
+    else:
+        db.flush()
     return db_task
 
 
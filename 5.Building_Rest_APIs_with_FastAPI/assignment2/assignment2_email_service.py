@@ -1,14 +1,27 @@
 import aiosmtplib
+import json
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from jinja2 import Template
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache, select_autoescape
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 
 from assignment2_config import (
-    SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, FROM_EMAIL
+    SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, FROM_EMAIL, SMTP_TIMEOUT,
+    SMTP_BREAKER_FAILURE_THRESHOLD, SMTP_BREAKER_WINDOW_SECONDS,
+    SMTP_BREAKER_RESET_TIMEOUT_SECONDS, DIGEST_WINDOW_SECONDS, EMAIL_TEMPLATE_CACHE_DIR
+)
+from assignment2_circuit_breaker import CircuitBreaker
+from assignment2_models import EmailOutbox, Task, User
+
+# Stops every send from waiting on SMTP timeouts while the relay is down
+smtp_breaker = CircuitBreaker(
+    "smtp",
+    failure_threshold=SMTP_BREAKER_FAILURE_THRESHOLD,
+    window_seconds=SMTP_BREAKER_WINDOW_SECONDS,
+    reset_timeout=SMTP_BREAKER_RESET_TIMEOUT_SECONDS,
 )
-from assignment2_models import EmailNotificationLog, Task, User
 
 # Email templates
 TASK_ASSIGNMENT_TEMPLATE = """
@@ -86,93 +99,411 @@ TASK_COMPLETION_TEMPLATE = """
 </html>
 """
 
+TASK_ASSIGNMENT_DIGEST_TEMPLATE = """
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; }
+        .container { max-width: 600px; margin: 0 auto; }
+        .header { background-color: #4CAF50; color: white; padding: 20px; }
+        .content { padding: 20px; }
+        .task-details { background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin-bottom: 10px; }
+        .footer { text-align: center; color: #999; font-size: 12px; margin-top: 20px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>{{ items|length }} New Tasks Assigned</h1>
+        </div>
+        <div class="content">
+            <p>Hi {{ items[0].user_name }},</p>
+            <p>The following tasks have been assigned to you:</p>
+            {% for item in items %}
+            <div class="task-details">
+                <p><strong>Task Name:</strong> {{ item.task_name }}</p>
+                <p><strong>Description:</strong> {{ item.task_description }}</p>
+                <p><strong>Start Date:</strong> {{ item.start_date }}</p>
+                <p><strong>End Date:</strong> {{ item.end_date }}</p>
+                <p><strong>Priority:</strong> {{ item.priority }}</p>
+            </div>
+            {% endfor %}
+            <p>Please log in to your account to view more details and manage your tasks.</p>
+            <p>Best regards,<br/>Todo App Team</p>
+        </div>
+        <div class="footer">
+            <p>If you don't want to receive these emails, you can unsubscribe from your account settings.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+TASK_COMPLETION_DIGEST_TEMPLATE = """
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; }
+        .container { max-width: 600px; margin: 0 auto; }
+        .header { background-color: #2196F3; color: white; padding: 20px; }
+        .content { padding: 20px; }
+        .task-details { background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin-bottom: 10px; }
+        .footer { text-align: center; color: #999; font-size: 12px; margin-top: 20px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>{{ items|length }} Tasks Completed</h1>
+        </div>
+        <div class="content">
+            <p>Hi {{ items[0].admin_name }},</p>
+            <p>The following tasks have been completed:</p>
+            {% for item in items %}
+            <div class="task-details">
+                <p><strong>Task Name:</strong> {{ item.task_name }}</p>
+                <p><strong>Description:</strong> {{ item.task_description }}</p>
+                <p><strong>Completed By:</strong> {{ item.user_name }}</p>
+                <p><strong>Completion Time:</strong> {{ item.completion_time }}</p>
+            </div>
+            {% endfor %}
+            <p>Please log in to review the task completion details.</p>
+            <p>Best regards,<br/>Todo App Team</p>
+        </div>
+        <div class="footer">
+            <p>This is an automated notification for task management.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+VERIFICATION_TEMPLATE = """
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; }
+        .container { max-width: 600px; margin: 0 auto; }
+        .header { background-color: #FF9800; color: white; padding: 20px; }
+        .content { padding: 20px; }
+        .task-details { background-color: #f5f5f5; padding: 15px; border-radius: 5px; }
+        .footer { text-align: center; color: #999; font-size: 12px; margin-top: 20px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>Verify Your Email</h1>
+        </div>
+        <div class="content">
+            <p>Hi {{ user_name }},</p>
+            <p>Thanks for registering. Use this token to verify your email address:</p>
+            <div class="task-details">
+                <p><strong>Verification Token:</strong> {{ token }}</p>
+            </div>
+            <p>Submit it with your email to <code>POST /auth/verify-email</code> to activate your account.</p>
+            <p>Best regards,<br/>Todo App Team</p>
+        </div>
+        <div class="footer">
+            <p>If you did not create an account, you can ignore this email.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+# Plain-text versions, sent alongside the HTML as multipart/alternative
+TASK_ASSIGNMENT_TEXT_TEMPLATE = """Hi {{ user_name }},
+
+A new task has been assigned to you:
+
+Task Name: {{ task_name }}
+Description: {{ task_description }}
+Start Date: {{ start_date }}
+End Date: {{ end_date }}
+Priority: {{ priority }}
+
+Please log in to your account to view more details and manage your tasks.
+
+Best regards,
+Todo App Team
+
+If you don't want to receive these emails, you can unsubscribe from your account settings.
+"""
+
+TASK_COMPLETION_TEXT_TEMPLATE = """Hi {{ admin_name }},
+
+A task has been completed by {{ user_name }}:
+
+Task Name: {{ task_name }}
+Description: {{ task_description }}
+Completed By: {{ user_name }}
+Completion Time: {{ completion_time }}
+
+Please log in to review the task completion details.
+
+Best regards,
+Todo App Team
+"""
+
+TASK_ASSIGNMENT_DIGEST_TEXT_TEMPLATE = """Hi {{ items[0].user_name }},
+
+The following tasks have been assigned to you:
+{% for item in items %}
+Task Name: {{ item.task_name }}
+Description: {{ item.task_description }}
+Start Date: {{ item.start_date }}
+End Date: {{ item.end_date }}
+Priority: {{ item.priority }}
+{% endfor %}
+Please log in to your account to view more details and manage your tasks.
+
+Best regards,
+Todo App Team
+
+If you don't want to receive these emails, you can unsubscribe from your account settings.
+"""
+
+TASK_COMPLETION_DIGEST_TEXT_TEMPLATE = """Hi {{ items[0].admin_name }},
+
+The following tasks have been completed:
+{% for item in items %}
+Task Name: {{ item.task_name }}
+Description: {{ item.task_description }}
+Completed By: {{ item.user_name }}
+Completion Time: {{ item.completion_time }}
+{% endfor %}
+Please log in to review the task completion details.
+
+Best regards,
+Todo App Team
+"""
+
+VERIFICATION_TEXT_TEMPLATE = """Hi {{ user_name }},
+
+Thanks for registering. Use this token to verify your email address:
+
+Verification Token: {{ token }}
+
+Submit it with your email to POST /auth/verify-email to activate your account.
+
+Best regards,
+Todo App Team
+
+If you did not create an account, you can ignore this email.
+"""
+
+# Templates are compiled once at import. Names ending in .html are
+# autoescaped; the bytecode cache lets later processes skip compilation.
+template_env = Environment(
+    loader=DictLoader({
+        "task_assigned.html": TASK_ASSIGNMENT_TEMPLATE,
+        "task_assigned.txt": TASK_ASSIGNMENT_TEXT_TEMPLATE,
+        "task_assigned_digest.html": TASK_ASSIGNMENT_DIGEST_TEMPLATE,
+        "task_assigned_digest.txt": TASK_ASSIGNMENT_DIGEST_TEXT_TEMPLATE,
+        "task_completed.html": TASK_COMPLETION_TEMPLATE,
+        "task_completed.txt": TASK_COMPLETION_TEXT_TEMPLATE,
+        "task_completed_digest.html": TASK_COMPLETION_DIGEST_TEMPLATE,
+        "task_completed_digest.txt": TASK_COMPLETION_DIGEST_TEXT_TEMPLATE,
+        "verification.html": VERIFICATION_TEMPLATE,
+        "verification.txt": VERIFICATION_TEXT_TEMPLATE,
+    }),
+    autoescape=select_autoescape(enabled_extensions=("html",), default_for_string=True),
+    bytecode_cache=FileSystemBytecodeCache(EMAIL_TEMPLATE_CACHE_DIR or None),
+    auto_reload=False,
+)
+TEMPLATES = {name: template_env.get_template(name) for name in template_env.list_templates()}
+
+
+def render_email(template_name: str, **context) -> Tuple[str, str]:
+    """
+    Render a named template pair from the same context.
+    
+    Args:
+        template_name: Base name, e.g. "task_assigned"
+    
+    Returns:
+        (html_content, text_content)
+    """
+    return (
+        TEMPLATES[f"{template_name}.html"].render(**context),
+        TEMPLATES[f"{template_name}.txt"].render(**context),
+    )
+
+
+async def deliver_email(
+    to_email: str,
+    subject: str,
+    html_content: str,
+    text_content: Optional[str] = None
+):
+    """
+    Send email via SMTP, raising on failure.
+    
+    Raises:
+        CircuitOpenError: The SMTP breaker is open; nothing was sent
+    """
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = FROM_EMAIL
+    message["To"] = to_email
+
+    # Clients show the last part they support, so the HTML goes last
+    if text_content is not None:
+        message.attach(MIMEText(text_content, "plain"))
+    message.attach(MIMEText(html_content, "html"))
+
+    await smtp_breaker.call(_smtp_send, to_email, message.as_string())
+
 
-async def send_email(to_email: str, subject: str, html_content: str) -> bool:
+async def _smtp_send(to_email: str, message: str):
+    async with aiosmtplib.SMTP(hostname=SMTP_SERVER, port=SMTP_PORT, timeout=SMTP_TIMEOUT) as smtp:
+        await smtp.login(SMTP_USER, SMTP_PASSWORD)
+        await smtp.sendmail(FROM_EMAIL, [to_email], message)
+
+
+async def send_email(
+    to_email: str,
+    subject: str,
+    html_content: str,
+    text_content: Optional[str] = None
+) -> bool:
     """Send email via SMTP"""
     try:
-        message = MIMEMultipart("alternative")
-        message["Subject"] = subject
-        message["From"] = FROM_EMAIL
-        message["To"] = to_email
-
-        part = MIMEText(html_content, "html")
-        message.attach(part)
-
-        async with aiosmtplib.SMTP(hostname=SMTP_SERVER, port=SMTP_PORT) as smtp:
-            await smtp.login(SMTP_USER, SMTP_PASSWORD)
-            await smtp.sendmail(FROM_EMAIL, [to_email], message.as_string())
-        
+        await deliver_email(to_email, subject, html_content, text_content)
         return True
     except Exception as e:
         print(f"Error sending email to {to_email}: {str(e)}")
         return False
 
 
-async def notify_task_assignment(
+# Templates used to render each outbox notification_type:
+# (single notification, digest of several or None, digest subject)
+NOTIFICATION_TEMPLATES = {
+    "task_assigned": ("task_assigned", "task_assigned_digest", "{count} New Tasks Assigned"),
+    "Task_Completed": ("task_completed", "task_completed_digest", "{count} Tasks Completed"),
+    "email_verification": ("verification", None, None),
+}
+
+# Notification types held back for DIGEST_WINDOW_SECONDS and coalesced
+DIGEST_NOTIFICATION_TYPES = [
+    notification_type
+    for notification_type, (_, digest_template, _) in NOTIFICATION_TEMPLATES.items()
+    if digest_template is not None
+]
+
+
+def render_notification(entry: EmailOutbox) -> Tuple[str, str]:
+    """Render the HTML and text bodies of a queued notification from its stored context"""
+    template_name = NOTIFICATION_TEMPLATES[entry.notification_type][0]
+    return render_email(template_name, **json.loads(entry.context))
+
+
+def render_notifications(entries: List[EmailOutbox]) -> Tuple[str, str, str]:
+    """
+    Render queued notifications for one recipient and notification_type
+    as a single email.
+    
+    Returns:
+        (subject, html_content, text_content); a single entry keeps its own
+        subject and template, several are rendered as a digest
+    """
+    if len(entries) == 1:
+        return (entries[0].subject, *render_notification(entries[0]))
+    
+    _, digest_template, digest_subject = NOTIFICATION_TEMPLATES[entries[0].notification_type]
+    items = [json.loads(entry.context) for entry in entries]
+    return (digest_subject.format(count=len(entries)), *render_email(digest_template, items=items))
+
+
+def enqueue_email(
+    db: Session,
+    notification_type: str,
+    recipient: User,
+    task: Optional[Task],
+    subject: str,
+    context: dict
+) -> EmailOutbox:
+    """
+    Queue a notification in email_outbox. Nothing is committed here: the
+    row becomes visible together with the caller's task change.
+    """
+    delay = DIGEST_WINDOW_SECONDS if notification_type in DIGEST_NOTIFICATION_TYPES else 0
+    entry = EmailOutbox(
+        user_id=recipient.id,
+        task_id=task.id if task is not None else None,
+        notification_type=notification_type,
+        recipient_email=recipient.email,
+        subject=subject,
+        context=json.dumps(context),
+        # Held back for the digest window so later notifications to the
+        # same recipient can be sent along with it
+        next_attempt_at=datetime.utcnow() + timedelta(seconds=delay)
+    )
+    db.add(entry)
+    return entry
+
+
+def notify_email_verification(db: Session, user: User):
+    """Queue the verification email sent after registration"""
+    enqueue_email(
+        db,
+        "email_verification",
+        user,
+        None,
+        subject="Verify your email address",
+        context={
+            "user_name": user.email,
+            "token": user.email_verification_token,
+        }
+    )
+
+
+def notify_task_assignment(
     db: Session,
     task: Task,
     assigned_user: User,
     admin: User
 ):
-    """Send notification email when task is assigned"""
+    """Queue notification email when task is assigned"""
     if not assigned_user.receive_notifications:
         return
 
-    template = Template(TASK_ASSIGNMENT_TEMPLATE)
-    html_content = template.render(
-        user_name=assigned_user.email,
-        task_name=task.name,
-        task_description=task.description or "No description",
-        start_date=task.start_date.strftime("%Y-%m-%d %H:%M"),
-        end_date=task.end_date.strftime("%Y-%m-%d %H:%M"),
-        priority=task.priority.value
+    enqueue_email(
+        db,
+        "task_assigned",
+        assigned_user,
+        task,
+        subject=f"New Task Assigned: {task.name}",
+        context={
+            "user_name": assigned_user.email,
+            "task_name": task.name,
+            "task_description": task.description or "No description",
+            "start_date": task.start_date.strftime("%Y-%m-%d %H:%M"),
+            "end_date": task.end_date.strftime("%Y-%m-%d %H:%M"),
+            "priority": task.priority.value,
+        }
     )
 
-    subject = f"New Task Assigned: {task.name}"
-    
-    success = await send_email(assigned_user.email, subject, html_content)
-    
-    # Log notification
-    notification_log = EmailNotificationLog(
-        user_id=assigned_user.id,
-        task_id=task.id,
-        notification_type="task_assigned",
-        recipient_email=assigned_user.email,
-        subject=subject,
-        sent_successfully=success
-    )
-    db.add(notification_log)
-    db.commit()
 
-
-async def notify_task_completion(
+def notify_task_completion(
     db: Session,
     task: Task,
     completed_by_user: User,
     admin: User
 ):
-    """Send notification email when task is completed"""
-    template = Template(TASK_COMPLETION_TEMPLATE)
-    html_content = template.render(
-        admin_name=admin.email,
-        user_name=completed_by_user.email,
-        task_name=task.name,
-        task_description=task.description or "No description",
-        completion_time=datetime.utcnow().strftime("%Y-%m-%d %H:%M")
-    )
-
-    subject = f"Task Completed: {task.name}"
-    
-    success = await send_email(admin.email, subject, html_content)
-    
-    # Log notification
-    notification_log = EmailNotificationLog(
-        user_id=admin.id,
-        task_id=task.id,
-        notification_type="Task_Completed",
-        recipient_email=admin.email,
-        subject=subject,
-        sent_successfully=success
+    """Queue notification email when task is completed"""
+    enqueue_email(
+        db,
+        "Task_Completed",
+        admin,
+        task,
+        subject=f"Task Completed: {task.name}",
+        context={
+            "admin_name": admin.email,
+            "user_name": completed_by_user.email,
+            "task_name": task.name,
+            "task_description": task.description or "No description",
+            "completion_time": datetime.utcnow().strftime("%Y-%m-%d %H:%M"),
+        }
     )
-    db.add(notification_log)
-    db.commit()
@@ -0,0 +1,131 @@
+"""
+In-process buffer for EmailNotificationLog rows.
+
+Callers add rows without touching the database; a background task writes
+them with one multi-row insert() when LOG_BUFFER_BATCH_SIZE rows are
+waiting or every LOG_BUFFER_FLUSH_INTERVAL_SECONDS, whichever comes first.
+At most LOG_BUFFER_MAX_ROWS rows are held: past that, new rows are
+dropped and counted rather than letting memory grow while the database is
+slow. Call drain() on shutdown so buffered rows are not lost.
+"""
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import insert
+
+from assignment2_config import (
+    LOG_BUFFER_BATCH_SIZE, LOG_BUFFER_FLUSH_INTERVAL_SECONDS, LOG_BUFFER_MAX_ROWS
+)
+from assignment2_database import SessionLocal
+from assignment2_models import EmailNotificationLog
+
+
+class NotificationLogBuffer:
+    """
+    Thread-safe: rows may be added from the event loop or from worker
+    threads (the outbox records results in asyncio.to_thread).
+    """
+
+    def __init__(
+        self,
+        batch_size: int = LOG_BUFFER_BATCH_SIZE,
+        flush_interval: float = LOG_BUFFER_FLUSH_INTERVAL_SECONDS,
+        max_rows: int = LOG_BUFFER_MAX_ROWS
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._batch_ready = threading.Event()
+        self.dropped = 0
+        self.written = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(
+        self,
+        user_id: int,
+        task_id: Optional[int],
+        notification_type: str,
+        recipient_email: str,
+        subject: str,
+        sent_successfully: bool
+    ) -> bool:
+        """
+        Queue one log row. Returns False if the buffer is full and the row
+        was dropped.
+        """
+        with self._lock:
+            if len(self._rows) >= self.max_rows:
+                self.dropped += 1
+                return False
+            self._rows.append({
+                "user_id": user_id,
+                "task_id": task_id,
+                "notification_type": notification_type,
+                "recipient_email": recipient_email,
+                "subject": subject,
+                "sent_at": datetime.utcnow(),
+                "sent_successfully": sent_successfully,
+            })
+            if len(self._rows) >= self.batch_size:
+                self._batch_ready.set()
+        return True
+
+    def flush(self) -> int:
+        """Write everything buffered so far, batch_size rows per insert. Returns rows written."""
+        written = 0
+        while True:
+            with self._lock:
+                batch = [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+                if len(self._rows) < self.batch_size:
+                    self._batch_ready.clear()
+            if not batch:
+                break
+
+            db = SessionLocal()
+            try:
+                db.execute(insert(EmailNotificationLog), batch)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self._requeue(batch)
+                print(f"Notification log flush failed ({len(batch)} rows kept): {str(e)}")
+                break
+            finally:
+                db.close()
+            written += len(batch)
+
+        self.written += written
+        return written
+
+    def _requeue(self, batch: list):
+        """Put a failed batch back in front, dropping what no longer fits"""
+        with self._lock:
+            room = max(0, self.max_rows - len(self._rows))
+            self.dropped += max(0, len(batch) - room)
+            self._rows.extendleft(reversed(batch[:room]))
+
+    async def run(self):
+        """Flush whenever a full batch is waiting or the interval passes, until cancelled"""
+        while True:
+            await asyncio.to_thread(self._batch_ready.wait, self.flush_interval)
+            if self._rows:
+                await asyncio.to_thread(self.flush)
+
+    async def drain(self):
+        """Write out whatever is left; call on shutdown after cancelling run()"""
+        # Wake a run() thread still blocked in wait()
+        self._batch_ready.set()
+        await asyncio.to_thread(self.flush)
+        if self.dropped:
+            print(f"Notification log buffer dropped {self.dropped} rows under load")
+
+
+# Shared by the outbox worker; started and drained from main.py's lifespan
+notification_log_buffer = NotificationLogBuffer()
@@ -79,3 +79,27 @@ class EmailNotificationLog(Base):
 
     # Relationships
     user = relationship("User", back_populates="notifications")
+
+
+class EmailOutbox(Base):
+    """
+    Notification emails waiting to be sent. Rows are written in the same
+    transaction as the task change and delivered by assignment2_outbox.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)  # Recipient
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=True)
+    notification_type = Column(String)  # 'task_assigned', 'Task_Completed'
+    recipient_email = Column(String)
+    subject = Column(String)
+    context = Column(Text)  # JSON template variables, rendered at send time
+    status = Column(String, default="pending", index=True)  # 'pending', 'sending', 'sent', 'failed'
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, index=True)
+    claimed_at = Column(DateTime, nullable=True)
+    claimed_by = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
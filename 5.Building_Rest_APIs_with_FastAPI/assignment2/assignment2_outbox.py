@@ -0,0 +1,268 @@
+"""
+Background dispatcher for the email outbox.
+
+Runs inside the API process (started from main.py's lifespan when
+OUTBOX_WORKER_IN_APP is true) or on its own:
+
+    python assignment2_outbox.py
+
+Several workers can run at once: rows are claimed with a conditional
+UPDATE, so each one is sent by a single worker.
+
+While the SMTP circuit breaker is open, claimed rows are put back until
+it lets a trial send through, without counting an attempt.
+
+Rows are queued DIGEST_WINDOW_SECONDS in the future. When the oldest row
+for a recipient and notification_type falls due, the other pending rows
+with the same key are claimed along with it and sent as one digest email.
+"""
+import asyncio
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import and_, or_
+
+from assignment2_config import (
+    OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL_SECONDS, OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RETRY_BASE_SECONDS, OUTBOX_CLAIM_TIMEOUT_SECONDS,
+    DIGEST_WINDOW_SECONDS, DIGEST_MAX_ITEMS
+)
+from assignment2_circuit_breaker import CircuitOpenError
+from assignment2_database import SessionLocal
+from assignment2_log_buffer import notification_log_buffer
+from assignment2_models import EmailOutbox
+import assignment2_email_service
+
+
+def digest_companions(db, due) -> List[int]:
+    """
+    Ids of pending rows that can join the digests of the due rows: same
+    recipient and notification_type, up to DIGEST_MAX_ITEMS per digest.
+    """
+    group_sizes: Dict[Tuple[str, str], int] = defaultdict(int)
+    for row in due:
+        if row.notification_type in assignment2_email_service.DIGEST_NOTIFICATION_TYPES:
+            group_sizes[(row.recipient_email, row.notification_type)] += 1
+    if not group_sizes:
+        return []
+    
+    companions = (
+        db.query(EmailOutbox.id, EmailOutbox.recipient_email, EmailOutbox.notification_type)
+        .filter(
+            EmailOutbox.status == "pending",
+            EmailOutbox.id.notin_([row.id for row in due]),
+            or_(*[
+                and_(
+                    EmailOutbox.recipient_email == recipient,
+                    EmailOutbox.notification_type == notification_type
+                )
+                for recipient, notification_type in group_sizes
+            ])
+        )
+        .order_by(EmailOutbox.id).all()
+    )
+    ids = []
+    for row in companions:
+        key = (row.recipient_email, row.notification_type)
+        if group_sizes[key] < DIGEST_MAX_ITEMS:
+            group_sizes[key] += 1
+            ids.append(row.id)
+    return ids
+
+
+def claim_batch(batch_size: int = OUTBOX_BATCH_SIZE) -> List[EmailOutbox]:
+    """
+    Claim up to batch_size due rows for this worker, plus the pending
+    rows that share a recipient and notification_type with them (up to
+    DIGEST_MAX_ITEMS per pair) so they can be sent as a digest.
+    Rows stuck in 'sending' longer than OUTBOX_CLAIM_TIMEOUT_SECONDS (a
+    worker died mid-batch) are claimable again.
+    """
+    now = datetime.utcnow()
+    claimable = or_(
+        and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+        and_(
+            EmailOutbox.status == "sending",
+            EmailOutbox.claimed_at < now - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT_SECONDS)
+        )
+    )
+    claim_token = uuid.uuid4().hex
+    db = SessionLocal()
+    try:
+        due = (
+            db.query(EmailOutbox.id, EmailOutbox.recipient_email, EmailOutbox.notification_type)
+            .filter(claimable).order_by(EmailOutbox.id).limit(batch_size).all()
+        )
+        if not due:
+            return []
+        ids = [row.id for row in due]
+        
+        companion_ids = digest_companions(db, due) if DIGEST_WINDOW_SECONDS > 0 else []
+        if companion_ids:
+            ids.extend(companion_ids)
+            # Companions are still inside their window, so they are only
+            # matched as pending rows
+            claimable = or_(claimable, EmailOutbox.status == "pending")
+        
+        # The predicate is repeated so a row claimed by another worker
+        # in the meantime is skipped
+        db.query(EmailOutbox).filter(EmailOutbox.id.in_(ids), claimable).update(
+            {"status": "sending", "claimed_at": now, "claimed_by": claim_token},
+            synchronize_session=False
+        )
+        db.commit()
+        entries = (
+            db.query(EmailOutbox).filter(EmailOutbox.claimed_by == claim_token)
+            .order_by(EmailOutbox.id).all()
+        )
+        db.expunge_all()
+        return entries
+    finally:
+        db.close()
+
+
+def group_entries(entries: List[EmailOutbox]) -> List[List[EmailOutbox]]:
+    """Split claimed rows into one group per recipient and notification_type"""
+    groups: Dict[Tuple[str, str], List[EmailOutbox]] = defaultdict(list)
+    for entry in entries:
+        groups[(entry.recipient_email, entry.notification_type)].append(entry)
+    return list(groups.values())
+
+
+def record_results(results: List[tuple]):
+    """
+    Store the outcome of each send: sent rows and rows out of attempts are
+    logged to EmailNotificationLog through the log buffer (one log row per
+    email), the rest are rescheduled with exponential backoff.
+    
+    Args:
+        results: (entries, subject, error) tuples, one per email sent;
+            error is None when the send succeeded
+    """
+    now = datetime.utcnow()
+    logs = []
+    db = SessionLocal()
+    try:
+        for entries, subject, error in results:
+            finished = []
+            for entry in entries:
+                entry = db.merge(entry)
+                entry.attempts += 1
+                if error is None:
+                    entry.status = "sent"
+                    entry.sent_at = now
+                elif entry.attempts >= OUTBOX_MAX_ATTEMPTS:
+                    entry.status = "failed"
+                    entry.last_error = error
+                else:
+                    entry.status = "pending"
+                    entry.last_error = error
+                    entry.next_attempt_at = now + timedelta(
+                        seconds=OUTBOX_RETRY_BASE_SECONDS * 2 ** (entry.attempts - 1)
+                    )
+                if entry.status in ("sent", "failed"):
+                    finished.append(entry)
+            
+            if finished:
+                first = finished[0]
+                logs.append(dict(
+                    user_id=first.user_id,
+                    # A digest covers several tasks, so it is not tied to one
+                    task_id=first.task_id if len(entries) == 1 else None,
+                    notification_type=first.notification_type,
+                    recipient_email=first.recipient_email,
+                    subject=subject,
+                    sent_successfully=error is None
+                ))
+        db.commit()
+    finally:
+        db.close()
+    # Only once the outbox rows are committed, so a row is never logged twice
+    for log in logs:
+        notification_log_buffer.add(**log)
+
+
+def defer_entries(entries: List[EmailOutbox], until: datetime):
+    """Put rows back to pending without using up an attempt (SMTP breaker open)"""
+    db = SessionLocal()
+    try:
+        for entry in entries:
+            entry = db.merge(entry)
+            entry.status = "pending"
+            entry.next_attempt_at = until
+        db.commit()
+    finally:
+        db.close()
+
+
+async def dispatch_batch() -> int:
+    """Claim, send and record one batch. Returns the number of rows handled."""
+    entries = await asyncio.to_thread(claim_batch)
+    results = []
+    deferred = []
+    retry_after = 0.0
+    for group in group_entries(entries):
+        recipient = group[0].recipient_email
+        subject = group[0].subject
+        try:
+            subject, html_content, text_content = assignment2_email_service.render_notifications(group)
+            await assignment2_email_service.deliver_email(
+                recipient, subject, html_content, text_content
+            )
+            results.append((group, subject, None))
+        except CircuitOpenError as e:
+            deferred.extend(group)
+            retry_after = max(retry_after, e.retry_after)
+        except Exception as e:
+            print(f"Error sending email to {recipient}: {str(e)}")
+            results.append((group, subject, str(e) or type(e).__name__))
+    if results:
+        await asyncio.to_thread(record_results, results)
+    if deferred:
+        print(f"SMTP circuit open, holding {len(deferred)} emails for {retry_after:.0f}s")
+        until = datetime.utcnow() + timedelta(seconds=retry_after)
+        await asyncio.to_thread(defer_entries, deferred, until)
+    return len(entries)
+
+
+async def run_outbox_worker():
+    """Dispatch batches until cancelled, sleeping only when the outbox is empty"""
+    while True:
+        try:
+            handled = await dispatch_batch()
+        except Exception as e:
+            print(f"Outbox dispatch failed: {str(e)}")
+            handled = 0
+        if handled < OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(OUTBOX_POLL_INTERVAL_SECONDS)
+
+
+async def stop_task(task: asyncio.Task):
+    """Cancel a background task and wait until it has finished unwinding"""
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def run_standalone():
+    """Outbox worker plus the log buffer flusher, draining the buffer on exit"""
+    flusher = asyncio.create_task(notification_log_buffer.run())
+    try:
+        await run_outbox_worker()
+    finally:
+        await stop_task(flusher)
+        await notification_log_buffer.drain()
+
+
+if __name__ == "__main__":
+    from assignment2_database import Base, engine
+    Base.metadata.create_all(bind=engine)
+    print("Email outbox worker started (Ctrl+C to stop)")
+    try:
+        asyncio.run(run_standalone())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,91 @@
+"""
+Render benchmark for the email templates.
+
+Compares the old approach (Template(source) compiled on every send) with
+the preloaded templates from assignment2_email_service, and reports how
+long it takes to load every template with an empty and a warm bytecode
+cache.
+
+Usage (from this folder):
+    python assignment2_template_benchmark.py [-n ITERATIONS]
+"""
+import argparse
+import tempfile
+import time
+import timeit
+
+from jinja2 import Environment, FileSystemBytecodeCache, Template
+
+import assignment2_email_service
+from assignment2_email_service import (
+    TASK_ASSIGNMENT_TEMPLATE, TASK_COMPLETION_TEMPLATE, VERIFICATION_TEMPLATE,
+    TASK_ASSIGNMENT_DIGEST_TEMPLATE, render_email
+)
+
+
+ASSIGNMENT_CONTEXT = {
+    "user_name": "user@example.com",
+    "task_name": "Write quarterly report",
+    "task_description": "Summarise <Q3> results & send to finance",
+    "start_date": "2024-01-01 09:00",
+    "end_date": "2024-01-05 17:00",
+    "priority": "high",
+}
+COMPLETION_CONTEXT = {
+    "admin_name": "admin@example.com",
+    "user_name": "user@example.com",
+    "task_name": "Write quarterly report",
+    "task_description": "Summarise <Q3> results & send to finance",
+    "completion_time": "2024-01-04 16:30",
+}
+VERIFICATION_CONTEXT = {"user_name": "user@example.com", "token": "a" * 32}
+DIGEST_CONTEXT = {"items": [ASSIGNMENT_CONTEXT] * 10}
+
+# (label, template source used by the old code, template name, context)
+CASES = [
+    ("task_assigned", TASK_ASSIGNMENT_TEMPLATE, "task_assigned", ASSIGNMENT_CONTEXT),
+    ("task_completed", TASK_COMPLETION_TEMPLATE, "task_completed", COMPLETION_CONTEXT),
+    ("verification", VERIFICATION_TEMPLATE, "verification", VERIFICATION_CONTEXT),
+    ("task_assigned_digest x10", TASK_ASSIGNMENT_DIGEST_TEMPLATE, "task_assigned_digest", DIGEST_CONTEXT),
+]
+
+
+def per_call_us(func, iterations: int) -> float:
+    """Best of 5 runs, in microseconds per call"""
+    return min(timeit.repeat(func, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def load_seconds(cache_dir: str) -> float:
+    """Time to build an environment like the service's and load every template"""
+    service_env = assignment2_email_service.template_env
+    start = time.perf_counter()
+    env = Environment(
+        loader=service_env.loader,
+        autoescape=service_env.autoescape,
+        bytecode_cache=FileSystemBytecodeCache(cache_dir),
+    )
+    for name in env.list_templates():
+        env.get_template(name)
+    return time.perf_counter() - start
+
+
+def main(iterations: int):
+    print(f"Render time per email ({iterations} iterations, best of 5)\n")
+    print(f"{'template':<26}{'compile each send':>20}{'preloaded (html+text)':>24}{'speedup':>10}")
+    for label, source, name, context in CASES:
+        compiled = per_call_us(lambda: Template(source).render(**context), iterations)
+        preloaded = per_call_us(lambda: render_email(name, **context), iterations)
+        print(f"{label:<26}{compiled:>17.1f} us{preloaded:>21.1f} us{compiled / preloaded:>9.1f}x")
+
+    print(f"\nTemplates loaded: {len(assignment2_email_service.TEMPLATES)}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold = load_seconds(cache_dir)
+        warm = load_seconds(cache_dir)
+    print(f"Load with empty bytecode cache: {cold * 1000:.1f} ms")
+    print(f"Load with warm bytecode cache:  {warm * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--iterations", type=int, default=200)
+    main(parser.parse_args().iterations)
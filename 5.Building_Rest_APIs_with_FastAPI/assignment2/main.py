@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends, HTTPException, status, Query
 from fastapi.security import HTTPBearer , HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
@@ -6,7 +9,7 @@ from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
 
 from assignment2_config import (
-    APP_NAME, APP_VERSION, ACCESS_TOKEN_EXPIRE_MINUTES
+    APP_NAME, APP_VERSION, ACCESS_TOKEN_EXPIRE_MINUTES, OUTBOX_WORKER_IN_APP, CREATE_TABLES
 )
 from assignment2_database import engine, Base, get_db
 from assignment2_models import User, UserRole, TaskStatus
@@ -25,16 +28,37 @@ from assignment2_crud import (
     update_task_status, verify_user_email, update_user_notifications
 )
 from assignment2_email_service import (
-    notify_task_assignment, notify_task_completion
+    notify_task_assignment, notify_task_completion, smtp_breaker
 )
+from assignment2_log_buffer import notification_log_buffer
+from assignment2_outbox import run_outbox_worker, stop_task
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create database tables, run the email outbox dispatcher alongside the
+    API (unless disabled) and the notification log flusher; buffered log
+    rows are written on shutdown.
+    """
+    if CREATE_TABLES:
+        Base.metadata.create_all(bind=engine)
+    worker = asyncio.create_task(run_outbox_worker()) if OUTBOX_WORKER_IN_APP else None
+    log_flusher = asyncio.create_task(notification_log_buffer.run())
+    yield
+    # Both must have stopped before the drain, or a batch still being
+    # dispatched could add rows after the final flush
+    if worker:
+        await stop_task(worker)
+    await stop_task(log_flusher)
+    await notification_log_buffer.drain()
 
-Base.metadata.create_all(bind=engine) # Create database tables
 
 # Initialize FastAPI app
 app = FastAPI(
     title=APP_NAME,
     version=APP_VERSION,
-    description="Advanced To-Do List API with Admin Features, OAuth, and Email Notifications --by Omkar "
+    description="Advanced To-Do List API with Admin Features, OAuth, and Email Notifications --by Omkar ",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -124,10 +148,12 @@ async def create_admin_task(
             detail="Assigned user not found"
         )
     
-    db_task = create_task(db, task, admin.id)
+    db_task = create_task(db, task, admin.id, commit=False)
     
-    # Send notification email
-    await notify_task_assignment(db, db_task, assigned_user, admin)
+    # Queue notification email in the same transaction as the task
+    notify_task_assignment(db, db_task, assigned_user, admin)
+    db.commit()
+    db.refresh(db_task)
     
     return db_task
 
@@ -276,13 +302,14 @@ async def mark_task_complete(
     
     try:
         updated_task = update_task_status(
-            db, task_id, current_user.id, TaskStatus.COMPLETED
+            db, task_id, current_user.id, TaskStatus.COMPLETED, commit=False
         )
         
-        # Notify admin about task completion
+        # Queue admin notification in the same transaction as the update
         task_creator = get_task_creator(db, task_id)
         if task_creator:
-            await notify_task_completion(db, updated_task, current_user, task_creator)
+            notify_task_completion(db, updated_task, current_user, task_creator)
+        db.commit()
         
         return {"message": "Task marked as completed"}
     except ValueError as e:
@@ -333,6 +360,16 @@ async def unsubscribe_emails(
     return {"message": "Successfully unsubscribed from email notifications"}
 
 
+# ==================== Internal ====================
+
+@app.get("/internal/smtp-breaker")
+async def get_smtp_breaker(admin: User = Depends(get_admin_user)):
+    """
+    State of the SMTP circuit breaker and its counters (Admin only)
+    """
+    return smtp_breaker.snapshot()
+
+
 # ==================== Health Check ====================
 
 @app.get("/")
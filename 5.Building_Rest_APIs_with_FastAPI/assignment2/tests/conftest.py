@@ -0,0 +1,126 @@
+"""
+Fixtures shared by the tests: main.app wired to a seeded in-memory SQLite
+database, with outgoing email replaced by a no-op that reports success,
+and a counter of the SQL statements a request issues.
+
+Run from this folder:
+    python -m pytest
+"""
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Keep the app's own engine (assignment2_database) off the real database
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+import assignment2_email_service  # noqa: E402
+from assignment2_auth import create_access_token, hash_password  # noqa: E402
+from assignment2_database import Base, get_db  # noqa: E402
+from assignment2_models import User, UserRole, Task, TaskPriority, TaskStatus  # noqa: E402
+from main import app  # noqa: E402
+
+
+SEED_PASSWORD = "budget-password"
+
+
+async def _skip_send_email(to_email: str, subject: str, html_content: str) -> bool:
+    return True
+
+
+class Harness:
+    """Seeded in-memory database wired into the app through get_db"""
+
+    def __init__(self):
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        self._seed()
+
+        def override_get_db():
+            db = self.SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        self._send_email = assignment2_email_service.send_email
+        assignment2_email_service.send_email = _skip_send_email
+        self.client = TestClient(app)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _seed(self):
+        db = self.SessionLocal()
+        seed_hash = hash_password(SEED_PASSWORD)
+        self.admin = User(email="admin@example.com", hashed_password=seed_hash, role=UserRole.ADMIN)
+        self.user = User(
+            email="user@example.com",
+            hashed_password=seed_hash,
+            role=UserRole.USER,
+            email_verification_token="seed-token"
+        )
+        db.add_all([self.admin, self.user])
+        db.commit()
+        now = datetime.utcnow()
+        db.add_all([
+            Task(
+                created_by_id=self.admin.id,
+                assigned_to_id=self.user.id,
+                name=f"Seeded task {i}",
+                start_date=now,
+                end_date=now + timedelta(days=7),
+                priority=TaskPriority.MEDIUM,
+                status=TaskStatus.PENDING,
+                is_admin_assigned=True
+            )
+            for i in range(10)
+        ])
+        db.commit()
+        self.admin_headers = {"Authorization": f"Bearer {create_access_token({'sub': self.admin.email})}"}
+        self.user_headers = {"Authorization": f"Bearer {create_access_token({'sub': self.user.email})}"}
+        db.close()
+
+    @contextmanager
+    def count_statements(self):
+        """Yield the statements list after clearing it; read it afterwards"""
+        self.statements.clear()
+        yield self.statements
+
+    def close(self):
+        self.client.close()
+        app.dependency_overrides.pop(get_db, None)
+        assignment2_email_service.send_email = self._send_email
+        self.engine.dispose()
+
+
+@pytest.fixture
+def harness():
+    harness = Harness()
+    yield harness
+    harness.close()
+
+
+@pytest.fixture
+def count_queries(harness):
+    """
+    Context manager collecting the statements issued inside it:
+
+        with count_queries() as statements:
+            harness.client.get(...)
+        assert len(statements) <= 2
+    """
+    return harness.count_statements
@@ -0,0 +1,101 @@
+"""
+SQL statement budgets for every route in main.py.
+
+Each route is called once against a freshly seeded in-memory SQLite
+database and the statements it issues are counted. A route that goes over
+its budget, has no budget, or returns an error fails the test.
+
+When a change legitimately needs more statements, raise the budget here in
+the same commit and say why.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.routing import APIRoute
+
+from main import app
+from tests.conftest import SEED_PASSWORD
+
+
+# Maximum statements per request, keyed by "METHOD /route/template"
+BUDGETS = {
+    "GET /": 0,
+    "POST /auth/register": 3,
+    "POST /auth/verify-email": 2,
+    "POST /auth/login": 1,
+    "POST /admin/tasks": 5,
+    "GET /admin/tasks": 2,
+    "PUT /admin/tasks/{task_id}": 4,
+    "DELETE /admin/tasks/{task_id}": 3,
+    "GET /user/tasks": 2,
+    "GET /user/tasks/{task_id}": 2,
+    "PUT /user/tasks/{task_id}/complete": 7,
+    "PUT /user/notifications/preferences": 3,
+    "POST /user/notifications/unsubscribe": 2,
+    "GET /internal/smtp-breaker": 1,
+}
+
+
+def build_requests(harness):
+    """One representative, successful request per route: {route: (method, url, kwargs)}"""
+    admin = {"headers": harness.admin_headers}
+    user = {"headers": harness.user_headers}
+    start = datetime.utcnow()
+    task = {
+        "assigned_to_id": harness.user.id,
+        "name": "Budget task",
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=1)).isoformat(),
+    }
+    return {
+        "GET /": ("GET", "/", {}),
+        "POST /auth/register": ("POST", "/auth/register",
+            {"json": {"email": "new@example.com", "password": "new-password"}}),
+        "POST /auth/verify-email": ("POST", "/auth/verify-email",
+            {"params": {"email": harness.user.email}, "json": {"token": "seed-token"}}),
+        "POST /auth/login": ("POST", "/auth/login",
+            {"json": {"email": harness.user.email, "password": SEED_PASSWORD}}),
+        "POST /admin/tasks": ("POST", "/admin/tasks", {"json": task, **admin}),
+        "GET /admin/tasks": ("GET", "/admin/tasks", admin),
+        "PUT /admin/tasks/{task_id}": ("PUT", "/admin/tasks/1", {"json": {"name": "Renamed"}, **admin}),
+        "DELETE /admin/tasks/{task_id}": ("DELETE", "/admin/tasks/1", admin),
+        "GET /user/tasks": ("GET", "/user/tasks", user),
+        "GET /user/tasks/{task_id}": ("GET", "/user/tasks/1", user),
+        "PUT /user/tasks/{task_id}/complete": ("PUT", "/user/tasks/1/complete", user),
+        "PUT /user/notifications/preferences": ("PUT", "/user/notifications/preferences",
+            {"params": {"receive_notifications": False}, **user}),
+        "POST /user/notifications/unsubscribe": ("POST", "/user/notifications/unsubscribe",
+            {"params": {"email": harness.user.email}}),
+        "GET /internal/smtp-breaker": ("GET", "/internal/smtp-breaker", admin),
+    }
+
+
+def app_routes():
+    """All "METHOD /path" pairs the app serves, docs/openapi excluded"""
+    routes = set()
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            routes.update(f"{method} {route.path}" for method in route.methods)
+    return routes
+
+
+def test_every_route_has_a_budget():
+    assert sorted(app_routes() - BUDGETS.keys()) == []
+
+
+def test_every_budget_has_a_request(harness):
+    assert sorted(BUDGETS.keys() - build_requests(harness).keys()) == []
+
+
+@pytest.mark.parametrize("route", list(BUDGETS))
+def test_route_within_budget(route, harness, count_queries):
+    method, url, kwargs = build_requests(harness)[route]
+
+    with count_queries() as statements:
+        response = harness.client.request(method, url, **kwargs)
+
+    assert response.status_code < 400, response.text
+    listing = "\n".join(" ".join(statement.split())[:160] for statement in statements)
+    assert len(statements) <= BUDGETS[route], (
+        f"{len(statements)} statements, budget is {BUDGETS[route]}:\n{listing}"
+    )
@@ -0,0 +1,59 @@
+"""
+Helpers shared by the benchmark scripts in this folder: the metadata
+stored with each result, reading and appending results/*.jsonl, and
+reading a server's memory.
+"""
+import json
+import os
+import platform
+import subprocess
+from typing import Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_key() -> str:
+    """Results are only compared with runs from the same machine and Python"""
+    return f"{platform.node()}|{platform.python_version()}|{os.cpu_count()}"
+
+
+def previous_results(results_file: str, key: str) -> Dict[str, Dict]:
+    """Most recent stored result per record[key] for this environment"""
+    latest = {}
+    if os.path.exists(results_file):
+        with open(results_file) as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("environment") == environment_key():
+                    latest[record[key]] = record
+    return latest
+
+
+def append_results(results_file: str, records: List[Dict]):
+    os.makedirs(os.path.dirname(results_file), exist_ok=True)
+    with open(results_file, "a") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    print(f"\nAppended {len(records)} results to {os.path.relpath(results_file)}")
+
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of process `pid` (Linux /proc), None if unavailable"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
@@ -0,0 +1,370 @@
+"""
+Side-by-side performance comparison of the four API implementations.
+
+Every variant is booted with uvicorn (one worker) on its own temporary
+SQLite database and a local SMTP sink, seeded through its own API with
+the same data (one admin, --users users, --tasks tasks per user), and
+then driven through the same workload: one phase per operation, each
+running --concurrency concurrent clients for --duration seconds.
+
+Operations and what they mostly measure:
+- register, login: the password hashing scheme (bcrypt vs Argon2)
+- list_tasks, get_task: query style and response serialization
+- create_task, complete_task: the email path (inline SMTP per request,
+  pooled SMTP, or an outbox written in the request's transaction)
+
+The variants do not all offer every operation: assignment1 has no roles,
+so its users create their own tasks and cannot fetch or complete a
+single task; those cells are left empty. Per variant the report also
+shows the server's resident memory after the run and how many emails
+reached the sink during the workload (assignment2 queues notifications in
+its outbox and merges them into digests, so it sends fewer, later).
+
+Variants that hard-code their settings (assignment2_argon2's SMTP relay)
+get them replaced in the main module before the server starts, so no run
+ever talks to a real mail server.
+
+Results are appended to results/variants.jsonl (one line per variant per
+run). The load generator runs in this process; compare variants with
+each other, not with numbers from another machine.
+
+Usage (from this folder, Linux):
+    python compare_variants.py [--duration 5] [--concurrency 8] [--only assignment2,restructured]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APPS_DIR = os.path.dirname(HERE)
+RESULTS_FILE = os.path.join(HERE, "results", "variants.jsonl")
+RESTRUCTURED_DIR = os.path.join(APPS_DIR, "assignment2(completed)", "todo_api_restructured")
+
+sys.path.insert(0, RESTRUCTURED_DIR)
+from perf.server import start_process, stop_server  # noqa: E402
+from perf.smtp_sink import SMTPSink, free_port  # noqa: E402
+from perf.stats import percentile  # noqa: E402
+
+from _common import append_results, environment_key, git_commit, read_rss_mb  # noqa: E402
+
+# Required settings for the apps that read them from the environment
+BASE_ENV = {
+    "SECRET_KEY": "compare-variants-secret-key-not-for-production",
+    "SMTP_USER": "bench@example.com",
+    "SMTP_PASSWORD": "bench",
+    "FROM_EMAIL": "bench@example.com",
+    "SMTP_SERVER": "127.0.0.1",
+    "SMTP_USE_TLS": "false",
+    "CREATE_TABLES": "true",
+    "LOG_LEVEL": "WARNING",
+}
+
+# Starts uvicorn on `main.app` after replacing hard-coded module settings
+LAUNCHER = """
+import json, os
+import uvicorn
+import main
+for name, value in json.loads(os.environ["BENCH_OVERRIDES"]).items():
+    setattr(main, name, value)
+uvicorn.run(main.app, host="127.0.0.1", port=int(os.environ["BENCH_PORT"]),
+            log_level="warning", access_log=False)
+"""
+
+PASSWORD = "compare-variants-password"
+OPERATIONS = ("register", "login", "list_tasks", "get_task", "create_task", "complete_task")
+
+
+@dataclass
+class Variant:
+    """How to boot one implementation and where its routes live"""
+    name: str
+    app_dir: str
+    routes: Dict[str, Tuple[str, str]]  # operation -> (method, path template)
+    admin_role: Optional[str]  # role value for admins; None when the app has no roles
+    smtp_overrides: bool = False  # SMTP_SERVER/SMTP_PORT are module constants in main
+
+
+def _assignment2_routes(prefix: str = "") -> Dict[str, Tuple[str, str]]:
+    return {
+        "register": ("POST", f"{prefix}/auth/register"),
+        "login": ("POST", f"{prefix}/auth/login"),
+        "list_tasks": ("GET", f"{prefix}/user/tasks"),
+        "get_task": ("GET", f"{prefix}/user/tasks/{{task_id}}"),
+        "create_task": ("POST", f"{prefix}/admin/tasks"),
+        "complete_task": ("PUT", f"{prefix}/user/tasks/{{task_id}}/complete"),
+    }
+
+
+VARIANTS = {
+    "assignment1": Variant(
+        "assignment1", os.path.join(APPS_DIR, "assignment1"),
+        routes={
+            "register": ("POST", "/register"),
+            "login": ("POST", "/login"),
+            "list_tasks": ("GET", "/tasks"),
+            "create_task": ("POST", "/tasks"),
+        },
+        admin_role=None,
+    ),
+    "assignment2": Variant(
+        "assignment2", os.path.join(APPS_DIR, "assignment2"), _assignment2_routes(), admin_role="admin",
+    ),
+    "assignment2_argon2": Variant(
+        "assignment2_argon2", os.path.join(APPS_DIR, "assignment2_argon2"), _assignment2_routes(),
+        admin_role="ADMIN", smtp_overrides=True,
+    ),
+    "restructured": Variant(
+        "restructured", RESTRUCTURED_DIR, _assignment2_routes("/api"), admin_role="ADMIN",
+    ),
+}
+
+
+@dataclass
+class Account:
+    id: int
+    email: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    task_ids: List[int] = field(default_factory=list)
+    pending: List[int] = field(default_factory=list)
+    completions: int = 0
+
+
+class Client:
+    """A variant's routes on top of an httpx client"""
+
+    def __init__(self, variant: Variant, http: httpx.AsyncClient):
+        self.variant = variant
+        self.http = http
+        self.sequence = 0
+
+    def supports(self, operation: str) -> bool:
+        return operation in self.variant.routes
+
+    async def call(self, operation: str, headers: Optional[Dict] = None, body: Optional[Dict] = None,
+                   **path_params) -> httpx.Response:
+        method, template = self.variant.routes[operation]
+        return await self.http.request(method, template.format(**path_params), headers=headers, json=body)
+
+    async def register(self, email: str, admin: bool = False) -> httpx.Response:
+        body = {"email": email, "password": PASSWORD}
+        if admin:
+            body["role"] = self.variant.admin_role
+        return await self.call("register", body=body)
+
+    async def login(self, email: str) -> httpx.Response:
+        return await self.call("login", body={"email": email, "password": PASSWORD})
+
+    async def create_task(self, creator: Account, assignee: Account) -> httpx.Response:
+        self.sequence += 1
+        start = datetime(2024, 1, 1, 9, 0) + timedelta(hours=self.sequence % 500)
+        body = {
+            "name": f"Task {self.sequence}",
+            "description": "Created by compare_variants",
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=3)).isoformat(),
+        }
+        if self.variant.admin_role:
+            body["assigned_to_id"] = assignee.id
+        return await self.call("create_task", creator.headers, body)
+
+
+def checked(response: httpx.Response) -> Dict:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path}: "
+                           f"{response.status_code} {response.text[:200]}")
+    return response.json()
+
+
+async def seed(client: Client, users: int, tasks_per_user: int) -> Tuple[Optional[Account], List[Account]]:
+    """Admin and users registered and logged in through the API, tasks created for each user"""
+
+    async def account(email: str, admin: bool = False) -> Account:
+        created = checked(await client.register(email, admin))
+        token = checked(await client.login(email))["access_token"]
+        return Account(created["id"], email, {"Authorization": f"Bearer {token}"})
+
+    admin = await account("admin@example.com", admin=True) if client.variant.admin_role else None
+    accounts = [await account(f"user{i}@example.com") for i in range(users)]
+    for user in accounts:
+        for _ in range(tasks_per_user):
+            task = checked(await client.create_task(admin or user, user))
+            user.task_ids.append(task["id"])
+        user.pending = list(user.task_ids)
+    return admin, accounts
+
+
+async def run_phase(client: Client, operation: str, admin: Optional[Account], users: List[Account],
+                    concurrency: int, duration: float, warmup: float) -> Dict:
+    """`concurrency` loops issuing `operation` back to back; requests started in the warmup are not counted"""
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    measure_from, deadline = start + warmup, start + warmup + duration
+
+    async def request(n: int, user: Account, rng: random.Random) -> httpx.Response:
+        if operation == "register":
+            client.sequence += 1
+            return await client.register(f"new{client.sequence}-{n}@example.com")
+        if operation == "login":
+            return await client.login(user.email)
+        if operation == "list_tasks":
+            return await client.call("list_tasks", user.headers)
+        if operation == "get_task":
+            return await client.call("get_task", user.headers, task_id=rng.choice(user.task_ids))
+        if operation == "create_task":
+            return await client.create_task(admin or user, user)
+        # complete_task: pending tasks first, then the same ones again
+        if user.pending:
+            task_id = user.pending.pop()
+        else:
+            task_id = user.task_ids[user.completions % len(user.task_ids)]
+        user.completions += 1
+        return await client.call("complete_task", user.headers, task_id=task_id)
+
+    async def loop(n: int):
+        nonlocal errors
+        rng = random.Random(n)
+        i = n
+        while time.perf_counter() < deadline:
+            user = users[i % len(users)]
+            i += concurrency
+            sent = time.perf_counter()
+            try:
+                ok = (await request(n, user, rng)).status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if sent < measure_from:
+                continue
+            if ok:
+                latencies.append(time.perf_counter() - sent)
+            else:
+                errors += 1
+
+    await asyncio.gather(*(loop(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+def start_variant(variant: Variant, workdir: str, port: int, smtp_port: int) -> subprocess.Popen:
+    overrides = {"SMTP_SERVER": "127.0.0.1", "SMTP_PORT": smtp_port} if variant.smtp_overrides else {}
+    env = dict(
+        os.environ, **BASE_ENV,
+        # Apps with a hard-coded relative sqlite path (./todo.db) write into workdir
+        DATABASE_URL=f"sqlite:///{workdir}/compare_variants.db",
+        SMTP_PORT=str(smtp_port),
+        PYTHONPATH=variant.app_dir,
+        BENCH_PORT=str(port),
+        BENCH_OVERRIDES=json.dumps(overrides),
+    )
+    return start_process([sys.executable, "-c", LAUNCHER], port, workdir, env)
+
+
+async def wait_for_emails(sink: SMTPSink, quiet: float = 3.0, timeout: float = 15.0) -> int:
+    """Message count once it has not changed for `quiet` seconds (outboxes send in the background)"""
+    deadline = time.perf_counter() + timeout
+    count, since = sink.message_count, time.perf_counter()
+    while time.perf_counter() < deadline and time.perf_counter() - since < quiet:
+        await asyncio.sleep(0.25)
+        if sink.message_count != count:
+            count, since = sink.message_count, time.perf_counter()
+    return count
+
+
+async def bench_variant(variant: Variant, options) -> Dict:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as workdir, SMTPSink(auth=True) as sink:
+        server = start_variant(variant, workdir, port, sink.port)
+        try:
+            limits = httpx.Limits(max_connections=options.concurrency, max_keepalive_connections=options.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as http:
+                client = Client(variant, http)
+                admin, users = await seed(client, options.users, options.tasks)
+                seeded_emails = await wait_for_emails(sink)
+                operations = {}
+                for operation in OPERATIONS:
+                    if client.supports(operation):
+                        operations[operation] = await run_phase(
+                            client, operation, admin, users, options.concurrency, options.duration, options.warmup
+                        )
+            emails = await wait_for_emails(sink) - seeded_emails
+            rss = read_rss_mb(server.pid)
+            rss = round(rss, 1) if rss is not None else None
+        finally:
+            stop_server(server)
+    return {"variant": variant.name, "operations": operations, "rss_mb": rss, "emails_delivered": emails}
+
+
+def print_report(results: List[Dict]):
+    width = 26
+    print(f"\n{'':<15}" + "".join(f"{result['variant']:>{width}}" for result in results))
+    print(f"{'operation':<15}" + f"{'rps / p50 / p99 ms':>{width}}" * len(results))
+    for operation in OPERATIONS:
+        cells = []
+        for result in results:
+            row = result["operations"].get(operation)
+            if row is None:
+                cells.append(f"{'-':>{width}}")
+                continue
+            cell = f"{row['rps']:.1f} / {row['p50_ms'] or 0:.1f} / {row['p99_ms'] or 0:.1f}"
+            if row["errors"]:
+                cell += f" ({row['errors']} err)"
+            cells.append(f"{cell:>{width}}")
+        print(f"{operation:<15}" + "".join(cells))
+    print(f"{'RSS MB':<15}" + "".join(f"{result['rss_mb'] or 0:>{width}.1f}" for result in results))
+    print(f"{'emails':<15}" + "".join(f"{result['emails_delivered']:>{width}}" for result in results))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=5, help="measured seconds per operation")
+    parser.add_argument("--warmup", type=float, default=0.5, help="uncounted seconds before each operation")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--users", type=int, default=10, help="seeded users")
+    parser.add_argument("--tasks", type=int, default=20, help="seeded tasks per user")
+    parser.add_argument("--only", help="comma separated variant names")
+    parser.add_argument("--no-save", action="store_true", help="do not append to results/variants.jsonl")
+    options = parser.parse_args()
+
+    names = options.only.split(",") if options.only else list(VARIANTS)
+    unknown = set(names) - VARIANTS.keys()
+    if unknown:
+        parser.error(f"unknown variants: {', '.join(sorted(unknown))}")
+
+    print(f"{options.users} users x {options.tasks} tasks, {options.concurrency} clients, "
+          f"{options.duration:g}s per operation, {os.cpu_count()} CPUs")
+    results = []
+    for name in names:
+        print(f"  {name}...", flush=True)
+        results.append(asyncio.run(bench_variant(VARIANTS[name], options)))
+    print_report(results)
+
+    if not options.no_save:
+        meta = {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "environment": environment_key(),
+            "config": {key: getattr(options, key) for key in ("duration", "warmup", "concurrency", "users", "tasks")},
+        }
+        append_results(RESULTS_FILE, [{**meta, **result} for result in results])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
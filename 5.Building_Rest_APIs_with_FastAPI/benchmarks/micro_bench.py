@@ -0,0 +1,283 @@
+"""
+Microbenchmarks for the hot primitives of the apps.
+
+Each benchmark times one call in isolation, against fixed data built
+from a seeded random generator, so results are comparable between
+commits:
+- password: hash_password / verify_password with Argon2 (restructured
+  app) and passlib bcrypt (assignment2)
+- jwt: create_access_token / decode_token (restructured app)
+- serialize: TaskResponse validation from ORM rows plus JSON encoding,
+  for 1, 100 and 1,000 rows, as FastAPI does for a response_model
+- get_all_tasks: assignment2's admin query on 1,000 seeded tasks in an
+  in-memory SQLite database, for every combination of its filters
+- jinja: assignment2's preloaded email templates
+
+Each benchmark runs timeit with an automatic loop count (at least 0.2 s
+per repeat) and reports the best and median time per call over the
+repeats. Results are appended to results/micro.jsonl and compared with
+the previous run on the same machine and Python version, like
+startup_bench.py; changes beyond --threshold percent are flagged.
+
+This is a script rather than a pytest-benchmark suite: the two apps are
+imported side by side from their own folders (not installable packages),
+and results go to the same JSONL history and comparison as
+startup_bench.py, which pytest-benchmark's storage would not share.
+
+Usage (from this folder):
+    python micro_bench.py [--repeat 5] [--only password,jwt] [--no-save]
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import timeit
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from _common import append_results, environment_key, git_commit, previous_results
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APPS_DIR = os.path.dirname(HERE)
+RESULTS_FILE = os.path.join(HERE, "results", "micro.jsonl")
+RESTRUCTURED_DIR = os.path.join(APPS_DIR, "assignment2(completed)", "todo_api_restructured")
+ASSIGNMENT2_DIR = os.path.join(APPS_DIR, "assignment2")
+
+# Settings both apps need; neither database is touched (assignment2's
+# engine is created lazily)
+BENCH_ENVIRONMENT = {
+    "DATABASE_URL": "sqlite://",
+    "SECRET_KEY": "micro-bench-secret-key-not-for-production",
+    "SMTP_USER": "bench@example.com",
+    "SMTP_PASSWORD": "bench",
+    "FROM_EMAIL": "bench@example.com",
+}
+
+PASSWORD = "micro-bench-password"
+SEED = 20240101
+BASE_TIME = datetime(2024, 1, 1, 9, 0)
+
+# name -> zero-argument callable
+Benchmarks = Dict[str, Callable[[], object]]
+
+
+def password_benchmarks() -> Benchmarks:
+    import assignment2_auth
+    from app.core import security
+
+    argon2_hash = security.hash_password(PASSWORD)
+    bcrypt_hash = assignment2_auth.hash_password(PASSWORD)
+    return {
+        "password/argon2_hash": lambda: security.hash_password(PASSWORD),
+        "password/argon2_verify": lambda: security.verify_password(PASSWORD, argon2_hash),
+        "password/bcrypt_hash": lambda: assignment2_auth.hash_password(PASSWORD),
+        "password/bcrypt_verify": lambda: assignment2_auth.verify_password(PASSWORD, bcrypt_hash),
+    }
+
+
+def jwt_benchmarks() -> Benchmarks:
+    from app.services.auth_service import create_access_token, decode_token
+
+    token = create_access_token({"sub": "user@example.com"})
+    return {
+        "jwt/create_access_token": lambda: create_access_token({"sub": "user@example.com"}),
+        "jwt/decode_token": lambda: decode_token(token),
+    }
+
+
+def serialize_benchmarks() -> Benchmarks:
+    from typing import List as ListType
+
+    from pydantic import TypeAdapter
+
+    from app.models.task import Task, TaskPriority, TaskStatus
+    from app.schemas.task import TaskResponse
+
+    rng = random.Random(SEED)
+    rows = [
+        Task(
+            id=i + 1,
+            created_by_id=1,
+            assigned_to_id=rng.randint(2, 50),
+            name=f"Task {i}",
+            description=f"Seeded task {i} " * rng.randint(1, 8),
+            priority=rng.choice(list(TaskPriority)),
+            status=rng.choice(list(TaskStatus)),
+            is_admin_assigned=True,
+            created_at=BASE_TIME + timedelta(minutes=i),
+            updated_at=BASE_TIME + timedelta(minutes=i, seconds=30),
+        )
+        for i in range(1000)
+    ]
+    adapter = TypeAdapter(ListType[TaskResponse])
+
+    def serialize(count: int):
+        subset = rows[:count]
+        return lambda: adapter.dump_json(adapter.validate_python(subset, from_attributes=True))
+
+    return {f"serialize/TaskResponse x{count}": serialize(count) for count in (1, 100, 1000)}
+
+
+def get_all_tasks_benchmarks() -> Benchmarks:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    import assignment2_crud
+    from assignment2_database import Base
+    from assignment2_models import Task, TaskPriority, TaskStatus, User, UserRole
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    users = [User(email=f"user{i}@example.com", hashed_password="x", role=UserRole.USER) for i in range(50)]
+    admin = User(email="admin@example.com", hashed_password="x", role=UserRole.ADMIN)
+    db.add_all([admin, *users])
+    db.commit()
+
+    rng = random.Random(SEED)
+    tasks = []
+    for i in range(1000):
+        start = BASE_TIME + timedelta(days=rng.randint(0, 60))
+        tasks.append(Task(
+            created_by_id=admin.id,
+            assigned_to_id=rng.choice(users).id,
+            name=f"Task {i}",
+            description=f"Seeded task {i}",
+            start_date=start,
+            end_date=start + timedelta(days=rng.randint(1, 14)),
+            priority=rng.choice(list(TaskPriority)),
+            status=rng.choice(list(TaskStatus)),
+            is_admin_assigned=True,
+        ))
+    db.add_all(tasks)
+    db.commit()
+
+    # The values main.py passes through from the query string
+    filters = {
+        "priority": "high",
+        "status": "pending",
+        "start_date": BASE_TIME + timedelta(days=15),
+        "end_date": BASE_TIME + timedelta(days=45),
+    }
+
+    def query(kwargs: Dict):
+        def run():
+            result = assignment2_crud.get_all_tasks(db, skip=0, limit=100, **kwargs)
+            db.expunge_all()  # each call loads fresh objects, as a new request would
+            return result
+        return run
+
+    benchmarks = {}
+    for size in range(len(filters) + 1):
+        for names in itertools.combinations(filters, size):
+            label = "+".join(names) or "no filters"
+            benchmarks[f"get_all_tasks/{label}"] = query({name: filters[name] for name in names})
+    return benchmarks
+
+
+def jinja_benchmarks() -> Benchmarks:
+    from assignment2_email_service import render_email
+
+    assignment = {
+        "user_name": "user@example.com",
+        "task_name": "Write quarterly report",
+        "task_description": "Summarise <Q3> results & send to finance",
+        "start_date": "2024-01-01 09:00",
+        "end_date": "2024-01-05 17:00",
+        "priority": "high",
+    }
+    completion = {
+        "admin_name": "admin@example.com",
+        "user_name": "user@example.com",
+        "task_name": "Write quarterly report",
+        "task_description": "Summarise <Q3> results & send to finance",
+        "completion_time": "2024-01-04 16:30",
+    }
+    return {
+        "jinja/task_assigned": lambda: render_email("task_assigned", **assignment),
+        "jinja/task_completed": lambda: render_email("task_completed", **completion),
+        "jinja/verification": lambda: render_email("verification", user_name="user@example.com", token="a" * 32),
+        "jinja/task_assigned_digest x10": lambda: render_email("task_assigned_digest", items=[assignment] * 10),
+    }
+
+
+GROUPS: Dict[str, Callable[[], Benchmarks]] = {
+    "password": password_benchmarks,
+    "jwt": jwt_benchmarks,
+    "serialize": serialize_benchmarks,
+    "get_all_tasks": get_all_tasks_benchmarks,
+    "jinja": jinja_benchmarks,
+}
+
+
+def measure(func: Callable[[], object], repeat: int) -> Tuple[int, List[float]]:
+    """Loop count from timeit's autorange, then seconds per call for each repeat"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return number, [total / number for total in timer.repeat(repeat=repeat, number=number)]
+
+
+def compare(result: Dict, previous: Optional[Dict], threshold: float) -> Optional[str]:
+    """A line describing a change of the best time beyond threshold percent"""
+    if not previous or not previous.get("best_us"):
+        return None
+    old, new = previous["best_us"], result["best_us"]
+    delta = (new - old) / old * 100
+    if abs(delta) < threshold:
+        return None
+    label = "REGRESSION" if delta > 0 else "improved"
+    return f"  {label}: {old} -> {new} us ({delta:+.0f}%, vs {previous.get('commit')})"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="timed repeats per benchmark")
+    parser.add_argument("--only", help=f"comma separated groups ({', '.join(GROUPS)})")
+    parser.add_argument("--threshold", type=float, default=10, help="percent change to flag")
+    parser.add_argument("--no-save", action="store_true", help="do not append to results/micro.jsonl")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(GROUPS)
+    unknown = set(names) - GROUPS.keys()
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+
+    # The benchmark groups import the apps, which read these on import
+    os.environ.update(BENCH_ENVIRONMENT)
+    sys.path[:0] = [RESTRUCTURED_DIR, ASSIGNMENT2_DIR]
+
+    previous = previous_results(RESULTS_FILE, "benchmark")
+    meta = {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "environment": environment_key(),
+        "repeat": args.repeat,
+    }
+    records, regressions = [], 0
+    print(f"{'benchmark':<52}{'best us':>12}{'median us':>12}{'loops':>8}")
+    for group in names:
+        for name, func in GROUPS[group]().items():
+            number, per_call = measure(func, args.repeat)
+            result = {
+                "benchmark": name,
+                "best_us": round(min(per_call) * 1e6, 2),
+                "median_us": round(statistics.median(per_call) * 1e6, 2),
+                "loops": number,
+            }
+            print(f"{name:<52}{result['best_us']:>12.2f}{result['median_us']:>12.2f}{number:>8}")
+            line = compare(result, previous.get(name), args.threshold)
+            if line:
+                print(line)
+                regressions += "REGRESSION" in line
+            records.append({**meta, **result})
+
+    if not args.no_save:
+        append_results(RESULTS_FILE, records)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Startup benchmark for every app entry point.
+
+For each entry point it measures, in fresh processes:
+- import time: total of `python -X importtime` for importing main and
+  building the app, plus the packages that cost the most (so a new
+  dependency such as jinja2, aiosmtplib or argon2 shows up by name)
+- time to first successful request: from starting uvicorn to the first
+  200 from GET /
+- resident memory (VmRSS) of the server after that request
+
+Results are appended to results/startup.jsonl (one line per entry point
+per run) and compared with the previous run recorded on the same machine
+and Python version; changes beyond --threshold percent are flagged.
+
+Usage (from this folder, Linux):
+    python startup_bench.py [--runs 5] [--only restructured,assignment2] [--no-save]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from _common import append_results, environment_key, git_commit, previous_results, read_rss_mb
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APPS_DIR = os.path.dirname(HERE)
+RESULTS_FILE = os.path.join(HERE, "results", "startup.jsonl")
+
+# name -> folder containing main.py
+ENTRY_POINTS = {
+    "restructured": os.path.join(APPS_DIR, "assignment2(completed)", "todo_api_restructured"),
+    "assignment2": os.path.join(APPS_DIR, "assignment2"),
+    "assignment2_argon2": os.path.join(APPS_DIR, "assignment2_argon2"),
+    "assignment1": os.path.join(APPS_DIR, "assignment1"),
+}
+
+# Required settings for the apps that read them from the environment
+BASE_ENV = {
+    "SECRET_KEY": "startup-bench-secret-key-not-for-production",
+    "SMTP_USER": "bench@example.com",
+    "SMTP_PASSWORD": "bench",
+    "FROM_EMAIL": "bench@example.com",
+    "SMTP_SERVER": "127.0.0.1",
+    "CREATE_TABLES": "true",
+}
+
+# Builds the app the same way uvicorn does (main.app)
+IMPORT_SNIPPET = "import main; main.app"
+
+METRICS = ("import_ms", "first_request_ms", "rss_mb")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def app_env(workdir: str) -> Dict[str, str]:
+    # Apps with a relative sqlite path (./todo.db) write into workdir
+    return dict(os.environ, **BASE_ENV, DATABASE_URL=f"sqlite:///{workdir}/startup_bench.db")
+
+
+def measure_imports(app_dir: str) -> Dict:
+    """Run `python -X importtime` once; total and per top-level package self time"""
+    with tempfile.TemporaryDirectory() as workdir:
+        env = app_env(workdir)
+        env["PYTHONPATH"] = app_dir
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", IMPORT_SNIPPET],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    by_package = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        by_package[name.strip().split(".")[0]] += int(self_us)
+    return {
+        "total_ms": sum(by_package.values()) / 1000,
+        "by_package_ms": {name: us / 1000 for name, us in by_package.items()},
+    }
+
+
+def measure_boot(app_dir: str, timeout: float = 30) -> Dict:
+    """Start uvicorn, wait for GET / to return 200, then read its memory"""
+    port = free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", app_dir,
+             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=workdir, env=app_env(workdir),
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        try:
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(server.stderr.read().decode().strip().splitlines()[-1])
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError(f"no response within {timeout}s")
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                        if response.status == 200:
+                            break
+                except OSError:
+                    time.sleep(0.01)
+            first_request = time.perf_counter() - start
+            rss = read_rss_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+    return {"first_request_ms": first_request * 1000, "rss_mb": rss}
+
+
+def bench_entry_point(name: str, app_dir: str, runs: int) -> Dict:
+    imports, boots = [], []
+    for _ in range(runs):
+        imports.append(measure_imports(app_dir))
+        boots.append(measure_boot(app_dir))
+
+    # Per-package times from the run closest to the median total
+    median_total = statistics.median(run["total_ms"] for run in imports)
+    typical = min(imports, key=lambda run: abs(run["total_ms"] - median_total))
+    top_packages = sorted(typical["by_package_ms"].items(), key=lambda item: -item[1])[:25]
+    rss_values = [boot["rss_mb"] for boot in boots if boot["rss_mb"] is not None]
+    return {
+        "entry_point": name,
+        "import_ms": round(median_total, 1),
+        "first_request_ms": round(statistics.median(boot["first_request_ms"] for boot in boots), 1),
+        "rss_mb": round(statistics.median(rss_values), 1) if rss_values else None,
+        "top_imports_ms": {package: round(ms, 1) for package, ms in top_packages},
+    }
+
+
+def compare(result: Dict, previous: Optional[Dict], threshold: float) -> List[str]:
+    """Lines describing metrics that moved more than threshold percent"""
+    if not previous:
+        return []
+    changes = []
+    for metric in METRICS:
+        old, new = previous.get(metric), result.get(metric)
+        if not old or new is None:
+            continue
+        delta = (new - old) / old * 100
+        if abs(delta) >= threshold:
+            label = "REGRESSION" if delta > 0 else "improved"
+            changes.append(f"  {label}: {metric} {old} -> {new} ({delta:+.0f}%, vs {previous.get('commit')})")
+    # A package in the top 10 now that was not even in the previous top 25
+    top_now = list(result["top_imports_ms"])[:10]
+    new_packages = set(top_now) - previous.get("top_imports_ms", {}).keys()
+    if new_packages:
+        changes.append(f"  new in top imports: {', '.join(sorted(new_packages))}")
+    return changes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument("--only", help="comma separated entry point names")
+    parser.add_argument("--threshold", type=float, default=15, help="percent change to flag")
+    parser.add_argument("--no-save", action="store_true", help="do not append to results/startup.jsonl")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(ENTRY_POINTS)
+    unknown = set(names) - ENTRY_POINTS.keys()
+    if unknown:
+        parser.error(f"unknown entry points: {', '.join(sorted(unknown))}")
+
+    previous = previous_results(RESULTS_FILE, "entry_point")
+    meta = {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "environment": environment_key(),
+        "runs": args.runs,
+    }
+    records, regressions = [], 0
+    print(f"{'entry point':<20}{'import ms':>11}{'first req ms':>14}{'RSS MB':>9}  top imports (ms)")
+    for name in names:
+        result = bench_entry_point(name, ENTRY_POINTS[name], args.runs)
+        top = ", ".join(f"{package} {ms:.0f}" for package, ms in list(result["top_imports_ms"].items())[:5])
+        rss = f"{result['rss_mb']:.1f}" if result["rss_mb"] is not None else "n/a"
+        print(f"{name:<20}{result['import_ms']:>11.1f}{result['first_request_ms']:>14.1f}{rss:>9}  {top}")
+        for line in compare(result, previous.get(name), args.threshold):
+            print(line)
+            regressions += "REGRESSION" in line
+        records.append({**meta, **result})
+
+    if not args.no_save:
+        append_results(RESULTS_FILE, records)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())